@@ -0,0 +1,245 @@
+"""
+Incremental Alert Rule Engine
+Evaluates each new price observation against configurable rules using
+compact per-item rolling state, so alert cost does not grow with history.
+
+Rules are configured in config.json:
+    "alert_rules": [
+        {"type": "threshold"},
+        {"type": "new_low", "window_days": 90},
+        {"type": "percent_drop", "percent": 10, "window_hours": 24},
+        {"type": "below_recent_average", "last_n": 10, "percent": 5}
+    ]
+
+Window rules keep monotonic deques, so every observation is amortized O(1).
+State lives in alert_state.json, keyed by item id and rule key.
+"""
+
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import json_codec
+
+STATE_FILE = Path(__file__).parent / "alert_state.json"
+
+# Same behaviour the checker had before rules were configurable
+DEFAULT_RULES = [{'type': 'threshold'}]
+
+
+def load_alert_state():
+    """Load per-item rule state"""
+    return json_codec.load_file(STATE_FILE)
+
+
+def save_alert_state(state):
+    """Save per-item rule state (compact, machine-only file)"""
+    json_codec.save_file(STATE_FILE, state, default=list)
+
+
+def get_rules(config):
+    """Return configured alert rules, falling back to the threshold rule"""
+    return config.get('alert_rules') or DEFAULT_RULES
+
+
+def rule_key(rule):
+    """Stable key for a rule so its state survives config reordering"""
+    params = ','.join(f"{k}={rule[k]}" for k in sorted(rule) if k != 'type')
+    return f"{rule['type']}({params})"
+
+
+def _to_epoch(timestamp):
+    if timestamp is None:
+        return datetime.now().timestamp()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def _as_deque(rule_state, key, maxlen=None):
+    """Return rule_state[key] as a deque, converting the JSON list once per run"""
+    value = rule_state.get(key)
+    if not isinstance(value, deque) or value.maxlen != maxlen:
+        value = deque(value or [], maxlen=maxlen)
+        rule_state[key] = value
+    return value
+
+
+def _evict_older_than(window, cutoff):
+    while window and window[0][0] < cutoff:
+        window.popleft()
+
+
+# ===================================================================
+# RULE TYPES
+# Each takes (rule, rule_state, item_state, price, ts, threshold) and
+# returns an alert message or None. rule_state is mutated in place.
+# ===================================================================
+def _threshold_rule(rule, rule_state, item_state, price, ts, threshold):
+    threshold = rule.get('price', threshold)
+    if threshold is None:
+        return None
+    was_active = rule_state.get('active', False)
+    previous_price = item_state.get('last_price')
+    is_active = price <= threshold
+    rule_state['active'] = is_active
+
+    # New alert, or the price dropped further while already below threshold
+    if is_active and (not was_active or (previous_price and price < previous_price)):
+        return f"Price ${price:.2f} is at or below threshold ${threshold:.2f}"
+    return None
+
+
+def _new_low_rule(rule, rule_state, item_state, price, ts, threshold):
+    window_seconds = rule.get('window_days', 90) * 86400
+    # Increasing prices: the front is always the window minimum
+    window = _as_deque(rule_state, 'window')
+    _evict_older_than(window, ts - window_seconds)
+
+    message = None
+    if window and price < window[0][1]:
+        message = f"New {rule.get('window_days', 90)}-day low: ${price:.2f} (previous low ${window[0][1]:.2f})"
+
+    while window and window[-1][1] >= price:
+        window.pop()
+    window.append([ts, price])
+    return message
+
+
+def _percent_drop_rule(rule, rule_state, item_state, price, ts, threshold):
+    percent = rule.get('percent', 10)
+    window_hours = rule.get('window_hours', 24)
+    # Decreasing prices: the front is always the window maximum
+    window = _as_deque(rule_state, 'window')
+    _evict_older_than(window, ts - window_hours * 3600)
+
+    message = None
+    was_active = rule_state.get('active', False)
+    is_active = False
+    if window:
+        high = window[0][1]
+        drop = (high - price) / high * 100 if high else 0
+        is_active = drop >= percent
+        if is_active and not was_active:
+            message = f"Dropped {drop:.1f}% in {window_hours}h: ${high:.2f} → ${price:.2f}"
+    rule_state['active'] = is_active
+
+    while window and window[-1][1] <= price:
+        window.pop()
+    window.append([ts, price])
+    return message
+
+
+def _below_recent_average_rule(rule, rule_state, item_state, price, ts, threshold):
+    last_n = rule.get('last_n', 10)
+    percent = rule.get('percent', 5)
+    recent = _as_deque(rule_state, 'recent', maxlen=last_n)
+    total = rule_state.get('sum', 0.0)
+
+    message = None
+    was_active = rule_state.get('active', False)
+    is_active = False
+    if len(recent) == last_n:
+        average = total / last_n
+        is_active = price <= average * (1 - percent / 100)
+        if is_active and not was_active:
+            message = f"${price:.2f} is {percent}%+ below the last {last_n} checks' average ${average:.2f}"
+    rule_state['active'] = is_active
+
+    if len(recent) == last_n:
+        total -= recent[0]
+    recent.append(price)
+    rule_state['sum'] = total + price
+    return message
+
+
+RULE_TYPES = {
+    'threshold': _threshold_rule,
+    'new_low': _new_low_rule,
+    'percent_drop': _percent_drop_rule,
+    'below_recent_average': _below_recent_average_rule,
+}
+
+
+def seed_from_history(state, item_id, previous_data):
+    """
+    Initialize an item's state from its price_history.json entry
+
+    Keeps the "alert already active" behaviour for items that were
+    tracked before the rule engine existed.
+    """
+    if item_id in state or not previous_data:
+        return
+    state[item_id] = {
+        'last_price': previous_data.get('price'),
+        'count': 0,
+        'rules': {
+            rule_key({'type': 'threshold'}): {'active': previous_data.get('alert_triggered', False)}
+        }
+    }
+
+
+def evaluate_observation(state, item_id, price, threshold, rules, timestamp=None):
+    """
+    Evaluate one observation against all rules and update rolling state
+
+    Args:
+        state: State dict from load_alert_state (mutated in place)
+        item_id: Tracked item id
+        price: Observed price
+        threshold: Item's price_threshold from config
+        rules: Rule dicts from get_rules
+        timestamp: Observation time (ISO string or epoch; defaults to now)
+
+    Returns:
+        list: Alerts as dicts with 'rule', 'type' and 'message'
+    """
+    ts = _to_epoch(timestamp)
+    item_state = state.setdefault(item_id, {'count': 0, 'rules': {}})
+    rule_states = item_state.setdefault('rules', {})
+
+    alerts = []
+    for rule in rules:
+        handler = RULE_TYPES.get(rule.get('type'))
+        if handler is None:
+            raise ValueError(f"Unknown alert rule type: {rule.get('type')}")
+        key = rule_key(rule)
+        message = handler(rule, rule_states.setdefault(key, {}), item_state, price, ts, threshold)
+        if message:
+            alerts.append({'rule': key, 'type': rule['type'], 'message': message})
+
+    item_state['last_price'] = price
+    item_state['last_ts'] = ts
+    item_state['count'] = item_state.get('count', 0) + 1
+    if item_state.get('min') is None or price < item_state['min']:
+        item_state['min'] = price
+    return alerts
+
+
+def reevaluate_threshold(state, item_id, price, threshold, rules):
+    """
+    Re-run threshold rules after a threshold change, using the last known price
+
+    No new observation is recorded: window rules, the observation count
+    and last_price are left as they are.
+
+    Returns:
+        list: Alerts as dicts with 'rule', 'type' and 'message'
+    """
+    item_state = state.setdefault(item_id, {'count': 0, 'rules': {}})
+    rule_states = item_state.setdefault('rules', {})
+    alerts = []
+    for rule in rules:
+        if rule.get('type') != 'threshold':
+            continue
+        key = rule_key(rule)
+        message = _threshold_rule(rule, rule_states.setdefault(key, {}), item_state, price, None, threshold)
+        if message:
+            alerts.append({'rule': key, 'type': rule['type'], 'message': message})
+    return alerts
+
+
+def is_alert_active(state, item_id):
+    """True if any rule for the item is currently in alert"""
+    rule_states = state.get(item_id, {}).get('rules', {})
+    return any(rule_state.get('active') for rule_state in rule_states.values())
@@ -0,0 +1,137 @@
+"""
+Price API Discovery
+Learns each item's display-price-lite JSON endpoint from the page and
+browser tiers, so later runs can skip the 2.7 MB product page.
+
+Two sources:
+- HTML tier: the product page embeds the Price-Lite API configuration
+  (endpoint, client identifier, warehouse number) in its JS bundle data.
+- Browser tier: XHR/fetch requests the page makes are recorded by
+  BrowserPool and scanned for the price endpoint.
+
+Learned endpoints are stored per item in api_endpoints.json as URL
+templates with an {item} placeholder. An endpoint that fails
+MAX_FAILURES times in a row is forgotten and relearned.
+"""
+
+import re
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import json_codec
+
+ENDPOINTS_FILE = Path(__file__).parent / "api_endpoints.json"
+
+PRICE_ENDPOINT_MARKER = 'display-price-lite'
+MAX_FAILURES = 2
+
+# The page JSON is embedded as an escaped JS string, so quotes may be \"
+_Q = r'\\?"'
+_HTML_CONFIG_RE = re.compile(
+    _Q + r'endpoint' + _Q + r':' + _Q + r'(https://[^"\\]*' + PRICE_ENDPOINT_MARKER + r')' + _Q
+    + r'.{0,400}?client_identifier' + _Q + r':\{' + _Q + r'usbc' + _Q + r':' + _Q + r'([0-9a-f-]{36})' + _Q
+    + r'.{0,200}?ware_house' + _Q + r':\{' + _Q + r'usbc' + _Q + r':' + _Q + r'(\d+)' + _Q,
+    re.DOTALL
+)
+
+
+def load_endpoints():
+    """Load learned endpoints (item_id -> entry)"""
+    return json_codec.load_file(ENDPOINTS_FILE)
+
+
+def save_endpoints(endpoints):
+    """Save learned endpoints (compact, machine-only file)"""
+    json_codec.save_file(ENDPOINTS_FILE, endpoints)
+
+
+def template_from_url(api_url, item_number):
+    """
+    Turn an observed API URL into a template with an {item} placeholder
+
+    Returns:
+        str: Template, or None if the URL doesn't carry the item number
+    """
+    parts = urlsplit(api_url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if not any(value == item_number for _, value in query):
+        return None
+    templated = [(key, '{item}' if value == item_number else value) for key, value in query]
+    # Keep the placeholder braces unescaped so str.format can fill them
+    query_string = urlencode(templated, safe='{}')
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query_string, ''))
+
+
+def template_from_html(body):
+    """
+    Build the price API template from a product page's embedded config
+
+    Args:
+        body: Page HTML as bytes or str
+
+    Returns:
+        str: Template, or None if the page has no Price-Lite config
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode('utf-8', errors='ignore')
+    if PRICE_ENDPOINT_MARKER not in body:
+        return None
+    match = _HTML_CONFIG_RE.search(body)
+    if not match:
+        return None
+    endpoint, client_id, warehouse = match.groups()
+    return f"{endpoint}?whsNumber={warehouse}&clientId={client_id}&item={{item}}&locale=en-us"
+
+
+def find_price_request(request_urls, item_number):
+    """Pick the price endpoint out of the XHR/fetch URLs a page made"""
+    for url in request_urls:
+        if PRICE_ENDPOINT_MARKER in url:
+            template = template_from_url(url, item_number)
+            if template:
+                return template
+    return None
+
+
+def learn_endpoint(endpoints, item_id, template, source):
+    """Record a learned template for an item (returns True if it changed)"""
+    current = endpoints.get(item_id, {})
+    if current.get('template') == template:
+        return False
+    endpoints[item_id] = {
+        'template': template,
+        'source': source,
+        'learned_at': datetime.now().isoformat(),
+        'failures': 0
+    }
+    return True
+
+
+def learned_api_url(endpoints, item_id, item_number):
+    """Return the concrete API URL for an item, or None if none is learned"""
+    entry = endpoints.get(item_id)
+    if not entry:
+        return None
+    return entry['template'].replace('{item}', item_number)
+
+
+def record_result(endpoints, item_id, success):
+    """
+    Track whether a learned endpoint still works
+
+    Returns:
+        bool: True if the endpoint was dropped after too many failures
+    """
+    entry = endpoints.get(item_id)
+    if not entry:
+        return False
+    if success:
+        entry['failures'] = 0
+        entry['last_success'] = datetime.now().isoformat()
+        return False
+    entry['failures'] = entry.get('failures', 0) + 1
+    if entry['failures'] >= MAX_FAILURES:
+        del endpoints[item_id]
+        return True
+    return False
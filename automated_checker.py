@@ -6,10 +6,12 @@ This script documents the automation workflow and provides
 helper functions for price checking and alerting.
 """
 
-import json
 import re
-from datetime import datetime
-from pathlib import Path
+import sys
+
+from price_intervals import INTERVALS_FILE, load_intervals, price_stats, record_check, save_intervals
+from search_scraper import product_number_from_url
+from snapshot_parser import extract_tiles, load_snapshot
 
 # Configuration
 CONFIG = {
@@ -20,22 +22,18 @@ CONFIG = {
     "product_url": "https://www.costco.com/ipad-128gb-wi-fi-a16-chip.product.4000285678.html"
 }
 
-# File paths
-HISTORY_FILE = Path(__file__).parent / "price_check_history.json"
+# File paths (price intervals: one record per price, not per check)
+HISTORY_FILE = INTERVALS_FILE
 
 
 def load_history():
-    """Load price check history from JSON file"""
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    """Load price interval history"""
+    return load_intervals()
 
 
 def save_history(history):
-    """Save price check history to JSON file"""
-    with open(HISTORY_FILE, 'w') as f:
-        json.dump(history, f, indent=2)
+    """Save price interval history"""
+    save_intervals(history)
 
 
 def parse_price(price_text):
@@ -99,42 +97,27 @@ No action needed.
 """
 
 
-def log_price_check(product, price, threshold, alert_triggered):
-    """Log price check to history file"""
+def log_price_check(product, price, threshold):
+    """
+    Log price check to history file
+
+    An unchanged price extends the current interval instead of adding a
+    record; alert_triggered is derived from price and threshold when the
+    history is expanded.
+
+    Returns:
+        int: Checks recorded for this product
+    """
     history = load_history()
-    
-    entry = {
-        "timestamp": datetime.now().isoformat(),
-        "product": product,
-        "price": price,
-        "threshold": threshold,
-        "alert_triggered": alert_triggered
-    }
-    
-    history.append(entry)
+    record_check(history, product, price, threshold=threshold)
     save_history(history)
     
-    return len(history)
+    return price_stats(history, product)['total_checks']
 
 
-def get_price_stats():
+def get_price_stats(product=CONFIG['product']):
     """Get statistics from price history"""
-    history = load_history()
-    
-    if not history:
-        return None
-    
-    prices = [entry['price'] for entry in history]
-    
-    return {
-        "total_checks": len(history),
-        "lowest_price": min(prices),
-        "highest_price": max(prices),
-        "average_price": sum(prices) / len(prices),
-        "current_price": prices[-1],
-        "first_check": history[0]['timestamp'],
-        "last_check": history[-1]['timestamp']
-    }
+    return price_stats(load_history(), product)
 
 
 def print_stats():
@@ -155,17 +138,28 @@ def print_stats():
     print(f"Average Price: ${stats['average_price']:.2f}")
     print(f"First Check: {stats['first_check']}")
     print(f"Last Check: {stats['last_check']}")
+    print(f"At Current Price: {stats['at_current_price']}")
     print("=" * 50 + "\n")
 
 
 # ===================================================================
 # PLAYWRIGHT MCP WORKFLOW
 # ===================================================================
-def playwright_workflow_documentation():
+def playwright_workflow_documentation(index=None):
     """
     This function documents the Playwright MCP workflow.
     These commands should be executed via MCP client.
+    
+    Args:
+        index: SnapshotIndex of a saved snapshot; element refs are looked
+               up in it (refs change between page builds, so they aren't
+               hard-coded)
     """
+    search_box = index.search_box() if index else None
+    tile = None
+    if index:
+        product_number = product_number_from_url(CONFIG['product_url'])
+        tile = next((tile for tile in extract_tiles(index) if tile['product_number'] == product_number), None)
     
     workflow = {
         "step_1_navigate": {
@@ -180,7 +174,7 @@ def playwright_workflow_documentation():
             "command": "mcp_playwright_browser_type",
             "params": {
                 "element": "Search box",
-                "ref": "e57",  # From page snapshot
+                "ref": search_box.ref if search_box else "<snapshot search_box().ref>",
                 "text": CONFIG['search_term'],
                 "submit": True
             },
@@ -203,10 +197,12 @@ def playwright_workflow_documentation():
         
         "step_5_extract_price": {
             "description": "Look for price in snapshot",
-            "element_ref": "e1096",  # Reference for 128GB iPad price
+            "element_ref": tile['ref'] if tile else "<extract_tiles() price ref for the product>",
             "expected_format": "$299.99"
         }
     }
+    if tile:
+        workflow["step_5_extract_price"]["price_text"] = f"${tile['price']:.2f}"
     
     return workflow
 
@@ -214,7 +210,7 @@ def playwright_workflow_documentation():
 # ===================================================================
 # MAIN EXECUTION
 # ===================================================================
-def main():
+def main(snapshot_path=None):
     """
     Main function - demonstrates price checking workflow
     
@@ -223,7 +219,12 @@ def main():
     2. Parse the price from snapshot data
     3. Check against threshold
     4. Send notifications if needed
+    
+    Args:
+        snapshot_path: Saved search-results snapshot to price from;
+                       without one an example price is used
     """
+    index = load_snapshot(snapshot_path) if snapshot_path else None
     
     print("\n" + "=" * 60)
     print("COSTCO iPAD A16 AUTOMATED PRICE CHECKER")
@@ -238,7 +239,7 @@ def main():
     
     # Show workflow
     print(f"\nPlaywright MCP Workflow:")
-    workflow = playwright_workflow_documentation()
+    workflow = playwright_workflow_documentation(index)
     for step, details in workflow.items():
         print(f"  {step}: {details.get('description', 'N/A')}")
     
@@ -249,8 +250,8 @@ def main():
     print("Example Price Check:")
     print("-" * 60)
     
-    # This would come from Playwright snapshot in production
-    example_price_text = "$299.99"
+    # From the snapshot's product tile when one is given
+    example_price_text = workflow['step_5_extract_price'].get('price_text', "$299.99")
     example_price = parse_price(example_price_text)
     
     # Generate alert message
@@ -267,8 +268,7 @@ def main():
     total_checks = log_price_check(
         CONFIG['product'],
         example_price,
-        CONFIG['price_threshold'],
-        is_below
+        CONFIG['price_threshold']
     )
     
     print(f"Total price checks: {total_checks}")
@@ -278,7 +278,7 @@ def main():
 
 
 if __name__ == "__main__":
-    alert_triggered = main()
+    alert_triggered = main(sys.argv[1] if len(sys.argv) > 1 else None)
     
     print("\n" + "=" * 60)
     if alert_triggered:
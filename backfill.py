@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Price Backfill from Archived Pages
+Re-runs the extractor cascade over every archived page body using all
+cores, compares the result with the price recorded at fetch time, and
+writes corrected observations to the history store in one bulk append.
+
+A correction replaces the observation the archived page produced: it is
+written with that observation's timestamp and source 'backfill', and
+readers (price_report, price_server, retention, export_parquet) keep the
+correction in its place (history_store.supersede_key). The observation is
+found by the run id shared by the archive entry and the observation, or,
+for entries from before observations carried one, as the item's first
+observation within MATCH_WINDOW of the fetch.
+
+Use this after Costco changes its markup and the extractors have been
+updated, e.g.:
+    python backfill.py                   # all items, all cores
+    python backfill.py --item-id 4000285678 --dry-run
+"""
+
+import argparse
+import bisect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from history_store import BACKFILL_SOURCE, append_observations, is_correction, iter_observations, make_observation
+from page_archive import iter_index, open_page
+from price_extractors import extract_price
+
+# How long after an archived fetch its observation may have been written
+MATCH_WINDOW = timedelta(minutes=5)
+
+
+def _extract_digest(digest):
+    """Worker: extract a price from one archived body"""
+    try:
+        with open_page(digest) as page:
+            price, strategy = extract_price(page)
+            return digest, price, strategy, len(page)
+    except (OSError, ValueError):
+        return digest, None, None, 0
+
+
+def prices_differ(recorded, extracted):
+    """True if a re-extracted price disagrees with the recorded one"""
+    if recorded is None or extracted is None:
+        return recorded != extracted
+    return abs(recorded - extracted) >= 0.005
+
+
+def index_observations(item_id=None):
+    """
+    Current single-store observations, for matching archive entries
+
+    Returns:
+        tuple: ({(item_id, run_id): observation},
+                {item_id: ([timestamps], [observations])} oldest first).
+               A correction already written shows up in place of the
+               observation it replaced.
+    """
+    latest = {}
+    for observation in iter_observations(item_id):
+        if observation.get('store') is not None or observation.get('source') == 'rollup':
+            continue
+        key = (str(observation['item_id']), observation['timestamp'])
+        previous = latest.get(key)
+        if previous is None:
+            latest[key] = observation
+        elif is_correction(observation):
+            # Keep the original's run id so the entry still matches it
+            latest[key] = dict(observation, run_id=previous.get('run_id'))
+
+    by_run = {}
+    by_time = {}
+    for (item, timestamp), observation in sorted(latest.items()):
+        if observation.get('run_id'):
+            by_run.setdefault((item, observation['run_id']), observation)
+        times, observations = by_time.setdefault(item, ([], []))
+        times.append(timestamp)
+        observations.append(observation)
+    return by_run, by_time
+
+
+def find_observation(entry, by_run, by_time):
+    """The observation an archive entry's fetch produced, or None"""
+    item = str(entry['item_id'])
+    observation = by_run.get((item, entry.get('run_id')))
+    if observation is not None:
+        return observation
+    times, observations = by_time.get(item, ((), ()))
+    index = bisect.bisect_left(times, entry['timestamp'])
+    if index == len(times) or observations[index].get('run_id'):
+        return None
+    fetched = datetime.fromisoformat(entry['timestamp'])
+    if datetime.fromisoformat(times[index]) - fetched > MATCH_WINDOW:
+        return None
+    return observations[index]
+
+
+def run_backfill(item_id=None, workers=None, dry_run=False, chunk_size=16):
+    """
+    Re-extract prices from archived pages and backfill corrections
+
+    Args:
+        item_id: Only backfill this item (optional)
+        workers: Process pool size (defaults to all cores)
+        dry_run: Report disagreements without writing observations
+        chunk_size: Pages handed to a worker per task
+
+    Returns:
+        dict: Run statistics
+    """
+    entries = list(iter_index(item_id))
+    # Identical bodies are stored once, so extract each digest once
+    digests = list(dict.fromkeys(entry['digest'] for entry in entries))
+
+    start = time.perf_counter()
+    results = {}
+    bytes_scanned = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for digest, price, strategy, size in pool.map(_extract_digest, digests, chunksize=chunk_size):
+            results[digest] = (price, strategy)
+            bytes_scanned += size
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        'entries': len(entries),
+        'pages': len(digests),
+        'bytes': bytes_scanned,
+        'seconds': elapsed,
+        'agree': 0,
+        'disagree': 0,
+        'recovered': 0,
+        'lost': 0,
+        'unmatched': 0
+    }
+    corrections = []
+    by_run, by_time = index_observations(item_id)
+
+    for entry in entries:
+        extracted, strategy = results.get(entry['digest'], (None, None))
+        original = find_observation(entry, by_run, by_time)
+        recorded = original['price'] if original else entry.get('price')
+        if not prices_differ(recorded, extracted):
+            stats['agree'] += 1
+            continue
+
+        stats['disagree'] += 1
+        if extracted is None:
+            # The new cascade can't read a page the old one could; keep the
+            # recorded value rather than writing a null over it.
+            stats['lost'] += 1
+            continue
+        if original is None and recorded is not None:
+            # The observation has been rolled up (or never written); a new
+            # one would sit next to it rather than replace it
+            stats['unmatched'] += 1
+            continue
+        if recorded is None:
+            # A failed check leaves no observation: this one is new
+            stats['recovered'] += 1
+
+        corrections.append(make_observation(
+            entry['item_id'],
+            extracted,
+            timestamp=original['timestamp'] if original else entry['timestamp'],
+            source=BACKFILL_SOURCE,
+            run_id=entry.get('run_id'),
+            recorded_price=recorded,
+            strategy=strategy,
+            digest=entry['digest']
+        ))
+
+    stats['written'] = 0 if dry_run else append_observations(corrections)
+    stats['corrections'] = len(corrections)
+    return stats
+
+
+def print_report(stats, dry_run=False):
+    """Print throughput and disagreement counts"""
+    seconds = stats['seconds'] or 1e-9
+    print("\n" + "=" * 60)
+    print("BACKFILL REPORT")
+    print("=" * 60)
+    print(f"Archived entries: {stats['entries']} ({stats['pages']} unique pages)")
+    print(f"Scanned: {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.2f}s")
+    print(f"Throughput: {stats['pages'] / seconds:.1f} pages/s, {stats['bytes'] / 1e6 / seconds:.1f} MB/s")
+    print(f"Agree: {stats['agree']}")
+    print(f"Disagree: {stats['disagree']} (recovered {stats['recovered']}, lost {stats['lost']})")
+    if stats['unmatched']:
+        print(f"Skipped: {stats['unmatched']} (no observation left to correct)")
+    if dry_run:
+        print(f"Dry run: {stats['corrections']} corrections not written")
+    else:
+        print(f"Corrected observations written: {stats['written']}")
+    print("=" * 60 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill prices from archived pages")
+    parser.add_argument('--item-id', help="Only backfill this item")
+    parser.add_argument('--workers', type=int, help="Process pool size (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--dry-run', action='store_true', help="Report only, don't write history")
+    args = parser.parse_args()
+
+    stats = run_backfill(args.item_id, args.workers, args.dry_run, args.chunk_size)
+    print_report(stats, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
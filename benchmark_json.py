@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+JSON Benchmark: stdlib json vs json_codec
+Builds a synthetic price_history.json with 100k and 1M entries and times
+a load and a save through the standard library and through json_codec
+(orjson when installed), pretty and compact. Files go to a temporary
+directory and are removed afterwards.
+
+Usage:
+    python benchmark_json.py
+    python benchmark_json.py --sizes 10000 100000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import json_codec
+
+
+def make_history(size):
+    """Synthetic price_history.json contents with `size` items"""
+    return {
+        f"costco:{4000000000 + i}": {
+            'name': f"Item {i}",
+            'price': round(100 + (i % 5000) / 7, 2),
+            'threshold': 250.0,
+            'last_checked': '2025-11-20T08:15:42.123456',
+            'alert_triggered': i % 11 == 0,
+            'volatility': round((i % 97) / 1000, 4)
+        }
+        for i in range(size)
+    }
+
+
+def time_call(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def stdlib_save(path, history, pretty):
+    with open(path, 'w') as f:
+        if pretty:
+            json.dump(history, f, indent=2)
+        else:
+            json.dump(history, f, separators=(',', ':'))
+
+
+def stdlib_load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON history load/save")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help="History sizes (items) to test")
+    args = parser.parse_args()
+
+    print(f"json_codec backend: {json_codec.BACKEND}\n")
+    print(f"{'items':>10}  {'codec':<8}{'layout':<9}{'size MB':>9}{'save s':>9}{'load s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "price_history.json"
+        for size in args.sizes:
+            history = make_history(size)
+            for pretty in (True, False):
+                layout = 'pretty' if pretty else 'compact'
+                runs = [
+                    ('json', lambda: stdlib_save(path, history, pretty), lambda: stdlib_load(path)),
+                    (json_codec.BACKEND, lambda: json_codec.save_file(path, history, pretty=pretty),
+                     lambda: json_codec.load_file(path)),
+                ]
+                for label, save, load in runs:
+                    save_seconds = time_call(save)
+                    megabytes = path.stat().st_size / 1e6
+                    load_seconds = time_call(load)
+                    print(f"{size:>10}  {label:<8}{layout:<9}{megabytes:>9.1f}"
+                          f"{save_seconds:>9.2f}{load_seconds:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Load Test: price_server
+Writes a synthetic observation log to a temporary directory, indexes it,
+and measures:
+  - in-process index lookups (item summary and a one-week history range)
+  - HTTP lookups through a local PriceServer at several concurrency
+    levels, one keep-alive connection per client thread
+  - refresh coalescing: many concurrent POST /refresh calls for one item
+    against a slow stub fetcher should cause a single fetch
+
+Nothing touches the real history files or the network.
+
+Usage:
+    python benchmark_server.py
+    python benchmark_server.py --items 10000 --checks 100 --requests 20000
+"""
+
+import argparse
+import http.client
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import json_codec
+from history_store import append_observations, make_observation
+from price_server import PriceIndex, PriceServer
+
+CONCURRENCY_LEVELS = [1, 8, 32]
+
+
+def write_observations(path, items, checks):
+    """Synthetic log: `checks` runs over `items` items, 6 hours apart"""
+    random.seed(7)
+    start = datetime(2025, 1, 1)
+    for check in range(checks):
+        timestamp = (start + timedelta(hours=6 * check)).isoformat()
+        append_observations((make_observation(str(4000000000 + i), round(80 + random.random() * 40, 2),
+                                              timestamp, threshold=100.0) for i in range(items)), path)
+    return start
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def bench_index(index, item_ids, start, lookups):
+    times = []
+    for _ in range(lookups):
+        item_id = random.choice(item_ids)
+        t = time.perf_counter()
+        index.item(item_id)
+        times.append(time.perf_counter() - t)
+    since = (start + timedelta(days=7)).isoformat()
+    until = (start + timedelta(days=14)).isoformat()
+    range_times = []
+    for _ in range(lookups):
+        item_id = random.choice(item_ids)
+        t = time.perf_counter()
+        index.history(item_id, since, until)
+        range_times.append(time.perf_counter() - t)
+    return sorted(times), sorted(range_times)
+
+
+def bench_http(port, item_ids, concurrency, total):
+    per_client = total // concurrency
+
+    def client(_):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        latencies = []
+        for _ in range(per_client):
+            t = time.perf_counter()
+            conn.request('GET', f"/items/{random.choice(item_ids)}")
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - t)
+        conn.close()
+        return latencies
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [latency for result in pool.map(client, range(concurrency)) for latency in result]
+    return sorted(latencies), time.perf_counter() - t
+
+
+def bench_refresh(port, item_id, callers):
+    barrier = threading.Barrier(callers)
+
+    def call(_):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        barrier.wait()
+        conn.request('POST', f"/items/{item_id}/refresh")
+        payload = json_codec.loads(conn.getresponse().read())
+        conn.close()
+        return payload
+
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        return list(pool.map(call, range(callers)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the price query server")
+    parser.add_argument('--items', type=int, default=5000, help="Items in the synthetic history")
+    parser.add_argument('--checks', type=int, default=60, help="Checks per item")
+    parser.add_argument('--requests', type=int, default=8000, help="HTTP requests per concurrency level")
+    parser.add_argument('--refresh-callers', type=int, default=50, help="Concurrent refreshes of one item")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        observations_file = Path(tmp) / "observations.jsonl"
+        start = write_observations(observations_file, args.items, args.checks)
+        item_ids = [str(4000000000 + i) for i in range(args.items)]
+        config = {'items': [{'item_id': item_ids[0], 'watch_id': item_ids[0], 'name': 'Refresh target',
+                           'url': 'https://example.invalid/p', 'price_threshold': 100.0,
+                           'product_key': f"costco:{item_ids[0]}"}]}
+
+        t = time.perf_counter()
+        index = PriceIndex(config, observations_file=observations_file, history_file=Path(tmp) / "none.json",
+                           rollups_file=Path(tmp) / "none.jsonl")
+        index.reload()
+        print(f"Indexed {len(index)} items / {index.stats['observations']} observations "
+              f"in {time.perf_counter() - t:.2f}s\n")
+
+        lookups, ranges = bench_index(index, item_ids, start, 20000)
+        print(f"{'in-process':<22}{'p50 µs':>10}{'p99 µs':>10}")
+        print(f"{'  item summary':<22}{statistics.median(lookups) * 1e6:>10.1f}{percentile(lookups, 0.99) * 1e6:>10.1f}")
+        print(f"{'  1-week history':<22}{statistics.median(ranges) * 1e6:>10.1f}{percentile(ranges, 0.99) * 1e6:>10.1f}")
+
+        fetches = []
+
+        def slow_fetch(item):
+            fetches.append(item['item_id'])
+            time.sleep(0.2)
+            return 95.0
+
+        server = PriceServer(('127.0.0.1', 0), index, fetcher=slow_fetch)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+
+        print(f"\n{'HTTP GET /items/<id>':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for concurrency in CONCURRENCY_LEVELS:
+            latencies, elapsed = bench_http(port, item_ids, concurrency, args.requests)
+            print(f"{'  ' + str(concurrency) + ' clients':<22}{len(latencies) / elapsed:>10.0f}"
+                  f"{statistics.median(latencies) * 1000:>10.2f}{percentile(latencies, 0.99) * 1000:>10.2f}")
+
+        results = bench_refresh(port, item_ids[0], args.refresh_callers)
+        coalesced = sum(1 for result in results if result.get('coalesced'))
+        print(f"\nRefresh: {len(results)} concurrent calls → {len(fetches)} fetch(es), "
+              f"{coalesced} coalesced; new price ${results[0]['price']:.2f}")
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Transport Benchmark: requests (HTTP/1.1) vs httpx (HTTP/2)
+Starts a local stub server that speaks both HTTP/1.1 and cleartext
+HTTP/2 (h2c, prior knowledge) on one port, then fetches through
+http_client.get with each transport backend at 1, 16 and 128 concurrent
+requests. Reports throughput, latency percentiles and how many TCP
+connections each backend opened.
+
+The stub adds a fixed per-request delay (like a real server's think
+time) and returns a fixed-size body, so differences come from connection
+handling rather than the server.
+
+Requires httpx[http2] (optional dependency): pip install "httpx[http2]"
+
+Usage:
+    python benchmark_transport.py
+    python benchmark_transport.py --delay-ms 50 --body-kb 64 --requests 512
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.settings
+except ImportError:  # optional dependency
+    h2 = None
+
+H2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+CONCURRENCY_LEVELS = [1, 16, 128]
+
+
+class StubServer:
+    """Local HTTP/1.1 + h2c server on a background event loop"""
+
+    def __init__(self, delay_seconds, body_size):
+        self.delay = delay_seconds
+        self.body = b'<html>' + b'x' * max(body_size - 13, 0) + b'</html>'
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self._ready = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            first = await reader.readexactly(len(H2_PREFACE))
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        try:
+            if first == H2_PREFACE:
+                await self._serve_h2(reader, writer, first)
+            else:
+                await self._serve_http1(reader, writer, first)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_http1(self, reader, writer, buffered):
+        while True:
+            while b'\r\n\r\n' not in buffered:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                buffered += chunk
+            _, buffered = buffered.split(b'\r\n\r\n', 1)
+            await asyncio.sleep(self.delay)
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n'
+                         + f'Content-Length: {len(self.body)}\r\n\r\n'.encode() + self.body)
+            await writer.drain()
+
+    async def _serve_h2(self, reader, writer, preface):
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000})
+        window_open = asyncio.Event()
+
+        async def flush():
+            writer.write(conn.data_to_send())
+            await writer.drain()
+
+        async def respond(stream_id):
+            await asyncio.sleep(self.delay)
+            conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'text/html'),
+                                          ('content-length', str(len(self.body)))])
+            body = self.body
+            while body:
+                window = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if window <= 0:
+                    window_open.clear()
+                    await flush()
+                    await window_open.wait()
+                    continue
+                conn.send_data(stream_id, body[:window], end_stream=len(body) <= window)
+                body = body[window:]
+            await flush()
+
+        data = preface
+        while data:
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    asyncio.ensure_future(respond(event.stream_id))
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, (h2.events.WindowUpdated, h2.events.RemoteSettingsChanged)):
+                    window_open.set()
+            await flush()
+            data = await reader.read(65536)
+
+
+def run_level(url, concurrency, total):
+    """Fetch url `total` times with `concurrency` threads; return latencies"""
+    def fetch(_):
+        start = time.perf_counter()
+        response = http_client.get(url, timeout=30)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(fetch, range(total)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark http_client transports")
+    parser.add_argument('--delay-ms', type=float, default=20, help="Stub server delay per request")
+    parser.add_argument('--body-kb', type=int, default=16, help="Response body size")
+    parser.add_argument('--requests', type=int, default=256, help="Requests per concurrency level")
+    args = parser.parse_args()
+
+    if h2 is None or http_client.httpx is None:
+        print('❌ Needs httpx with HTTP/2 support: pip install "httpx[http2]"')
+        raise SystemExit(1)
+
+    # requests discards connections beyond its pool size; that churn is part of what's measured
+    logging.getLogger('urllib3').setLevel(logging.ERROR)
+
+    server = StubServer(args.delay_ms / 1000, args.body_kb * 1024).start()
+    url = f"http://127.0.0.1:{server.port}/product.html"
+    backends = [
+        ('requests / HTTP/1.1', {'backend': 'requests'}),
+        ('httpx / HTTP/2', {'backend': 'httpx', 'http2': True, 'http1': False}),
+    ]
+
+    print(f"Stub: {args.delay_ms:.0f} ms delay, {args.body_kb} KB body, {args.requests} requests per level\n")
+    print(f"{'transport':<22}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'conns':>8}")
+    for label, transport in backends:
+        http_client.configure({'transport': transport, 'hedging': {'enabled': False}})
+        for concurrency in CONCURRENCY_LEVELS:
+            run_level(url, concurrency, min(concurrency, 16))  # warm up connections
+            before = server.connections
+            latencies, elapsed = run_level(url, concurrency, args.requests)
+            latencies.sort()
+            p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+            print(f"{label:<22}{concurrency:>6}{len(latencies) / elapsed:>10.0f}"
+                  f"{statistics.median(latencies) * 1000:>10.1f}{p99 * 1000:>10.1f}"
+                  f"{server.connections - before:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Headless Browser Pool
+Browser fetch tier for pages that plain HTTP can't price (bot walls,
+client-rendered prices). One Chromium process is launched per run and a
+small pool of warm browser contexts is reused across pages, instead of
+the launch + navigate + fixed 3 s wait per check that the MCP workflow in
+automated_checker.py documents.
+
+- Heavy resources (product image preloads from bfasset.costco-static.com,
+  fonts, media) and analytics beacons (BOOMR/mPulse, Adobe, Criteo...)
+  are aborted at the network layer.
+- Instead of sleeping, each page waits for the price selector to appear.
+- A context is closed and replaced after `pages_per_context` pages to
+  bound memory.
+
+Requires the optional `playwright` package and a Chromium build:
+    pip install playwright && python -m playwright install chromium
+
+Usage:
+    python browser_pool.py URL [URL ...]
+"""
+
+import re
+import sys
+from urllib.parse import urlsplit
+
+from price_extractors import extract_price
+
+try:
+    from playwright.sync_api import Error as PlaywrightError
+    from playwright.sync_api import sync_playwright
+except ImportError:  # optional dependency
+    sync_playwright = None
+    PlaywrightError = Exception
+
+PRICE_SELECTOR = '[data-testid="Text_single-price-whole-value"]'
+
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+BLOCKED_HOSTS = {
+    'bfasset.costco-static.com',
+    'cdn.bfldr.com',
+    'thumbs.bfldr.com',
+    's2.go-mpulse.net',
+    'c.go-mpulse.net',
+    'assets.adobedtm.com',
+    'dpm.demdex.net',
+    'costco.demdex.net',
+    'cm.everesttech.net',
+    'static.criteo.net',
+    'r.intake-lr.com',
+}
+BLOCKED_URL_PATTERNS = ('boomerang', 'akstat.io', 'google-analytics', 'googletagmanager', 'doubleclick')
+
+
+def is_blocked(url, resource_type, blocked_hosts=BLOCKED_HOSTS,
+               blocked_types=BLOCKED_RESOURCE_TYPES, blocked_patterns=BLOCKED_URL_PATTERNS):
+    """True if a request should be aborted instead of loaded"""
+    if resource_type in blocked_types:
+        return True
+    host = urlsplit(url).hostname or ''
+    if host in blocked_hosts:
+        return True
+    return any(pattern in url for pattern in blocked_patterns)
+
+
+def parse_price_text(text):
+    """Convert element text like '$1,299.99' to float, or None"""
+    price_clean = re.sub(r'[^\d.]', '', text or '')
+    try:
+        return float(price_clean) if price_clean else None
+    except ValueError:
+        return None
+
+
+class BrowserPool:
+    """
+    Pool of warm browser contexts sharing one Chromium process
+
+    Use as a context manager:
+        with BrowserPool(size=2) as pool:
+            result = pool.fetch(url)
+    """
+
+    def __init__(self, size=2, pages_per_context=25, headless=True,
+                 price_selector=PRICE_SELECTOR, wait_timeout_ms=15000,
+                 navigation_timeout_ms=30000, blocked_hosts=None):
+        if sync_playwright is None:
+            raise RuntimeError("playwright is not installed (pip install playwright)")
+        self.size = size
+        self.pages_per_context = pages_per_context
+        self.headless = headless
+        self.price_selector = price_selector
+        self.wait_timeout_ms = wait_timeout_ms
+        self.navigation_timeout_ms = navigation_timeout_ms
+        self.blocked_hosts = BLOCKED_HOSTS if blocked_hosts is None else set(blocked_hosts)
+
+        self._playwright = None
+        self._browser = None
+        self._contexts = []   # [context, pages_served]
+        self._next = 0
+        self.stats = {'pages': 0, 'blocked': 0, 'recycled': 0, 'selector_timeouts': 0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """Launch the browser and warm up the contexts"""
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(headless=self.headless)
+        self._contexts = [[self._new_context(), 0] for _ in range(self.size)]
+
+    def close(self):
+        """Close every context and the browser"""
+        for context, _ in self._contexts:
+            try:
+                context.close()
+            except PlaywrightError:
+                pass
+        self._contexts = []
+        if self._browser:
+            self._browser.close()
+            self._browser = None
+        if self._playwright:
+            self._playwright.stop()
+            self._playwright = None
+
+    def _new_context(self):
+        context = self._browser.new_context(
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            locale='en-US',
+            service_workers='block'
+        )
+        context.set_default_navigation_timeout(self.navigation_timeout_ms)
+        context.route('**/*', self._route)
+        return context
+
+    def _route(self, route):
+        request = route.request
+        if is_blocked(request.url, request.resource_type, self.blocked_hosts):
+            self.stats['blocked'] += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def _acquire(self):
+        """Round-robin the next context, recycling it if it has served enough pages"""
+        slot = self._contexts[self._next]
+        self._next = (self._next + 1) % len(self._contexts)
+        if slot[1] >= self.pages_per_context:
+            try:
+                slot[0].close()
+            except PlaywrightError:
+                pass
+            slot[0] = self._new_context()
+            slot[1] = 0
+            self.stats['recycled'] += 1
+        slot[1] += 1
+        return slot[0]
+
+    def fetch(self, url, price_selector=None):
+        """
+        Load a page in a warm context and read its price
+
+        Args:
+            url: Page URL
+            price_selector: Override the selector waited on
+
+        Returns:
+            dict: url, status, price (None if not found), html and
+                  api_requests (XHR/fetch URLs requested by the page)
+        """
+        selector = price_selector or self.price_selector
+        context = self._acquire()
+        page = context.new_page()
+        # XHR/fetch calls the page makes, for API endpoint discovery
+        api_requests = []
+        page.on('request', lambda request: api_requests.append(request.url)
+                if request.resource_type in ('xhr', 'fetch') else None)
+        try:
+            response = page.goto(url, wait_until='domcontentloaded')
+            price = None
+            try:
+                element = page.wait_for_selector(selector, timeout=self.wait_timeout_ms)
+                price = parse_price_text(element.inner_text())
+            except PlaywrightError:
+                self.stats['selector_timeouts'] += 1
+
+            html = page.content()
+            if price is None:
+                price, _ = extract_price(html.encode('utf-8'))
+
+            self.stats['pages'] += 1
+            return {
+                'url': url,
+                'status': response.status if response else None,
+                'price': price,
+                'html': html,
+                'api_requests': api_requests
+            }
+        finally:
+            page.close()
+
+
+def fetch_prices_with_browser(urls, **pool_options):
+    """
+    Price a batch of URLs with one warm pool
+
+    Returns:
+        dict: url -> price (None where no price was found or loading failed)
+    """
+    prices = {}
+    with BrowserPool(**pool_options) as pool:
+        for url in urls:
+            try:
+                prices[url] = pool.fetch(url)['price']
+            except PlaywrightError as e:
+                print(f"  ⚠️  Browser fetch failed for {url}: {e}")
+                prices[url] = None
+    return prices
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python browser_pool.py URL [URL ...]")
+        sys.exit(1)
+
+    with BrowserPool() as pool:
+        for url in sys.argv[1:]:
+            result = pool.fetch(url)
+            price = f"${result['price']:.2f}" if result['price'] is not None else "not found"
+            print(f"{url}: {price} (status {result['status']})")
+        print(f"Stats: {pool.stats}")
+
+
+if __name__ == "__main__":
+    main()
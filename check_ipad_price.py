@@ -4,9 +4,11 @@ This script automates browser interaction to check iPad A16 price on Costco
 and notifies if the price is less than $300.
 """
 
-import json
 import re
-from datetime import datetime
+import sys
+
+from price_intervals import INTERVALS_FILE, load_intervals, record_check, save_intervals
+from snapshot_parser import extract_tiles, load_snapshot
 
 # You would call the Playwright MCP tools from your MCP client
 # This script documents the workflow and provides helper functions
@@ -14,6 +16,7 @@ from datetime import datetime
 PRICE_THRESHOLD = 300.00
 SEARCH_TERM = "ipad a16"
 COSTCO_URL = "https://www.costco.com"
+PRODUCT_NUMBER = "4000285678"  # 128GB Wi-Fi model
 
 def parse_price(price_text):
     """
@@ -45,40 +48,37 @@ def check_price_against_threshold(price, threshold):
     else:
         return False, f"iPad A16 is ${price:.2f} (above ${threshold:.2f} threshold)"
 
-def save_price_check(product_name, price, alert_triggered):
+def save_price_check(product_name, price):
     """
     Save price check results to history file
     
     Args:
         product_name: Name of the product
         price: Current price
-        alert_triggered: Whether alert was triggered
     """
-    history_file = "price_check_history.json"
-    
-    # Load existing history
-    try:
-        with open(history_file, 'r') as f:
-            history = json.load(f)
-    except FileNotFoundError:
-        history = []
-    
-    # Add new check
-    history.append({
-        "timestamp": datetime.now().isoformat(),
-        "product": product_name,
-        "price": price,
-        "threshold": PRICE_THRESHOLD,
-        "alert_triggered": alert_triggered
-    })
-    
-    # Save updated history
-    with open(history_file, 'w') as f:
-        json.dump(history, f, indent=2)
-    
-    print(f"Price check saved to {history_file}")
+    # Unchanged price extends the current interval; alert_triggered is
+    # derived from price and threshold when the history is expanded
+    history = load_intervals()
+    interval = record_check(history, product_name, price, threshold=PRICE_THRESHOLD)
+    save_intervals(history)
+    
+    print(f"Price check saved to {INTERVALS_FILE.name} "
+          f"({interval['check_count']} checks at ${price:.2f} since {interval['first_seen']})")
 
-def main():
+def price_from_snapshot(snapshot_path):
+    """
+    Find the 128GB iPad A16 tile in a saved search-results snapshot
+    
+    Returns:
+        tuple: (product_name, price_text), or (None, None) if the tile is missing
+    """
+    for tile in extract_tiles(load_snapshot(snapshot_path)):
+        if tile['product_number'] == PRODUCT_NUMBER:
+            print(f"Found in snapshot: price ref {tile['ref']}")
+            return tile['name'], f"${tile['price']:.2f}"
+    return None, None
+
+def main(snapshot_path=None):
     """
     Main workflow for checking iPad A16 price
     
@@ -89,6 +89,10 @@ def main():
     4. Extract price from first result (128GB model)
     5. Check against threshold
     6. Send notification if needed
+    
+    Args:
+        snapshot_path: Saved snapshot from step 4; without one the
+                       example price is used
     """
     
     print(f"Starting Costco iPad A16 price check...")
@@ -101,8 +105,9 @@ def main():
     # mcp_playwright_browser_navigate(url="https://www.costco.com")
     # 
     # Step 2: Search for iPad A16
-    # Find search box and type search term
-    # mcp_playwright_browser_type(element="Search box", ref="e57", text="ipad a16", submit=True)
+    # Find search box and type search term; refs change between page builds,
+    # so look the box up in a snapshot: parse_snapshot(snapshot).search_box().ref
+    # mcp_playwright_browser_type(element="Search box", ref=<search box ref>, text="ipad a16", submit=True)
     # 
     # Step 3: Wait for page to load
     # mcp_playwright_browser_wait_for(time=3)
@@ -110,13 +115,17 @@ def main():
     # Step 4: Take snapshot to see products
     # mcp_playwright_browser_snapshot()
     # 
-    # Step 5: Extract price from first product
-    # Look for: generic [ref=e1096]: $299.99
-    # This is the price element for the 128GB iPad A16
-    
-    # Example extracted data (you would get this from the snapshot):
-    product_name = "iPad, 128GB Wi-Fi (A16 chip)"
-    price_text = "$299.99"  # From ref=e1096 in the snapshot
+    # Step 5: Save the snapshot and extract the price: every product tile
+    # is parsed, and the 128GB model is picked out by its product number
+    # python check_ipad_price.py snapshot.yml
+    
+    product_name, price_text = price_from_snapshot(snapshot_path) if snapshot_path else (None, None)
+    if price_text is None:
+        if snapshot_path:
+            print(f"⚠️  No iPad A16 128GB tile in {snapshot_path}, using example data")
+        # Example extracted data
+        product_name = "iPad, 128GB Wi-Fi (A16 chip)"
+        price_text = "$299.99"
     
     # Parse price
     current_price = parse_price(price_text)
@@ -128,7 +137,7 @@ def main():
     print(message)
     
     # Save to history
-    save_price_check(product_name, current_price, alert_triggered)
+    save_price_check(product_name, current_price)
     
     # If alert triggered, you could:
     # - Send email notification
@@ -145,7 +154,7 @@ def main():
     return alert_triggered, current_price
 
 if __name__ == "__main__":
-    alert_triggered, price = main()
+    alert_triggered, price = main(sys.argv[1] if len(sys.argv) > 1 else None)
     print("-" * 50)
     if alert_triggered:
         print("✅ ALERT: Price is below threshold!")
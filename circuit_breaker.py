@@ -0,0 +1,147 @@
+"""
+Per-Host Circuit Breaker
+Stops hammering a host that has started blocking us (403/429) or failing.
+
+States per host:
+    closed    - requests flow; outcomes go into a rolling window
+    open      - requests are skipped until the cooldown expires
+    half_open - one probe request is allowed; success closes the breaker,
+                failure re-opens it with a doubled cooldown
+
+A blocking status (403, 429) trips the breaker immediately; otherwise it
+trips once the error rate over the last `window` requests reaches
+`error_rate` with at least `min_requests` outcomes. State persists in
+circuit_breakers.json (or a checker's own file, see
+http_client.use_state_files), so a run that starts after a cooldown
+begins with a single cautious probe rather than a full sweep.
+"""
+
+import time
+from pathlib import Path
+
+import json_codec
+
+STATE_FILE = Path(__file__).parent / "circuit_breakers.json"
+
+DEFAULT_SETTINGS = {
+    'window': 20,
+    'min_requests': 4,
+    'error_rate': 0.5,
+    'open_seconds': 1800,
+    'max_open_seconds': 6 * 3600,
+    'blocking_statuses': [403, 429],
+    'failure_statuses': [500, 502, 503, 504],
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def load_breakers(state_file=STATE_FILE):
+    """Load per-host breaker state"""
+    state = json_codec.load_file(state_file)
+    # A probe that was in flight when the last run ended never reported back
+    for host_state in state.values():
+        host_state['probe_in_flight'] = False
+    return state
+
+
+def save_breakers(state, state_file=STATE_FILE):
+    """Save per-host breaker state (compact, machine-only file)"""
+    json_codec.save_file(state_file, state)
+
+
+def _host_state(state, host):
+    return state.setdefault(host, {
+        'state': CLOSED,
+        'outcomes': [],
+        'open_until': 0,
+        'cooldown': None,
+        'last_status': None
+    })
+
+
+def allow_request(state, host, settings=DEFAULT_SETTINGS, now=None):
+    """
+    Decide whether a request to host may be sent
+
+    An open breaker whose cooldown has expired moves to half-open and lets
+    exactly one probe through; further requests are refused until that
+    probe's outcome is recorded.
+    """
+    now = now or time.time()
+    host_state = _host_state(state, host)
+
+    if host_state['state'] == CLOSED:
+        return True
+    if host_state['state'] == OPEN:
+        if now < host_state['open_until']:
+            return False
+        host_state['state'] = HALF_OPEN
+        host_state['probe_in_flight'] = True
+        return True
+    # Half-open: one probe at a time
+    if host_state.get('probe_in_flight'):
+        return False
+    host_state['probe_in_flight'] = True
+    return True
+
+
+def _open(host_state, settings, now):
+    cooldown = host_state.get('cooldown') or settings['open_seconds']
+    if host_state['state'] == HALF_OPEN:
+        cooldown = min(cooldown * 2, settings['max_open_seconds'])
+    host_state['state'] = OPEN
+    host_state['cooldown'] = cooldown
+    host_state['open_until'] = now + cooldown
+    host_state['probe_in_flight'] = False
+
+
+def record_outcome(state, host, status_code=None, error=False, settings=DEFAULT_SETTINGS, now=None):
+    """
+    Record a request outcome and update the breaker
+
+    Args:
+        state: Breaker state from load_breakers (mutated in place)
+        host: Request host
+        status_code: HTTP status (None if the request raised)
+        error: True if the request failed without a response
+        settings: Breaker settings
+
+    Returns:
+        str: The host's breaker state after this outcome
+    """
+    now = now or time.time()
+    host_state = _host_state(state, host)
+    host_state['last_status'] = status_code
+
+    blocked = status_code in settings['blocking_statuses']
+    failed = error or blocked or status_code in settings['failure_statuses']
+
+    if host_state['state'] == HALF_OPEN:
+        if failed:
+            _open(host_state, settings, now)
+        else:
+            host_state.update({'state': CLOSED, 'outcomes': [], 'cooldown': None, 'probe_in_flight': False})
+        return host_state['state']
+
+    outcomes = host_state['outcomes']
+    outcomes.append(0 if failed else 1)
+    del outcomes[:-settings['window']]
+
+    failures = outcomes.count(0)
+    if blocked or (len(outcomes) >= settings['min_requests']
+                   and failures / len(outcomes) >= settings['error_rate']):
+        _open(host_state, settings, now)
+    return host_state['state']
+
+
+def describe(state):
+    """One line per host that is not closed, for run summaries"""
+    lines = []
+    for host, host_state in sorted(state.items()):
+        if host_state['state'] != CLOSED:
+            until = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(host_state['open_until']))
+            lines.append(f"{host}: {host_state['state']} (last status {host_state['last_status']}, retry after {until})")
+    return lines
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Config Compiler
+Validates config.json once and caches a compiled form keyed by the file's
+SHA-256, so large watchlists aren't re-parsed and re-derived on every run.
+
+The compiled config has the same shape as config.json, plus per-item:
+    normalized_url  - lower-cased scheme/host, fragment dropped
+    host            - network location the item is fetched from
+    fetch_strategy  - 'api' (display-price-lite JSON) or 'page' (HTML)
+    product_key     - canonical product (URL product number, else the
+                      normalized URL), shared by every entry watching it
+    watch_id        - unique key for the watch entry: item_id for
+                      config.json items, "<watchlist>:<item_id>" otherwise
+    watchlist       - name of the file the entry came from
+and top-level maps for scheduling and coalescing:
+    hosts    - host -> [item_id, ...]
+    products - product_key -> [watch_id, ...]
+    aliases  - old item ID -> watch_id (from per-item "aliases" lists)
+    subscriptions - product_key -> [[threshold, subscriber_id], ...],
+                    sorted, from per-item "subscribers" (subscriptions.py)
+
+Extra watchlist files (JSON with just an "items" list) are merged in from
+the "watchlists" list of paths/globs, relative to config.json.
+
+Each run records the compiled items it checked in config_snapshot.json;
+diff_config() compares the current config with that snapshot so an
+incremental run only checks added or changed items.
+
+Usage:
+    python config_compiler.py [config.json]
+    python config_compiler.py --diff      # changes since the last snapshot
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+import json_codec
+from search_scraper import product_number_from_url
+
+CONFIG_FILE = Path(__file__).parent / "config.json"
+CACHE_DIR = Path(__file__).parent / ".config_cache"
+SNAPSHOT_FILE = Path(__file__).parent / "config_snapshot.json"
+
+# Bump when the compiled layout changes so stale caches are ignored
+COMPILER_VERSION = 5
+
+API_HOSTS = {'gdx-api.costco.com'}
+
+# Item fields that change alerting but not what is fetched
+THRESHOLD_FIELDS = {'price_threshold', 'subscribers'}
+
+
+def normalize_url(url):
+    """
+    Normalize a product or API URL
+
+    Lower-cases scheme and host, defaults to https, and drops the
+    fragment. Path and query are kept as-is (API URLs depend on them).
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+def classify_fetch_strategy(url):
+    """Return 'api' for Costco price API URLs, 'page' for product pages"""
+    parts = urlsplit(url)
+    if parts.netloc.lower() in API_HOSTS or 'display-price-lite' in parts.path:
+        return 'api'
+    return 'page'
+
+
+def product_key(url):
+    """Canonical product key: the Costco product number, else the normalized URL"""
+    number = product_number_from_url(url)
+    return f"costco:{number}" if number else normalize_url(url)
+
+
+def validate_config(config):
+    """
+    Check config.json structure
+
+    Returns:
+        list: Human-readable problems (empty if the config is valid)
+    """
+    errors = []
+    if not isinstance(config, dict):
+        return ["config must be a JSON object"]
+
+    items = config.get('items')
+    if not isinstance(items, list):
+        return ["'items' must be a list"]
+
+    seen_ids = set()
+    for index, item in enumerate(items):
+        label = f"items[{index}]"
+        if not isinstance(item, dict):
+            errors.append(f"{label} must be an object")
+            continue
+        for field in ('name', 'item_id', 'url'):
+            if not isinstance(item.get(field), str) or not item.get(field).strip():
+                errors.append(f"{label}.{field} is required and must be a non-empty string")
+        threshold = item.get('price_threshold')
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            # The checker formats and compares it for every item
+            errors.append(f"{label}.price_threshold is required and must be a number")
+        item_id = item.get('item_id')
+        if item_id in seen_ids:
+            errors.append(f"{label}.item_id '{item_id}' is duplicated")
+        seen_ids.add(item_id)
+        aliases = item.get('aliases', [])
+        if not isinstance(aliases, list) or not all(isinstance(alias, str) for alias in aliases):
+            errors.append(f"{label}.aliases must be a list of item ID strings")
+        subscribers = item.get('subscribers', [])
+        if not isinstance(subscribers, list):
+            errors.append(f"{label}.subscribers must be a list")
+            subscribers = []
+        for sub_index, subscriber in enumerate(subscribers):
+            sub_label = f"{label}.subscribers[{sub_index}]"
+            if not isinstance(subscriber, dict) or not isinstance(subscriber.get('id'), str):
+                errors.append(f"{sub_label} needs a string 'id'")
+                continue
+            sub_threshold = subscriber.get('threshold')
+            if isinstance(sub_threshold, bool) or not isinstance(sub_threshold, (int, float)):
+                errors.append(f"{sub_label}.threshold must be a number")
+
+    watchlists = config.get('watchlists', [])
+    if not isinstance(watchlists, list) or not all(isinstance(path, str) for path in watchlists):
+        errors.append("'watchlists' must be a list of file paths")
+
+    stores = config.get('stores', {})
+    if isinstance(stores, dict) and stores.get('enabled', False):
+        locations = stores.get('locations')
+        if not isinstance(locations, list) or not locations:
+            errors.append("stores.locations must be a non-empty list when stores are enabled")
+            locations = []
+        for index, location in enumerate(locations):
+            label = f"stores.locations[{index}]"
+            if not isinstance(location, dict):
+                errors.append(f"{label} must be an object")
+                continue
+            for field in ('id', 'warehouse'):
+                if not isinstance(location.get(field), str) or not location.get(field).strip():
+                    # Without a warehouse, API-priced items would all report the default warehouse
+                    errors.append(f"{label}.{field} is required and must be a non-empty string")
+
+    notification = config.get('notification', {})
+    if not isinstance(notification, dict):
+        errors.append("'notification' must be an object")
+
+    return errors
+
+
+def compile_items(config, watchlists=()):
+    """
+    Return a compiled copy of config with per-item derived fields
+
+    Args:
+        config: Parsed config.json
+        watchlists: (name, parsed watchlist) pairs to merge in
+    """
+    compiled = dict(config)
+    hosts = {}
+    products = {}
+    aliases = {}
+    subscriptions = {}
+    items = []
+    sources = [(None, config)] + list(watchlists)
+    for watchlist, source in sources:
+        for item in source['items']:
+            normalized_url = normalize_url(item['url'])
+            host = urlsplit(normalized_url).netloc
+            watch_id = f"{watchlist}:{item['item_id']}" if watchlist else item['item_id']
+            compiled_item = dict(item)
+            compiled_item['normalized_url'] = normalized_url
+            compiled_item['host'] = host
+            compiled_item['fetch_strategy'] = classify_fetch_strategy(normalized_url)
+            compiled_item['product_key'] = product_key(normalized_url)
+            compiled_item['watch_id'] = watch_id
+            compiled_item['watchlist'] = watchlist or 'config'
+            items.append(compiled_item)
+            hosts.setdefault(host, []).append(item['item_id'])
+            products.setdefault(compiled_item['product_key'], []).append(watch_id)
+            for alias in item.get('aliases', []):
+                aliases.setdefault(alias, watch_id)
+            for subscriber in item.get('subscribers', []):
+                subscriptions.setdefault(compiled_item['product_key'], {})[subscriber['id']] = subscriber['threshold']
+
+    compiled['items'] = items
+    compiled['hosts'] = hosts
+    compiled['products'] = products
+    compiled['aliases'] = aliases
+    # Sorted once here (and cached), so runs start from a ready index
+    compiled['subscriptions'] = _sorted_subscriptions(subscriptions)
+    compiled.setdefault('notification', {'enabled': False})
+    return compiled
+
+
+def _sorted_subscriptions(subscriptions):
+    """{product_key: {subscriber_id: threshold}} -> {product_key: [[threshold, subscriber_id], ...]} sorted"""
+    return {
+        key: sorted([threshold, subscriber_id] for subscriber_id, threshold in by_id.items())
+        for key, by_id in subscriptions.items()
+    }
+
+
+def subscription_map(items):
+    """Compiled-style subscription map for compiled items (e.g. a config snapshot's)"""
+    subscriptions = {}
+    for item in items:
+        for subscriber in item.get('subscribers', []):
+            subscriptions.setdefault(item['product_key'], {})[subscriber['id']] = subscriber['threshold']
+    return _sorted_subscriptions(subscriptions)
+
+
+def _watchlist_paths(config_path, config):
+    """Resolve the config's watchlist paths/globs, in a stable order"""
+    paths = []
+    for pattern in config.get('watchlists', []):
+        matches = sorted(config_path.parent.glob(pattern))
+        paths.extend(path for path in matches if path not in paths and path != config_path)
+    return paths
+
+
+def _file_digests(paths):
+    digests = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            digests[str(path)] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+def _cache_path(config_path, digest):
+    return CACHE_DIR / f"{config_path.stem}-{digest}.v{COMPILER_VERSION}.json"
+
+
+def compile_config(config_path=None, use_cache=True):
+    """
+    Load config.json, validated and compiled, from cache when unchanged
+
+    Args:
+        config_path: Path to the config file (defaults to config.json)
+        use_cache: Read/write the compiled cache
+
+    Returns:
+        dict: Compiled config
+
+    Raises:
+        ValueError: If the config fails validation
+    """
+    config_path = Path(config_path or CONFIG_FILE)
+    with open(config_path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    cache_path = _cache_path(config_path, digest)
+
+    if use_cache and cache_path.exists():
+        try:
+            cached = json_codec.load_file(cache_path)
+            # Watchlists are separate files; the cache is only good if they're unchanged too
+            watchlist_paths = [Path(path) for path in cached.get('watchlist_hashes', {})]
+            if (_watchlist_paths(config_path, cached) == watchlist_paths
+                    and _file_digests(watchlist_paths) == cached.get('watchlist_hashes', {})):
+                return cached
+        except (OSError, json_codec.JSONDecodeError):
+            pass
+
+    config = json_codec.loads(raw)
+    errors = validate_config(config)
+    watchlists = []
+    watchlist_paths = _watchlist_paths(config_path, config) if not errors else []
+    for path in watchlist_paths:
+        watchlist = json_codec.load_file(path)
+        errors.extend(f"{path.name}: {error}" for error in validate_config(watchlist))
+        watchlists.append((path.stem, watchlist))
+    if errors:
+        raise ValueError(f"Invalid config {config_path.name}:\n  " + "\n  ".join(errors))
+
+    compiled = compile_items(config, watchlists)
+    compiled['source_hash'] = digest
+    compiled['watchlist_hashes'] = _file_digests(watchlist_paths)
+
+    if use_cache:
+        CACHE_DIR.mkdir(exist_ok=True)
+        # Only the current compilation of each config file is worth keeping
+        for stale in CACHE_DIR.glob(f"{config_path.stem}-*.json"):
+            if stale != cache_path:
+                stale.unlink()
+        json_codec.save_file(cache_path, compiled)
+
+    return compiled
+
+
+def load_config_snapshot(snapshot_file=SNAPSHOT_FILE):
+    """
+    Load the items recorded by the last run
+
+    Returns:
+        dict: watch_id -> compiled item, or None if no run has recorded one
+    """
+    if not Path(snapshot_file).exists():
+        return None
+    return json_codec.load_file(snapshot_file).get('items', {})
+
+
+def save_config_snapshot(config, previous=None, pending=(), snapshot_file=SNAPSHOT_FILE):
+    """
+    Record the compiled items a run has dealt with
+
+    Args:
+        config: Compiled config the run used
+        previous: Snapshot items from load_config_snapshot
+        pending: watch_ids the run didn't get to (e.g. deferred by the
+                 deadline); they keep their previous snapshot entry, or
+                 are left out, so the next incremental run still checks them
+        snapshot_file: Where to write the snapshot
+    """
+    previous = previous or {}
+    pending = set(pending)
+    items = {}
+    for item in config['items']:
+        watch_id = item['watch_id']
+        if watch_id not in pending:
+            items[watch_id] = item
+        elif watch_id in previous:
+            items[watch_id] = previous[watch_id]
+    json_codec.save_file(snapshot_file, {'source_hash': config.get('source_hash'), 'items': items})
+
+
+def diff_config(snapshot, config):
+    """
+    Compare compiled config items with a snapshot
+
+    Args:
+        snapshot: watch_id -> item from load_config_snapshot
+        config: Compiled config
+
+    Returns:
+        dict: watch_id lists under 'added', 'modified' (URL, search term
+              or anything else that needs a fetch), 'threshold_only'
+              (only THRESHOLD_FIELDS changed) and 'removed'
+    """
+    changes = {'added': [], 'modified': [], 'threshold_only': [], 'removed': []}
+    current_ids = set()
+    for item in config['items']:
+        watch_id = item['watch_id']
+        current_ids.add(watch_id)
+        before = snapshot.get(watch_id)
+        if before is None:
+            changes['added'].append(watch_id)
+            continue
+        changed = {field for field in before.keys() | item.keys() if before.get(field) != item.get(field)}
+        if not changed:
+            continue
+        changes['threshold_only' if changed <= THRESHOLD_FIELDS else 'modified'].append(watch_id)
+    changes['removed'] = [watch_id for watch_id in snapshot if watch_id not in current_ids]
+    return changes
+
+
+def print_diff(changes):
+    """Print a diff_config result"""
+    labels = [('added', "new"), ('modified', "changed (will be fetched)"),
+              ('threshold_only', "threshold-only (re-evaluated from stored prices)"), ('removed', "removed")]
+    for key, label in labels:
+        if changes[key]:
+            print(f"  {len(changes[key])} {label}: {', '.join(changes[key])}")
+    if not any(changes.values()):
+        print("  no item changes")
+
+
+def main():
+    args = sys.argv[1:]
+    show_diff = '--diff' in args
+    args = [arg for arg in args if arg != '--diff']
+    config_path = args[0] if args else CONFIG_FILE
+    try:
+        compiled = compile_config(config_path, use_cache=False)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if show_diff:
+        snapshot = load_config_snapshot()
+        if snapshot is None:
+            print("No config snapshot yet; the next run checks every item")
+        else:
+            print("Changes since the last run:")
+            print_diff(diff_config(snapshot, compiled))
+        return
+
+    print(f"✅ {len(compiled['items'])} items valid, {len(compiled['products'])} unique products")
+    for host, item_ids in compiled['hosts'].items():
+        print(f"  {host}: {len(item_ids)} items")
+    for key, watch_ids in compiled['products'].items():
+        if len(watch_ids) > 1:
+            print(f"  {key} is watched by {', '.join(watch_ids)} (fetched once per run)")
+
+
+if __name__ == "__main__":
+    main()
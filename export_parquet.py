@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Columnar Export of Observation History
+Writes the observation history to a Parquet dataset through Arrow, so
+notebooks can read just the columns and partitions they need instead of
+parsing nested JSON.
+
+Layout (hive partitioning, readable by pyarrow, DuckDB, Spark, ...):
+    exports/parquet/month=2025-11/item_id=4000285678/part-<run>-0.parquet
+
+Columns:
+    timestamp        timestamp[us]
+    price_cents      int64 (null if the check failed)
+    threshold_cents  int64 (null if unknown)
+    source           dictionary<string>  ('check', 'backfill', 'legacy', 'rollup', ...)
+    check_count      int32               (legacy rows: checks the row stands for)
+    last_seen        timestamp[us]       (legacy rows: last check at this price)
+    item_id          dictionary<string>  (partition key)
+    month            string              (partition key)
+
+Exports are incremental: observations.jsonl is append-only, so the byte
+offset already exported is kept as a watermark in _export_state.json and
+only lines after it are read. price_check_history.json (the old
+single-product log, no item IDs; now kept as price_intervals.json) is
+exported once as source 'legacy', one row per price interval: timestamp
+is its first check, last_seen its last and check_count the checks in
+between (their individual times weren't kept).
+A fresh export also includes the price-change points of observations the
+retention policy has already rolled up (source 'rollup').
+
+Backfill corrections replace the row they supersede (same item and
+timestamp): the partitions holding those rows are rewritten without them
+before the new rows are appended.
+
+Requires pyarrow (optional dependency): pip install pyarrow
+
+Usage:
+    python export_parquet.py              # append new observations
+    python export_parquet.py --full       # rebuild the dataset from scratch
+"""
+
+import argparse
+import re
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import json_codec
+from history_store import OBSERVATIONS_FILE, is_correction, log_anchor, read_new_observations, resume_offset
+from price_intervals import INTERVALS_FILE, load_intervals
+from retention import rollup_observations
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pc = None
+    ds = None
+    pq = None
+
+EXPORT_DIR = Path(__file__).parent / "exports" / "parquet"
+LEGACY_HISTORY_FILE = Path(__file__).parent / "price_check_history.json"
+STATE_FILE_NAME = "_export_state.json"  # underscore: skipped by dataset discovery
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+
+def _schema():
+    return pa.schema([
+        ('timestamp', pa.timestamp('us')),
+        ('price_cents', pa.int64()),
+        ('threshold_cents', pa.int64()),
+        ('source', pa.dictionary(pa.int32(), pa.string())),
+        ('check_count', pa.int32()),
+        ('last_seen', pa.timestamp('us')),
+        ('item_id', pa.dictionary(pa.int32(), pa.string())),
+        ('month', pa.string()),
+    ])
+
+
+def _file_schema():
+    # Columns stored in each file; month and item_id live in the path
+    schema = _schema()
+    return pa.schema([field for field in schema if field.name not in ('item_id', 'month')])
+
+
+def to_cents(price):
+    """Dollar float -> integer cents (None stays None)"""
+    return None if price is None else int(round(price * 100))
+
+
+def _legacy_item_id(product):
+    slug = re.sub(r'[^a-z0-9]+', '-', product.lower()).strip('-')
+    return f"legacy-{slug}"
+
+
+def load_export_state(export_dir=EXPORT_DIR):
+    """Watermark of what has already been exported"""
+    return json_codec.load_file(
+        Path(export_dir) / STATE_FILE_NAME,
+        empty=lambda: {'observations_offset': 0, 'legacy_exported': False, 'rows': 0}
+    )
+
+
+def save_export_state(state, export_dir=EXPORT_DIR):
+    """Persist the export watermark"""
+    json_codec.save_file(Path(export_dir) / STATE_FILE_NAME, state, pretty=True)
+
+
+def read_legacy_history(legacy_file=LEGACY_HISTORY_FILE, intervals_file=INTERVALS_FILE):
+    """Rows for the old single-product log: one per price interval"""
+    rows = []
+    for product, intervals in load_intervals(intervals_file, legacy_file).items():
+        for interval in intervals:
+            rows.append({
+                'item_id': _legacy_item_id(product),
+                'price': interval['price'],
+                'threshold': interval.get('threshold'),
+                'timestamp': interval['first_seen'],
+                'last_seen': interval['last_seen'],
+                'check_count': interval['check_count'],
+                'source': 'legacy'
+            })
+    return rows
+
+
+def observations_to_table(observations):
+    """Build an Arrow table (int-cent prices, dictionary-encoded ids)"""
+    _require_pyarrow()
+    timestamps = [datetime.fromisoformat(o['timestamp']) for o in observations]
+    columns = {
+        'timestamp': pa.array(timestamps, type=pa.timestamp('us')),
+        'price_cents': pa.array([to_cents(o.get('price')) for o in observations], type=pa.int64()),
+        'threshold_cents': pa.array([to_cents(o.get('threshold')) for o in observations], type=pa.int64()),
+        'source': pa.array([o.get('source', 'check') for o in observations]).dictionary_encode(),
+        'check_count': pa.array([o.get('check_count') for o in observations], type=pa.int32()),
+        'last_seen': pa.array([datetime.fromisoformat(o['last_seen']) if o.get('last_seen') else None
+                               for o in observations], type=pa.timestamp('us')),
+        'item_id': pa.array([str(o['item_id']) for o in observations]).dictionary_encode(),
+        'month': pa.array([ts.strftime('%Y-%m') for ts in timestamps], type=pa.string()),
+    }
+    return pa.table(columns, schema=_schema())
+
+
+def _partitioning():
+    return ds.partitioning(
+        pa.schema([('month', pa.string()), ('item_id', pa.dictionary(pa.int32(), pa.string()))]),
+        flavor='hive'
+    )
+
+
+def write_partitions(table, export_dir=EXPORT_DIR):
+    """Append a table to the dataset as new files in its partitions"""
+    run_tag = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    ds.write_dataset(
+        table, export_dir, format='parquet',
+        partitioning=_partitioning(),
+        basename_template=f"part-{run_tag}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+
+def apply_corrections(observations, export_dir=EXPORT_DIR):
+    """
+    Drop the rows backfill corrections supersede
+
+    Superseded observations in the same batch are filtered out; rows
+    already exported are removed by rewriting their partitions.
+
+    Args:
+        observations: Observations about to be written
+        export_dir: Dataset root
+
+    Returns:
+        tuple: (observations to write, exported rows removed)
+    """
+    corrected = {}
+    for observation in observations:
+        if is_correction(observation):
+            corrected[(str(observation['item_id']), observation['timestamp'])] = observation
+    if not corrected:
+        return observations, 0
+    observations = [o for o in observations
+                    if corrected.get((str(o['item_id']), o['timestamp']), o) is o]
+
+    removed = 0
+    by_partition = {}
+    for item_id, timestamp in corrected:
+        parsed = datetime.fromisoformat(timestamp)
+        by_partition.setdefault((parsed.strftime('%Y-%m'), item_id), []).append(parsed)
+    for (month, item_id), timestamps in by_partition.items():
+        partition = Path(export_dir) / f"month={month}" / f"item_id={item_id}"
+        files = sorted(partition.glob('*.parquet'))
+        if not files:
+            continue
+        # Files written before a column was added read it as null
+        table = ds.dataset(files, format='parquet', schema=_file_schema()).to_table()
+        superseded = pc.is_in(table['timestamp'], value_set=pa.array(timestamps, type=pa.timestamp('us')))
+        count = pc.sum(superseded.cast(pa.int64())).as_py()
+        if not count:
+            continue
+        removed += count
+        tmp_path = partition / f"_rewrite-{files[0].name}"
+        pq.write_table(table.filter(pc.invert(superseded)), tmp_path)
+        for path in files:
+            path.unlink()
+        tmp_path.rename(partition / files[0].name)
+    return observations, removed
+
+
+def export(export_dir=EXPORT_DIR, full=False, observations_file=OBSERVATIONS_FILE,
+           legacy_file=LEGACY_HISTORY_FILE):
+    """
+    Export observations written since the last export
+
+    Args:
+        export_dir: Dataset root
+        full: Drop the dataset and re-export everything
+        observations_file: Observation log to read
+        legacy_file: Old price_check_history.json to include once
+
+    Returns:
+        dict: Rows written, rows total, and seconds taken
+    """
+    _require_pyarrow()
+    export_dir = Path(export_dir)
+    start = time.perf_counter()
+
+    state = load_export_state(export_dir)
+    # Retention compaction moves offsets; find the watermark's line again
+    offset = resume_offset(state['observations_offset'], state.get('observations_anchor'), observations_file)
+    if full or offset is None:
+        shutil.rmtree(export_dir, ignore_errors=True)
+        state = {'observations_offset': 0, 'legacy_exported': False, 'rows': 0}
+        offset = 0
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    observations, offset = read_new_observations(offset, observations_file)
+    if not state['legacy_exported']:
+        observations = read_legacy_history(legacy_file) + rollup_observations() + observations
+
+    observations, removed = apply_corrections(observations, export_dir)
+    if observations:
+        write_partitions(observations_to_table(observations), export_dir)
+
+    state.update({
+        'observations_offset': offset,
+        'observations_anchor': log_anchor(offset, observations_file),
+        'legacy_exported': True,
+        'rows': state['rows'] + len(observations) - removed,
+        'last_export': datetime.now().isoformat()
+    })
+    save_export_state(state, export_dir)
+    return {'written': len(observations), 'total': state['rows'], 'seconds': time.perf_counter() - start}
+
+
+def open_dataset(export_dir=EXPORT_DIR):
+    """
+    Open the exported dataset for column/partition-pruned reads, e.g.
+
+        dataset = open_dataset()
+        table = dataset.to_table(columns=['timestamp', 'price_cents'],
+                                 filter=ds.field('item_id') == '4000285678')
+    """
+    _require_pyarrow()
+    # Discovery alone would read item_id=4000285678 as an integer
+    partitioning = ds.HivePartitioning.discover(schema=_partitioning().schema)
+    dataset = ds.dataset(export_dir, format='parquet', partitioning=partitioning)
+    # Files written before a column was added read it as null
+    return dataset.replace_schema(pa.unify_schemas([_file_schema(), dataset.schema]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export observation history to Parquet")
+    parser.add_argument('--output', default=str(EXPORT_DIR), help="Dataset directory")
+    parser.add_argument('--full', action='store_true', help="Rebuild the dataset from scratch")
+    args = parser.parse_args()
+
+    try:
+        result = export(Path(args.output), full=args.full)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"✅ Exported {result['written']} new observations "
+          f"({result['total']} total) in {result['seconds']:.2f}s → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,22 +8,29 @@ Exit Codes:
 - 1: Engraving is NOT available (message present) - workflow passes silently
 """
 
-import json
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import requests
 from bs4 import BeautifulSoup
 
+import http_client
+import json_codec
+from retention import DEFAULT_POLICY, keep_change_points
+
+
+# Own breaker/latency state: the price tracker workflow commits the shared files
+BREAKERS_FILE = Path(__file__).parent / "fossil_circuit_breakers.json"
+LATENCY_FILE = Path(__file__).parent / "fossil_latency_stats.json"
+
 
 def load_fossil_config():
     """Load Fossil product configuration"""
     config_path = Path(__file__).parent / "fossil_config.json"
     if config_path.exists():
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return json_codec.load_file(config_path)
     return {
         "product_url": "https://www.fossil.com/en-us/products/colleen-three-hand-two-tone-stainless-steel-watch/BQ3908.html",
         "product_name": "Colleen Three-Hand Two-Tone Stainless Steel Watch",
@@ -33,18 +40,12 @@ def load_fossil_config():
 
 def load_engraving_history():
     """Load engraving availability history"""
-    history_path = Path(__file__).parent / "engraving_history.json"
-    if history_path.exists():
-        with open(history_path, 'r') as f:
-            return json.load(f)
-    return {}
+    return json_codec.load_file(Path(__file__).parent / "engraving_history.json")
 
 
 def save_engraving_history(history):
     """Save engraving availability history"""
-    history_path = Path(__file__).parent / "engraving_history.json"
-    with open(history_path, 'w') as f:
-        json.dump(history, f, indent=2)
+    json_codec.save_file(Path(__file__).parent / "engraving_history.json", history, pretty=True)
 
 
 def check_engraving_availability(url, product_id):
@@ -67,7 +68,6 @@ def check_engraving_availability(url, product_id):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
             'Sec-Fetch-Dest': 'document',
@@ -79,9 +79,7 @@ def check_engraving_availability(url, product_id):
         print(f"[Checking] Engraving availability for product {product_id}")
         print(f"  URL: {url}")
         
-        # Create a session for better connection handling
-        session = requests.Session()
-        response = session.get(url, headers=headers, timeout=30, allow_redirects=True)
+        response = http_client.get(url, headers=headers, timeout=30, allow_redirects=True)
         
         # Check for common blocking status codes
         if response.status_code == 403:
@@ -125,6 +123,13 @@ def check_engraving_availability(url, product_id):
                 'status_code': response.status_code
             }
         
+    except http_client.HostUnavailable as e:
+        print(f"  ⏭️  {e}")
+        return {
+            'available': None,
+            'message': 'Skipped - circuit open after repeated blocking',
+            'timestamp': datetime.now().isoformat()
+        }
     except requests.exceptions.HTTPError as e:
         print(f"  ⚠️ HTTP Error: {e}")
         return {
@@ -185,7 +190,7 @@ The engraving feature is now available for this product! The inventory limitatio
     }
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = requests.post(api_url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
         print(f"✅ GitHub issue created for {product_name}")
     except Exception as e:
@@ -194,6 +199,7 @@ The engraving feature is now available for this product! The inventory limitatio
 
 def check_engraving():
     """Main function to check engraving availability"""
+    http_client.use_state_files(BREAKERS_FILE, LATENCY_FILE)
     config = load_fossil_config()
     history = load_engraving_history()
     
@@ -222,12 +228,13 @@ def check_engraving():
     history[product_id]['last_checked'] = result['timestamp']
     history[product_id]['currently_available'] = result['available']
     
-    # Keep only last 50 checks
-    if len(history[product_id]['checks']) > 50:
-        history[product_id]['checks'] = history[product_id]['checks'][-50:]
+    # Keep recent checks; older ones only where availability changed
+    raw_cutoff = (datetime.now() - timedelta(days=DEFAULT_POLICY['raw_days'])).isoformat()
+    history[product_id]['checks'] = keep_change_points(history[product_id]['checks'], 'available', raw_cutoff)
     
     # Save history
     save_engraving_history(history)
+    http_client.save_state()
     
     print("\n" + "=" * 80)
     print("Check Complete")
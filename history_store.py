@@ -0,0 +1,256 @@
+"""
+Observation History Store
+Append-only log of every price observation (one JSON object per line).
+
+price_history.json only keeps the latest price per item; this store keeps
+the full time series so backfills, reports and exports have something to
+work from.
+"""
+
+import hashlib
+import itertools
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import json_codec
+
+OBSERVATIONS_FILE = Path(__file__).parent / "observations.jsonl"
+
+# Held for every append; retention compaction takes it to swap in the compacted log
+APPEND_LOCK = threading.Lock()
+
+# One id per process, written with every observation and page archive entry,
+# so a backfill can find the observation an archived page produced
+RUN_ID = os.environ.get('GITHUB_RUN_ID') or datetime.now().strftime('%Y%m%dT%H%M%S')
+
+_check_ids = itertools.count(1)
+
+# Corrections written by backfill.py carry this source and the timestamp of
+# the observation they replace
+BACKFILL_SOURCE = 'backfill'
+
+# Bytes read back from a watermark at a time when looking for its line
+ANCHOR_WINDOW = 4096
+
+
+def make_observation(item_id, price, timestamp=None, source='check', **fields):
+    """
+    Build an observation record
+
+    Args:
+        item_id: Tracked item id
+        price: Observed price (None if the check failed)
+        timestamp: ISO timestamp (defaults to now)
+        source: Where the observation came from ('check', 'backfill', ...)
+        **fields: Extra fields to store with the record
+
+    Returns:
+        dict: Observation record
+    """
+    observation = {
+        'item_id': item_id,
+        'price': price,
+        'timestamp': timestamp or datetime.now().isoformat(),
+        'source': source,
+        'run_id': RUN_ID
+    }
+    observation.update(fields)
+    return observation
+
+
+def new_check_id():
+    """
+    Id for one check of one item
+
+    A multi-store check writes one observation per store, all with the
+    same check_id; readers fold them into the check's best price.
+    """
+    return f"{RUN_ID}-{next(_check_ids)}"
+
+
+def same_check(observation, previous):
+    """
+    True if a store observation belongs to the same check as previous
+
+    Args:
+        observation: Observation being read
+        previous: (check_id, timestamp) of the last point the reader kept,
+                  or None
+
+    Observations written before check ids fall back to the old rule:
+    store observations from the same minute.
+    """
+    if observation.get('store') is None or previous is None:
+        return False
+    check_id, timestamp = previous
+    if observation.get('check_id') is not None or check_id is not None:
+        return observation.get('check_id') == check_id
+    return observation['timestamp'][:16] == timestamp[:16]
+
+
+def supersede_key(observation):
+    """
+    Key a backfill correction shares with the observation it replaces
+
+    A 'backfill' observation replaces every earlier observation with the
+    same (item_id, store, timestamp); readers keep the latest one.
+    """
+    return str(observation['item_id']), observation.get('store'), observation['timestamp']
+
+
+def is_correction(observation):
+    """True for a backfill correction (see supersede_key)"""
+    return observation.get('source') == BACKFILL_SOURCE
+
+
+def append_observations(observations, observations_file=OBSERVATIONS_FILE):
+    """
+    Append observations to the store in one write
+
+    Args:
+        observations: Iterable of observation dicts
+        observations_file: Log to append to
+
+    Returns:
+        int: Number of observations written
+    """
+    lines = [json_codec.dump_bytes(observation) + b'\n' for observation in observations]
+    if lines:
+        with APPEND_LOCK, open(observations_file, 'ab') as f:
+            f.writelines(lines)
+    return len(lines)
+
+
+def append_observation(item_id, price, timestamp=None, source='check', **fields):
+    """Append a single observation to the store"""
+    observation = make_observation(item_id, price, timestamp, source, **fields)
+    append_observations([observation])
+    return observation
+
+
+def iter_observations(item_id=None):
+    """
+    Stream observations in write order
+
+    Args:
+        item_id: Only yield observations for this item (optional)
+
+    Yields:
+        dict: Observation record
+    """
+    if not OBSERVATIONS_FILE.exists():
+        return
+    with open(OBSERVATIONS_FILE, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                observation = json_codec.loads(line)
+            except json_codec.JSONDecodeError:
+                continue
+            if item_id is None or observation.get('item_id') == item_id:
+                yield observation
+
+
+def load_observations(item_id=None):
+    """Load observations into a list (see iter_observations)"""
+    return list(iter_observations(item_id))
+
+
+def read_new_observations(offset, observations_file=OBSERVATIONS_FILE):
+    """
+    Read observations appended after a byte offset
+
+    Returns:
+        tuple: (observations, new_offset). A trailing line without a
+               newline (a write in progress) is left for the next read.
+
+    Incremental readers (export_parquet, price_report, price_server) keep
+    new_offset as their watermark, with its log_anchor.
+    """
+    observations_file = Path(observations_file)
+    if not observations_file.exists():
+        return [], 0
+    observations = []
+    with open(observations_file, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                observations.append(json_codec.loads(line))
+            except json_codec.JSONDecodeError:
+                continue
+    return observations, offset
+
+
+def log_anchor(offset, observations_file=OBSERVATIONS_FILE):
+    """
+    Identify a read position by the line that ends at it
+
+    Retention compaction rewrites the log without its expired lines,
+    which moves every byte offset. Readers keep this anchor next to their
+    offset so resume_offset can find the same position again.
+
+    Returns:
+        list: [line length, sha1 of the line], or None at offset 0
+    """
+    if not offset:
+        return None
+    window = ANCHOR_WINDOW
+    with open(observations_file, 'rb') as f:
+        while True:
+            start = max(offset - window, 0)
+            f.seek(start)
+            data = f.read(offset - start)
+            # data ends with the newline of the line ending at offset
+            newline = data.rfind(b'\n', 0, len(data) - 1)
+            if newline >= 0 or start == 0:
+                line = data[newline + 1:]
+                return [len(line), hashlib.sha1(line).hexdigest()]
+            window *= 2
+
+
+def resume_offset(offset, anchor, observations_file=OBSERVATIONS_FILE):
+    """
+    Where a reader that stopped at offset continues in the current log
+
+    Args:
+        offset: The reader's watermark
+        anchor: log_anchor(offset) saved with it (None for watermarks
+                saved before anchors; those are trusted if still in range)
+        observations_file: Observation log
+
+    Returns:
+        int: offset itself if its anchor line still ends there, else the
+             anchor line's new end after a compaction; None if the line
+             is gone and the reader has to rebuild
+    """
+    if not offset:
+        return 0
+    observations_file = Path(observations_file)
+    size = observations_file.stat().st_size if observations_file.exists() else 0
+    if anchor is None:
+        return offset if offset <= size else None
+    length, digest = anchor
+    if length <= offset <= size:
+        with open(observations_file, 'rb') as f:
+            f.seek(offset - length)
+            if hashlib.sha1(f.read(length)).hexdigest() == digest:
+                return offset
+    if not size:
+        return None
+    position = 0
+    with open(observations_file, 'rb') as f:
+        for line in f:
+            position += len(line)
+            if len(line) == length and hashlib.sha1(line).hexdigest() == digest:
+                return position
+    return None
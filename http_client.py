@@ -0,0 +1,476 @@
+"""
+Shared HTTP Fetch Layer
+Every outbound page/API request in the checkers goes through get(), which
+applies per-host policies in one place:
+
+- Circuit breaker (circuit_breaker.py): requests to a host whose breaker
+  is open fail fast with HostUnavailable instead of waiting on a timeout.
+- Adaptive timeouts (latency_stats.py): once a host has enough samples,
+  its timeout is derived from observed p99 latency instead of the
+  caller's hard-coded default.
+- Hedged requests: for tail-latency-critical calls, a duplicate request is
+  sent after the host's p95 delay and whichever answers first wins, as
+  long as the run's hedge budget allows it.
+- Transport: requests (HTTP/1.1, the default) or httpx with HTTP/2
+  ("transport": {"backend": "httpx"}), which multiplexes concurrent
+  requests to a host over a few connections. Either way get() returns a
+  requests.Response and raises requests exceptions, so callers don't
+  change. httpx is an optional dependency (pip install "httpx[http2]").
+- Compression: Accept-Encoding is negotiated from the decoders actually
+  installed (br needs the brotli package, zstd needs zstandard), bodies
+  are decompressed incrementally as they stream in, and compressed vs
+  decompressed bytes are counted per host (transfer_stats). stream()
+  yields body chunks so a caller can stop reading once it has a price.
+
+Call configure(config) once per run to pick up settings from config.json,
+and save_state() at the end of the run to persist per-host state. A
+checker that runs in its own workflow calls use_state_files() first, so
+two workflows never commit the same state file.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.request import ACCEPT_ENCODING
+
+import circuit_breaker
+import latency_stats
+
+try:
+    import httpx
+except ImportError:  # optional dependency
+    httpx = None
+
+
+class HostUnavailable(requests.RequestException):
+    """Raised instead of sending a request to a host whose breaker is open"""
+
+    def __init__(self, host):
+        super().__init__(f"Circuit open for {host} - skipping request")
+        self.host = host
+
+
+_session = requests.Session()
+_lock = threading.Lock()
+_breakers = None
+_state_files = {'breakers': circuit_breaker.STATE_FILE, 'latency': latency_stats.STATS_FILE}
+_breaker_settings = dict(circuit_breaker.DEFAULT_SETTINGS)
+_latency = None
+_timeout_settings = dict(latency_stats.DEFAULT_SETTINGS)
+_hedge_settings = {'enabled': False, 'budget_percent': 10, 'pool_size': 32}
+_hedge_pool = None
+_hedge_pool_size = 0
+_hedge_session = None
+_transport_settings = {'backend': 'requests', 'http2': True, 'http1': True, 'max_connections': 10}
+_httpx_client = None
+run_stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+# host -> {'responses', 'wire_bytes', 'body_bytes', 'encodings': {coding: count}}
+transfer_stats = {}
+
+# Best first; only codings the installed decoders can handle are offered
+ENCODING_PREFERENCE = ['br', 'zstd', 'gzip', 'deflate']
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def accept_encoding():
+    """Accept-Encoding value listing the codings this install can decode"""
+    available = {coding.strip() for coding in ACCEPT_ENCODING.split(',')}
+    return ', '.join(coding for coding in ENCODING_PREFERENCE if coding in available)
+
+
+def _negotiated_headers(headers):
+    # Callers may advertise codings we can't decode (e.g. br without brotli)
+    headers = {key: value for key, value in (headers or {}).items() if key.lower() != 'accept-encoding'}
+    headers['Accept-Encoding'] = accept_encoding()
+    return headers
+
+
+def _record_transfer(host, wire_bytes, body_bytes, encoding):
+    with _lock:
+        host_stats = transfer_stats.setdefault(
+            host, {'responses': 0, 'wire_bytes': 0, 'body_bytes': 0, 'encodings': {}})
+        host_stats['responses'] += 1
+        host_stats['wire_bytes'] += wire_bytes
+        host_stats['body_bytes'] += body_bytes
+        encoding = encoding or 'identity'
+        host_stats['encodings'][encoding] = host_stats['encodings'].get(encoding, 0) + 1
+
+
+def configure(config):
+    """Apply fetch-layer settings from a config dict (config.json)"""
+    _breaker_settings.update(config.get('circuit_breaker', {}))
+    _timeout_settings.update(config.get('timeouts', {}))
+    _hedge_settings.update(config.get('hedging', {}))
+    _transport_settings.update(config.get('transport', {}))
+    if _transport_settings['backend'] == 'httpx' and httpx is None:
+        print("⚠️  httpx is not installed - using the requests transport")
+        _transport_settings['backend'] = 'requests'
+    # Every concurrent caller can hold a primary and a hedge at once
+    callers = max(config.get('stores', {}).get('workers', 0), _transport_settings['max_connections'])
+    _set_hedge_pool_size(max(_hedge_settings['pool_size'], 2 * callers))
+
+
+def _set_hedge_pool_size(size):
+    """(Re)create the hedge pool and its session with room for size requests"""
+    global _hedge_pool, _hedge_session, _hedge_pool_size
+    with _lock:
+        if _hedge_pool is not None and _hedge_pool_size == size:
+            return
+        old_pool, old_session = _hedge_pool, _hedge_session
+        _hedge_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix='hedge')
+        # Duplicates go out on their own session, shared by every hedge
+        _hedge_session = requests.Session()
+        _hedge_session.mount('https://', HTTPAdapter(pool_maxsize=size))
+        _hedge_session.mount('http://', HTTPAdapter(pool_maxsize=size))
+        _hedge_pool_size = size
+    if old_pool is not None:
+        old_pool.shutdown(wait=False)
+        old_session.close()
+
+
+def use_state_files(breakers_file, latency_file):
+    """
+    Keep per-host breaker and latency state in these files
+
+    Call before the first request; state already loaded is dropped.
+
+    Args:
+        breakers_file: Circuit breaker state (default circuit_breakers.json)
+        latency_file: Latency histograms (default latency_stats.json)
+    """
+    global _breakers, _latency
+    with _lock:
+        _state_files.update(breakers=breakers_file, latency=latency_file)
+        _breakers = None
+        _latency = None
+
+
+def _breaker_state():
+    global _breakers
+    if _breakers is None:
+        _breakers = circuit_breaker.load_breakers(_state_files['breakers'])
+    return _breakers
+
+
+def _latency_state():
+    global _latency
+    if _latency is None:
+        _latency = latency_stats.load_latency_stats(_state_files['latency'])
+    return _latency
+
+
+def host_of(url):
+    """Lower-cased host of a URL"""
+    return (urlsplit(url).hostname or '').lower()
+
+
+def is_host_available(url):
+    """True if the host's breaker would currently let a request through"""
+    host_state = _breaker_state().get(host_of(url))
+    return not host_state or host_state['state'] == circuit_breaker.CLOSED
+
+
+def timeout_for(url, default=30):
+    """Timeout for a request to url: host p99-derived, or default"""
+    return latency_stats.adaptive_timeout(_latency_state(), host_of(url), default, _timeout_settings)
+
+
+def _get_httpx_client():
+    global _httpx_client
+    with _lock:
+        if _httpx_client is None:
+            http2 = _transport_settings['http2']
+            try:
+                import h2  # noqa: F401  (httpx needs it for HTTP/2)
+            except ImportError:
+                http2 = False
+            limit = _transport_settings['max_connections']
+            _httpx_client = httpx.Client(
+                http2=http2,
+                # http1=False means HTTP/2 prior knowledge (h2c) for http:// URLs
+                http1=_transport_settings['http1'] or not http2,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+                follow_redirects=True
+            )
+        return _httpx_client
+
+
+def _httpx_get(url, timeout, kwargs):
+    """GET through the shared httpx client, returned as a requests.Response"""
+    try:
+        result = _get_httpx_client().get(
+            url, headers=kwargs.get('headers'), params=kwargs.get('params'),
+            cookies=kwargs.get('cookies'), timeout=timeout,
+            follow_redirects=kwargs.get('allow_redirects', True)
+        )
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.ConnectionError(str(e)) from e
+
+    _record_transfer(host_of(url), result.num_bytes_downloaded, len(result.content),
+                     result.headers.get('Content-Encoding'))
+    response = requests.Response()
+    response.status_code = result.status_code
+    response.reason = result.reason_phrase
+    response.headers = CaseInsensitiveDict(result.headers)
+    response.url = str(result.url)
+    response.encoding = result.encoding
+    response._content = result.content
+    response.elapsed = result.elapsed
+    return response
+
+
+def _read_body(url, response):
+    """Read a streamed requests body, decompressing chunk by chunk"""
+    chunks = []
+    try:
+        for chunk in response.raw.stream(STREAM_CHUNK_SIZE, decode_content=True):
+            chunks.append(chunk)
+    except Exception as e:
+        response.close()
+        raise requests.ConnectionError(f"Error reading body: {e}") from e
+    response._content = b''.join(chunks)
+    response._content_consumed = True
+    # raw.tell() counts bytes as they came off the wire (still compressed)
+    _record_transfer(host_of(url), response.raw.tell(), len(response._content),
+                     response.headers.get('Content-Encoding'))
+    return response
+
+
+def _timed_get(session, url, timeout, kwargs):
+    start = time.perf_counter()
+    if _transport_settings['backend'] == 'httpx':
+        response = _httpx_get(url, timeout, kwargs)
+    else:
+        response = _read_body(url, session.get(url, timeout=timeout, stream=True, **kwargs))
+    return response, time.perf_counter() - start
+
+
+def _hedge_allowed():
+    budget = _hedge_settings.get('budget_percent', 10) / 100
+    return run_stats['hedged'] < max(1, run_stats['requests'] * budget)
+
+
+def _close_response(future):
+    """Release the connection held by a hedge race's losing response"""
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
+
+
+def _hedged_get(session, url, timeout, delay, kwargs, send=None):
+    """
+    Send a request; if it is slower than delay, race a duplicate
+
+    send(session, url, timeout, kwargs) returns (response, elapsed); the
+    default, _timed_get, reads the whole body, _open_stream only the headers.
+    """
+    send = send or _timed_get
+    if _hedge_pool is None:
+        _set_hedge_pool_size(_hedge_settings['pool_size'])
+    primary = _hedge_pool.submit(send, session, url, timeout, kwargs)
+    done, _ = wait([primary], timeout=delay)
+    # A primary still queued behind other requests isn't slow at the host
+    if done or not primary.running() or not _hedge_allowed():
+        return primary.result()
+
+    with _lock:
+        run_stats['hedged'] += 1
+    # requests.Session isn't guaranteed thread-safe; hedges use their own
+    hedge = _hedge_pool.submit(send, _hedge_session, url, timeout, kwargs)
+    futures = [primary, hedge]
+    while futures:
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            futures.remove(future)
+            if future.exception() is None:
+                if future is hedge:
+                    with _lock:
+                        run_stats['hedge_wins'] += 1
+                for loser in futures:
+                    loser.add_done_callback(_close_response)
+                return future.result()
+    # Both failed: surface the primary's error
+    return primary.result()
+
+
+def get(url, headers=None, timeout=30, session=None, hedge=False, **kwargs):
+    """
+    GET a URL through the fetch layer
+
+    Args:
+        url: URL to fetch
+        headers: Request headers
+        timeout: Default timeout in seconds, used until the host has
+                 enough latency samples for an adaptive one
+        session: requests.Session to use (defaults to the shared session;
+                 ignored by the httpx transport, which has one shared client)
+        hedge: Allow a hedged duplicate if the response is slower than p95
+               (only when hedging is enabled in config)
+        **kwargs: Passed through to requests
+
+    Returns:
+        requests.Response
+
+    Raises:
+        HostUnavailable: If the host's circuit breaker is open
+        requests.RequestException: On transport errors
+    """
+    host, timeout, delay = _admit(url, timeout, hedge)
+    session = session or _session
+    kwargs['headers'] = _negotiated_headers(headers)
+
+    try:
+        if delay is not None and _hedge_settings.get('enabled'):
+            response, elapsed = _hedged_get(session, url, timeout, delay, kwargs)
+        else:
+            response, elapsed = _timed_get(session, url, timeout, kwargs)
+    except requests.RequestException as e:
+        _record_failure(host, timeout, e)
+        raise
+
+    _record_response(host, elapsed, response.status_code)
+    return response
+
+
+def _admit(url, timeout, hedge=False):
+    """Breaker check plus adaptive timeout/hedge delay; returns (host, timeout, delay)"""
+    host = host_of(url)
+    state = _breaker_state()
+    stats = _latency_state()
+    # Per-host state is shared by callers fetching from several threads
+    with _lock:
+        if not circuit_breaker.allow_request(state, host, _breaker_settings):
+            raise HostUnavailable(host)
+        timeout = latency_stats.adaptive_timeout(stats, host, timeout, _timeout_settings)
+        delay = latency_stats.hedge_delay(stats, host, _timeout_settings) if hedge else None
+        run_stats['requests'] += 1
+    return host, timeout, delay
+
+
+def _record_failure(host, timeout, error):
+    with _lock:
+        if isinstance(error, requests.Timeout):
+            # A timeout is a latency sample too, or p99 could never grow
+            latency_stats.record_latency(_latency_state(), host, timeout)
+        circuit_breaker.record_outcome(_breaker_state(), host, error=True, settings=_breaker_settings)
+
+
+def _record_response(host, elapsed, status_code):
+    with _lock:
+        latency_stats.record_latency(_latency_state(), host, elapsed)
+        new_state = circuit_breaker.record_outcome(_breaker_state(), host, status_code, settings=_breaker_settings)
+    if new_state == circuit_breaker.OPEN:
+        print(f"  🚧 Circuit opened for {host} (status {status_code})")
+
+
+def stream(url, headers=None, timeout=30, session=None, chunk_size=STREAM_CHUNK_SIZE, hedge=False):
+    """
+    GET a URL through the fetch layer, yielding decompressed body chunks
+
+    Stop iterating (or close the generator) to abandon the rest of the
+    body, e.g. once an extractor has found the price. Latency is measured
+    to the response headers; bytes are counted up to where reading stopped.
+    With hedge=True the race is on the response headers, as in get(): the
+    body is read from whichever response arrived first.
+
+    Raises:
+        HostUnavailable: If the host's circuit breaker is open
+        requests.HTTPError: For 4xx/5xx responses (before any chunk)
+        requests.RequestException: On transport errors
+    """
+    host, timeout, delay = _admit(url, timeout, hedge)
+    kwargs = {'headers': _negotiated_headers(headers)}
+    session = session or _session
+    try:
+        if delay is not None and _hedge_settings.get('enabled'):
+            response, elapsed = _hedged_get(session, url, timeout, delay, kwargs, send=_open_stream)
+        else:
+            response, elapsed = _open_stream(session, url, timeout, kwargs)
+    except requests.RequestException as e:
+        _record_failure(host, timeout, e)
+        raise
+    _record_response(host, elapsed, response.status_code)
+
+    if isinstance(response, requests.Response):
+        yield from _requests_chunks(host, response, chunk_size)
+    else:
+        yield from _httpx_chunks(url, host, response, timeout, chunk_size)
+
+
+def _open_stream(session, url, timeout, kwargs):
+    """Send a GET and return (response, elapsed) once its headers arrive, body unread"""
+    start = time.perf_counter()
+    if _transport_settings['backend'] == 'httpx':
+        client = _get_httpx_client()
+        try:
+            response = client.send(client.build_request('GET', url, headers=kwargs['headers'], timeout=timeout),
+                                   stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+    else:
+        response = session.get(url, timeout=timeout, stream=True, **kwargs)
+    return response, time.perf_counter() - start
+
+
+def _requests_chunks(host, response, chunk_size):
+    body_bytes = 0
+    try:
+        response.raise_for_status()
+        for chunk in response.raw.stream(chunk_size, decode_content=True):
+            body_bytes += len(chunk)
+            yield chunk
+    finally:
+        _record_transfer(host, response.raw.tell(), body_bytes, response.headers.get('Content-Encoding'))
+        response.close()
+
+
+def _httpx_chunks(url, host, response, timeout, chunk_size):
+    body_bytes = 0
+    try:
+        if response.status_code >= 400:
+            raise requests.HTTPError(f"{response.status_code} {response.reason_phrase} for url: {url}")
+        for chunk in response.iter_bytes(chunk_size):
+            body_bytes += len(chunk)
+            yield chunk
+    except httpx.TimeoutException as e:
+        _record_failure(host, timeout, requests.Timeout(str(e)))
+        raise requests.Timeout(str(e)) from e
+    except httpx.HTTPError as e:
+        _record_failure(host, timeout, e)
+        raise requests.ConnectionError(str(e)) from e
+    finally:
+        _record_transfer(host, response.num_bytes_downloaded, body_bytes, response.headers.get('Content-Encoding'))
+        response.close()
+
+
+def save_state():
+    """Persist per-host state collected during this run"""
+    if _breakers is not None:
+        circuit_breaker.save_breakers(_breakers, _state_files['breakers'])
+    if _latency is not None:
+        latency_stats.save_latency_stats(_latency, _state_files['latency'])
+
+
+def summary_lines():
+    """Describe hosts whose breaker is not closed"""
+    return circuit_breaker.describe(_breaker_state())
+
+
+def transfer_summary_lines():
+    """Per-host bytes on the wire vs decompressed, for run summaries"""
+    lines = []
+    for host, host_stats in sorted(transfer_stats.items()):
+        wire, body = host_stats['wire_bytes'], host_stats['body_bytes']
+        saved = (1 - wire / body) * 100 if body else 0
+        encodings = ', '.join(f"{coding} x{count}" for coding, count in sorted(host_stats['encodings'].items()))
+        lines.append(f"{host}: {host_stats['responses']} responses, {wire / 1e6:.2f} MB on the wire, "
+                     f"{body / 1e6:.2f} MB decompressed ({saved:.0f}% saved; {encodings})")
+    return lines
@@ -0,0 +1,96 @@
+"""
+JSON Codec
+One place for JSON encoding/decoding: uses orjson when it is installed
+(several times faster on large history files and API payloads) and falls
+back to the standard library otherwise. Both paths accept the same input,
+write the same bytes (UTF-8 text, not ASCII escapes) and raise
+json.JSONDecodeError (orjson's error subclasses it), so callers don't care
+which one is active. Exceptions: floats written in exponent form (1e20 vs
+1e+20) and NaN/Infinity, which orjson writes as null.
+
+Machine-only files are written compact; files people read in diffs
+(price_history.json, engraving_history.json, ...) use pretty=True, which
+keeps the 2-space indented layout.
+
+Usage:
+    data = json_codec.load_file(path)            # {} if missing or empty
+    json_codec.save_file(path, data, pretty=True)
+    record = json_codec.loads(response.content)
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def loads(data):
+    """Decode JSON from str, bytes, bytearray or memoryview"""
+    if orjson:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError as e:
+        # orjson reports invalid UTF-8 as a JSONDecodeError too
+        raise JSONDecodeError(str(e), '', e.start) from e
+
+
+def dump_bytes(obj, pretty=False, default=None):
+    """
+    Encode to UTF-8 JSON bytes
+
+    Args:
+        obj: Value to encode
+        pretty: Indent with 2 spaces (for human-diffed files)
+        default: Called for values JSON can't encode (e.g. list for deques)
+    """
+    if orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, default=default, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), default=default, ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj, pretty=False, default=None):
+    """Encode to a JSON string (see dump_bytes)"""
+    return dump_bytes(obj, pretty, default).decode('utf-8')
+
+
+def load_file(path, empty=dict):
+    """
+    Load a JSON file
+
+    Args:
+        path: File to read
+        empty: Factory for the value returned when the file is missing or empty
+
+    Returns:
+        Decoded value
+    """
+    path = Path(path)
+    if not path.exists():
+        return empty()
+    with open(path, 'rb') as f:
+        content = f.read()
+    return loads(content) if content.strip() else empty()
+
+
+def save_file(path, obj, pretty=False, default=None):
+    """Write a JSON file atomically (temp file + rename)"""
+    path = Path(path)
+    content = dump_bytes(obj, pretty, default)
+    # Unique temp name: threads or processes may be saving the same file
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + '.', suffix='.tmp', delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
@@ -0,0 +1,93 @@
+"""
+Per-Host Latency Histograms
+Keeps a log-bucketed latency histogram per host across runs, so request
+timeouts can follow what each host actually does (p99) instead of being
+hard-coded, and hedged requests know when a response is running late (p95).
+
+State lives in latency_stats.json as {host: {"counts": [...], "total": n}}.
+Counts are halved once a host has MAX_SAMPLES samples, so old runs fade
+out and the histogram tracks recent behaviour.
+"""
+
+import bisect
+from pathlib import Path
+
+import json_codec
+
+STATS_FILE = Path(__file__).parent / "latency_stats.json"
+
+# Bucket upper bounds in seconds: 25 ms .. ~120 s, ~20% apart
+BUCKET_BOUNDS = [round(0.025 * 1.2 ** i, 4) for i in range(47)]
+MAX_SAMPLES = 2000
+
+DEFAULT_SETTINGS = {
+    'min_samples': 20,
+    'multiplier': 2.0,
+    'min_timeout': 3.0,
+    'max_timeout': 60.0,
+}
+
+
+def load_latency_stats(stats_file=STATS_FILE):
+    """Load per-host histograms"""
+    return json_codec.load_file(stats_file)
+
+
+def save_latency_stats(stats, stats_file=STATS_FILE):
+    """Save per-host histograms"""
+    json_codec.save_file(stats_file, stats)
+
+
+def record_latency(stats, host, seconds):
+    """Add one request latency to a host's histogram"""
+    host_stats = stats.setdefault(host, {'counts': [0] * (len(BUCKET_BOUNDS) + 1), 'total': 0})
+    index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+    host_stats['counts'][index] += 1
+    host_stats['total'] += 1
+
+    if host_stats['total'] >= MAX_SAMPLES:
+        host_stats['counts'] = [count // 2 for count in host_stats['counts']]
+        host_stats['total'] = sum(host_stats['counts'])
+
+
+def percentile(stats, host, q):
+    """
+    Latency percentile for a host from its histogram
+
+    Args:
+        q: Percentile as a fraction (0.99 for p99)
+
+    Returns:
+        float: Bucket upper bound in seconds, or None with no samples
+    """
+    host_stats = stats.get(host)
+    if not host_stats or not host_stats['total']:
+        return None
+    target = q * host_stats['total']
+    seen = 0
+    for index, count in enumerate(host_stats['counts']):
+        seen += count
+        if seen >= target:
+            return BUCKET_BOUNDS[min(index, len(BUCKET_BOUNDS) - 1)]
+    return BUCKET_BOUNDS[-1]
+
+
+def adaptive_timeout(stats, host, default, settings=DEFAULT_SETTINGS):
+    """
+    Timeout for a host derived from its observed p99
+
+    Falls back to `default` until the host has `min_samples` samples.
+    """
+    host_stats = stats.get(host)
+    if not host_stats or host_stats['total'] < settings['min_samples']:
+        return default
+    p99 = percentile(stats, host, 0.99)
+    return min(max(p99 * settings['multiplier'], settings['min_timeout']), settings['max_timeout'])
+
+
+def hedge_delay(stats, host, settings=DEFAULT_SETTINGS):
+    """Seconds to wait before sending a hedged duplicate (host p95), or None"""
+    host_stats = stats.get(host)
+    if not host_stats or host_stats['total'] < settings['min_samples']:
+        return None
+    return percentile(stats, host, 0.95)
@@ -1,43 +1,52 @@
-import json
+import argparse
 import requests
 import os
 import time
-import re
 from datetime import datetime
-from bs4 import BeautifulSoup
+
+import http_client
+import json_codec
+from config_compiler import classify_fetch_strategy, compile_config
+from history_store import append_observation
+from page_archive import archive_page
+import price_extractors
+from price_extractors import extract_price, extract_price_streaming, page_key, save_strategy_memo, strategy_summary_lines
+from retention import BackgroundCompaction
+from run_planner import Checkpointer, history_entry, recently_checked
+from single_flight import SingleFlight
 
 def load_config():
-    """Load configuration from config.json"""
-    with open('config.json', 'r') as f:
-        return json.load(f)
+    """Load validated, compiled configuration from config.json"""
+    return compile_config()
 
 def load_price_history():
     """Load price history from price_history.json"""
     try:
-        with open('price_history.json', 'r') as f:
-            content = f.read().strip()
-            return json.loads(content) if content else {}
-    except (FileNotFoundError, json.JSONDecodeError):
+        return json_codec.load_file('price_history.json')
+    except json_codec.JSONDecodeError:
         return {}
 
 def save_price_history(history):
     """Save price history to price_history.json"""
-    with open('price_history.json', 'w') as f:
-        json.dump(history, f, indent=2)
+    # Write then rename, so a run killed mid-checkpoint can't truncate it
+    json_codec.save_file('price_history.json', history, pretty=True)
 
-def fetch_price(url):
+def fetch_price(url, item_id=None, archive=False, strategy=None, hedge=False):
     """Fetch price from Costco (API or product page)"""
     try:
-        # Check if it's an API URL
-        if 'gdx-api.costco.com' in url or 'display-price-lite' in url:
-            return fetch_price_from_api(url)
+        # Compiled config pre-classifies items; classify ad-hoc URLs here
+        if (strategy or classify_fetch_strategy(url)) == 'api':
+            return fetch_price_from_api(url, hedge=hedge)
         else:
-            return fetch_price_from_page(url)
+            return fetch_price_from_page(url, item_id=item_id, archive=archive, hedge=hedge)
+    except http_client.HostUnavailable as e:
+        print(f"  ⏭️  {e}")
+        return None
     except Exception as e:
         print(f"  ❌ Error fetching price: {e}")
         return None
 
-def fetch_price_from_api(url):
+def fetch_price_from_api(url, hedge=False):
     """Fetch price from Costco API"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -45,10 +54,12 @@ def fetch_price_from_api(url):
         'Accept-Language': 'en-US,en;q=0.9',
         'Referer': 'https://www.costco.com/'
     }
-    response = requests.get(url, headers=headers, timeout=10)
+    response = http_client.get(url, headers=headers, timeout=10, hedge=hedge)
     response.raise_for_status()
-    data = response.json()
-    
+    return parse_api_price(json_codec.loads(response.content))
+
+def parse_api_price(data):
+    """Extract the price from a display-price-lite API response"""
     # Extract price from nested response structure
     if 'priceData' in data and 'displayPrice' in data['priceData']:
         display_price = data['priceData']['displayPrice']
@@ -64,48 +75,31 @@ def fetch_price_from_api(url):
     
     return None
 
-def fetch_price_from_page(url):
-    """Fetch price from Costco product page"""
+def fetch_price_from_page(url, item_id=None, archive=False, hedge=False):
+    """Fetch price from Costco product page (archiving the body if requested)"""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.9',
         'Referer': 'https://www.costco.com/'
     }
-    response = requests.get(url, headers=headers, timeout=30)
-    response.raise_for_status()
-    
-    html_content = response.text
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Method 1: Try to find price using data-testid attribute
-    price_element = soup.find(attrs={'data-testid': 'Text_single-price-whole-value'})
-    if price_element:
-        price_text = price_element.get_text(strip=True)
-        # Remove dollar sign and commas
-        price_text = price_text.replace('$', '').replace(',', '')
-        return float(price_text)
-    
-    # Method 2: Try to find price in JSON-LD structured data
-    scripts = soup.find_all('script', type='application/ld+json')
-    for script in scripts:
-        try:
-            data = json.loads(script.string)
-            if isinstance(data, dict) and data.get('@type') == 'Product':
-                if 'offers' in data and 'price' in data['offers']:
-                    return float(data['offers']['price'])
-        except (json.JSONDecodeError, KeyError, ValueError):
-            continue
+    key = page_key(url)
+    if not (archive and item_id):
+        # Nothing needs the whole body: stop downloading once the price is found
+        price, _, _ = extract_price_streaming(http_client.stream(url, headers=headers, timeout=30, hedge=hedge), key)
+        if price is None:
+            print(f"  ⚠️  Could not find price on page")
+        return price
     
-    # Method 3: Search for price patterns in the HTML
-    price_pattern = r'data-testid="Text_single-price-whole-value"[^>]*>[\s]*\$?([\d,]+\.?\d*)'
-    match = re.search(price_pattern, html_content)
-    if match:
-        price_text = match.group(1).replace(',', '')
-        return float(price_text)
+    response = http_client.get(url, headers=headers, timeout=30, hedge=hedge)
+    response.raise_for_status()
     
-    print(f"  ⚠️  Could not find price on page")
-    return None
+    price, _ = extract_price(response.content, key)
+    if price is None:
+        print(f"  ⚠️  Could not find price on page")
+    if archive and item_id:
+        archive_page(item_id, url, response.content, response.status_code, price)
+    return price
 
 def create_github_issue(item_name, old_price, new_price, item_id):
     """Create a GitHub issue for price change notification"""
@@ -142,39 +136,73 @@ def create_github_issue(item_name, old_price, new_price, item_id):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = requests.post(url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
         print(f"✅ GitHub issue created for {item_name}")
     except Exception as e:
         print(f"❌ Error creating GitHub issue: {e}")
 
-def check_prices():
-    """Main function to check all prices"""
+def check_prices(resume=False):
+    """Main function to check all prices (resume skips recently checked items)"""
     config = load_config()
     history = load_price_history()
+    http_client.configure(config)
+    price_extractors.configure(config)
+    compaction = BackgroundCompaction(config).start()
     price_changes = []
+    archive = config.get('archive', {}).get('enabled', False)
+    
+    def save_progress():
+        save_price_history(history)
+        http_client.save_state()
+        save_strategy_memo()
+    
+    checkpoint_settings = config.get('checkpoint', {})
+    checkpointer = Checkpointer(
+        save_progress,
+        every_items=checkpoint_settings.get('every_items', 50),
+        every_seconds=checkpoint_settings.get('every_seconds', 60)
+    )
     
     print("🔍 Checking Costco prices...")
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
-    for item in config['items']:
+    items = config['items']
+    if resume:
+        window = checkpoint_settings.get('resume_window_minutes', 120)
+        items = [item for item in items if not recently_checked(history_entry(history, item), window)]
+        print(f"⏩ Resuming: {len(config['items']) - len(items)} items already checked in the last {window} minutes\n")
+    
+    # Each product is fetched once; every watch entry on it shares the result
+    flight = SingleFlight()
+    
+    for item in items:
         item_name = item['name']
         item_id = item['item_id']
+        watch_id = item['watch_id']
         url = item['url']
         
         print(f"Checking: {item_name} (ID: {item_id})")
         
-        current_price = fetch_price(url)
+        shared = flight.is_shared(item['product_key'])
+        current_price = flight.do(item['product_key'], lambda: fetch_price(
+            url, item_id=item_id, archive=archive,
+            strategy=item.get('fetch_strategy'),
+            hedge=item.get('hedge', False)
+        ))
         
         if current_price is None:
             print(f"  ⚠️  Could not fetch price\n")
             continue
         
-        print(f"  💰 Current price: ${current_price:.2f}")
+        print(f"  💰 Current price: ${current_price:.2f}{' (shared fetch)' if shared else ''}")
+        if not shared:
+            append_observation(item_id, current_price)
         
         # Check if we have historical data for this item
-        if item_id in history:
-            old_price = history[item_id]['price']
+        previous = history_entry(history, item)
+        if previous and previous.get('price') is not None:
+            old_price = previous['price']
             
             if old_price != current_price:
                 print(f"  🔔 PRICE CHANGE! Old: ${old_price:.2f} → New: ${current_price:.2f}")
@@ -194,18 +222,21 @@ def check_prices():
             print(f"  📝 First time tracking this item")
         
         # Update history
-        history[item_id] = {
+        history[watch_id] = {
             'name': item_name,
             'price': current_price,
             'last_checked': datetime.now().isoformat()
         }
+        checkpointer.item_done()
         print()
         
         # Add a small delay between requests to avoid rate limiting
-        time.sleep(2)
+        if not shared:
+            time.sleep(2)
     
     # Save updated history
-    save_price_history(history)
+    save_progress()
+    compacted = compaction.join()
     
     # Summary
     if price_changes:
@@ -216,6 +247,17 @@ def check_prices():
             print(f"  - {change['name']}: ${change['old_price']:.2f} → ${change['new_price']:.2f} ({pct:+.2f}%)")
     else:
         print("\n✅ No price changes detected.")
+    for line in http_client.transfer_summary_lines():
+        print(f"📦 {line}")
+    for line in strategy_summary_lines():
+        print(f"🧭 {line}")
+    if flight.stats['saved']:
+        print(f"🔗 {flight.stats['saved']} fetches saved by sharing products across watch entries")
+    if compacted and compacted['expired']:
+        print(f"🗜️  Rolled {compacted['expired']} old observations into {compacted['rollups']} hourly rollups")
 
 if __name__ == '__main__':
-    check_prices()
+    parser = argparse.ArgumentParser(description="Costco price checker")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip items already checked within the resume window (after an interrupted run)")
+    check_prices(resume=parser.parse_args().resume)
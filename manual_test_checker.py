@@ -4,11 +4,13 @@ Manual Price Checker - Uses manually extracted prices from Playwright MCP
 This is useful for testing the GitHub issue creation logic
 """
 
-import json
 import os
 from datetime import datetime
 from pathlib import Path
 
+import json_codec
+from config_compiler import compile_config
+
 # Simulate the prices we found using Playwright MCP
 MANUAL_PRICES = {
     "4000285678": {  # iPad A16 128GB
@@ -25,26 +27,18 @@ MANUAL_PRICES = {
 
 
 def load_config():
-    """Load configuration from config.json"""
-    config_path = Path(__file__).parent / "config.json"
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    """Load validated, compiled configuration from config.json"""
+    return compile_config()
 
 
 def load_price_history():
     """Load price history from JSON file"""
-    history_path = Path(__file__).parent / "price_history.json"
-    if history_path.exists():
-        with open(history_path, 'r') as f:
-            return json.load(f)
-    return {}
+    return json_codec.load_file(Path(__file__).parent / "price_history.json")
 
 
 def save_price_history(history):
     """Save price history to JSON file"""
-    history_path = Path(__file__).parent / "price_history.json"
-    with open(history_path, 'w') as f:
-        json.dump(history, f, indent=2)
+    json_codec.save_file(Path(__file__).parent / "price_history.json", history, pretty=True)
 
 
 def check_prices_manual():
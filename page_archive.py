@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Page Archive
+Content-addressed store of every fetched response body.
+
+Bodies are stored once per SHA-256 digest as gzip objects, so the same
+page fetched on many runs costs one object on disk. An append-only index
+records which item/run fetched which digest. Readers get a memory-mapped
+view of the decompressed body, so extractors in price_extractors.py can
+scan raw bytes without copying the page into Python strings.
+
+Archiving is off by default ("archive": {"enabled": false}): page_archive/
+is gitignored, so it only pays off where the directory persists between
+runs (a local machine, or a CI cache).
+
+Usage:
+    python page_archive.py import page_content.html --item-id 4000285678 --url URL
+    python page_archive.py stats
+"""
+
+import argparse
+import gzip
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import json_codec
+from history_store import RUN_ID
+
+ARCHIVE_DIR = Path(__file__).parent / "page_archive"
+OBJECTS_DIR = ARCHIVE_DIR / "objects"
+CACHE_DIR = ARCHIVE_DIR / "cache"
+INDEX_FILE = ARCHIVE_DIR / "index.jsonl"
+
+
+def body_digest(body):
+    """Return the SHA-256 hex digest used as the object key for a body"""
+    return hashlib.sha256(body).hexdigest()
+
+
+def _object_path(digest):
+    return OBJECTS_DIR / digest[:2] / f"{digest}.gz"
+
+
+def store_body(body):
+    """
+    Store a response body as a compressed object (no-op if already stored)
+
+    Args:
+        body: Raw response bytes
+
+    Returns:
+        str: Digest of the stored body
+    """
+    digest = body_digest(body)
+    path = _object_path(digest)
+    if path.exists():
+        return digest
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp name: other processes may be storing the same body
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode='wb', compresslevel=6) as f:
+            f.write(body)
+    os.replace(tmp.name, path)
+    return digest
+
+
+def archive_page(item_id, url, body, status_code=None, price=None):
+    """
+    Archive a fetched page body and record it in the index
+
+    Args:
+        item_id: Tracked item id the page was fetched for
+        url: URL that was fetched
+        body: Raw response bytes
+        status_code: HTTP status of the response
+        price: Price the live extractor produced, if any
+
+    Returns:
+        str: Digest of the stored body
+    """
+    digest = store_body(body)
+    entry = {
+        'item_id': item_id,
+        'url': url,
+        'run_id': RUN_ID,
+        'timestamp': datetime.now().isoformat(),
+        'digest': digest,
+        'size': len(body),
+        'status_code': status_code,
+        'price': price
+    }
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_FILE, 'ab') as f:
+        f.write(json_codec.dump_bytes(entry) + b'\n')
+    return digest
+
+
+def iter_index(item_id=None):
+    """
+    Stream index entries without loading the whole index
+
+    Args:
+        item_id: Only yield entries for this item (optional)
+
+    Yields:
+        dict: Index entry
+    """
+    if not INDEX_FILE.exists():
+        return
+    with open(INDEX_FILE, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json_codec.loads(line)
+            except json_codec.JSONDecodeError:
+                continue
+            if item_id is None or entry.get('item_id') == item_id:
+                yield entry
+
+
+@contextmanager
+def open_page(digest):
+    """
+    Memory-map an archived page body
+
+    The object is decompressed into an anonymous temp file under
+    page_archive/cache, which is gone as soon as the page is closed, so
+    nothing accumulates there. The yielded mmap can be passed to any
+    price_extractors strategy (re works on it without copying).
+
+    Args:
+        digest: Object digest from the index
+
+    Yields:
+        mmap.mmap: Read-only view of the page body
+    """
+    object_path = _object_path(digest)
+    if not object_path.exists():
+        raise FileNotFoundError(f"No archived object for digest {digest}")
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryFile(dir=CACHE_DIR) as f:
+        with gzip.open(object_path, 'rb') as src:
+            shutil.copyfileobj(src, f, 1024 * 1024)
+        f.flush()
+        if f.tell() == 0:
+            yield b''
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def clear_cache():
+    """Remove page_archive/cache (left behind by older versions); objects and index are kept"""
+    if CACHE_DIR.exists():
+        shutil.rmtree(CACHE_DIR)
+
+
+def archive_stats():
+    """
+    Summarize the archive
+
+    Returns:
+        dict: entry/object counts and raw vs stored byte totals
+    """
+    entries = 0
+    raw_bytes = 0
+    items = set()
+    for entry in iter_index():
+        entries += 1
+        raw_bytes += entry.get('size') or 0
+        items.add(entry.get('item_id'))
+
+    objects = 0
+    stored_bytes = 0
+    if OBJECTS_DIR.exists():
+        for path in OBJECTS_DIR.glob('*/*.gz'):
+            objects += 1
+            stored_bytes += path.stat().st_size
+
+    return {
+        'entries': entries,
+        'items': len(items),
+        'objects': objects,
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored_bytes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed page archive")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Archive a saved page file")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--item-id', required=True)
+    import_parser.add_argument('--url', default='')
+
+    subparsers.add_parser('stats', help="Show archive size and dedup ratio")
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        with open(args.path, 'rb') as f:
+            body = f.read()
+        digest = archive_page(args.item_id, args.url, body)
+        print(f"✅ Archived {args.path} as {digest}")
+    else:
+        stats = archive_stats()
+        print(f"Entries: {stats['entries']} ({stats['items']} items)")
+        print(f"Objects: {stats['objects']}")
+        print(f"Raw bytes: {stats['raw_bytes']:,}")
+        print(f"Stored bytes: {stats['stored_bytes']:,}")
+
+
+if __name__ == "__main__":
+    main()
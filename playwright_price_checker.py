@@ -8,9 +8,8 @@ Exit Codes:
 - 1: Price alert triggered (price at/below threshold) - workflow fails to send notification
 """
 
-import json
+import argparse
 import os
-import re
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -19,36 +18,55 @@ from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 
+from api_discovery import (find_price_request, learn_endpoint, learned_api_url, load_endpoints,
+                           record_result, save_endpoints, template_from_html)
+from alert_rules import (evaluate_observation, get_rules, is_alert_active, load_alert_state,
+                         reevaluate_threshold, save_alert_state, seed_from_history)
+from browser_pool import BrowserPool
+import http_client
+import json_codec
+from config_compiler import (compile_config, diff_config, load_config_snapshot, print_diff, save_config_snapshot,
+                             subscription_map)
+from history_store import append_observation, append_observations, make_observation, new_check_id
+from main import fetch_price_from_api
+from page_archive import archive_page
+import price_extractors
+from price_extractors import extract_price, page_key, save_strategy_memo, strategy_summary_lines
+from retention import BackgroundCompaction
+from run_planner import Checkpointer, RunDeadline, history_entry, order_items, recently_checked, update_volatility
+from search_scraper import fetch_listing_prices, listing_key, product_number_from_url
+from single_flight import SingleFlight
+from store_matrix import StoreMatrixFetcher, best_store_price
+from subscriptions import SubscriptionIndex
+
 
 def load_config():
-    """Load configuration from config.json"""
-    config_path = Path(__file__).parent / "config.json"
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    """Load validated, compiled configuration from config.json"""
+    return compile_config()
 
 
 def load_price_history():
     """Load price history from JSON file"""
-    history_path = Path(__file__).parent / "price_history.json"
-    if history_path.exists():
-        with open(history_path, 'r') as f:
-            return json.load(f)
-    return {}
+    return json_codec.load_file(Path(__file__).parent / "price_history.json")
 
 
 def save_price_history(history):
     """Save price history to JSON file"""
-    history_path = Path(__file__).parent / "price_history.json"
-    with open(history_path, 'w') as f:
-        json.dump(history, f, indent=2)
+    # Write then rename, so a run killed mid-checkpoint can't truncate it
+    json_codec.save_file(Path(__file__).parent / "price_history.json", history, pretty=True)
 
 
-def scrape_price_from_product_page(url):
+def scrape_price_from_product_page(url, item_id=None, archive=False, endpoints=None, hedge=False):
     """
     Scrape price from Costco product page
     
     Args:
         url: Product page URL
+        item_id: Item id used to file the page in the archive
+        archive: Store the response body in the page archive
+        endpoints: Learned API endpoints; the page's embedded price API
+                   config is recorded here for items without one
+        hedge: Allow a hedged duplicate request if the page is slow
         
     Returns:
         tuple: (price, product_name) or (None, None) if failed
@@ -58,59 +76,39 @@ def scrape_price_from_product_page(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(url, headers=headers, timeout=30)
+        response = http_client.get(url, headers=headers, timeout=30, hedge=hedge)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Try to find price using common Costco price selectors
-        price_text = None
-        product_name = None
-        
-        # Method 1: Look for price in meta tags
-        price_meta = soup.find('meta', {'property': 'product:price:amount'})
-        if price_meta:
-            price_text = price_meta.get('content')
-        
-        # Method 2: Look for data-testid price
-        if not price_text:
-            price_elem = soup.find(attrs={'data-testid': 'Text_single-price-whole-value'})
-            if price_elem:
-                price_text = price_elem.get_text()
-        
-        # Method 3: Look for price in common class names
-        if not price_text:
-            price_selectors = [
-                {'class': 'price'},
-                {'class': 'value'},
-                {'itemprop': 'price'}
-            ]
-            for selector in price_selectors:
-                elem = soup.find(attrs=selector)
-                if elem:
-                    price_text = elem.get_text()
-                    break
+        # Price cascade, starting with whichever strategy last worked for this site
+        price, _ = extract_price(response.content, page_key(url))
         
         # Get product name
-        title_elem = soup.find('h1')
+        product_name = None
+        title_elem = BeautifulSoup(response.content, 'html.parser').find('h1')
         if title_elem:
             product_name = title_elem.get_text().strip()
         
-        if price_text:
-            # Clean and parse price
-            price_clean = re.sub(r'[^\d.]', '', price_text)
-            if price_clean:
-                price = float(price_clean)
-                return price, product_name
+        if archive and item_id:
+            archive_page(item_id, url, response.content, response.status_code, price)
+        
+        if endpoints is not None and item_id and item_id not in endpoints:
+            template = template_from_html(response.content)
+            if template and learn_endpoint(endpoints, item_id, template, 'html'):
+                print(f"  📡 Learned price API endpoint from page")
+        
+        if price is not None:
+            return price, product_name
         
         return None, None
         
+    except http_client.HostUnavailable:
+        raise
     except Exception as e:
         print(f"Error scraping price from {url}: {e}")
         return None, None
 
 
-def create_github_issue(item_name, current_price, threshold, url):
+def create_github_issue(item_name, current_price, threshold, url, reason=None):
     """
     Create a GitHub issue for price alert
     
@@ -119,6 +117,7 @@ def create_github_issue(item_name, current_price, threshold, url):
         current_price: Current price
         threshold: Price threshold
         url: Product URL
+        reason: Alert rule message (defaults to the threshold wording)
     """
     github_token = os.environ.get('GITHUB_TOKEN')
     repo = os.environ.get('GITHUB_REPOSITORY')
@@ -128,6 +127,8 @@ def create_github_issue(item_name, current_price, threshold, url):
         return
     
     savings = threshold - current_price
+    savings_line = f"**You Save:** ${savings:.2f}\n" if savings >= 0 else ""
+    reason = reason or "The price has dropped to or below your target threshold!"
     
     issue_title = f"🎉 Price Alert: {item_name} - ${current_price:.2f}"
     issue_body = f"""## Price Drop Alert!
@@ -135,9 +136,8 @@ def create_github_issue(item_name, current_price, threshold, url):
 **Product:** {item_name}
 **Current Price:** ${current_price:.2f}
 **Your Threshold:** ${threshold:.2f}
-**You Save:** ${savings:.2f}
-
-The price has dropped to or below your target threshold!
+{savings_line}
+{reason}
 
 **Product Link:** {url}
 
@@ -160,29 +160,293 @@ The price has dropped to or below your target threshold!
     }
     
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = requests.post(api_url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
         print(f"✅ GitHub issue created for {item_name}")
     except Exception as e:
         print(f"❌ Failed to create GitHub issue: {e}")
 
 
-def check_prices():
-    """Main function to check prices for all configured items"""
+def subscriber_reason(now_below, current_price, limit=20):
+    """Alert text for subscriptions a price just crossed (lists at most `limit`)"""
+    listed = ", ".join(f"{subscriber_id} (${threshold:.2f})" for threshold, subscriber_id in now_below[:limit])
+    more = f" and {len(now_below) - limit} more" if len(now_below) > limit else ""
+    return f"${current_price:.2f} is at or below the threshold of {len(now_below)} subscriber(s): {listed}{more}"
+
+
+def get_current_price(item, tiers):
+    """
+    Price one item from the cheapest source that works
+    
+    Order: listing page, learned JSON API, product page, browser tier.
+    
+    Args:
+        item: Compiled config item
+        tiers: Per-run fetch state (listing prices, learned endpoints,
+               archive flag, browser settings and lazily started pool)
+    
+    Returns:
+        float: Current price, or None if no tier could price the item
+    
+    Raises:
+        http_client.HostUnavailable: If the item's host breaker is open
+    """
+    item_id = item['item_id']
+    url = item['url']
+    endpoints = tiers['endpoints']
+    
+    listed = tiers['listing_prices'].get(listing_key(item))
+    if listed:
+        print(f"  (priced from listing page)")
+        return listed[0]
+    
+    current_price = None
+    item_number = product_number_from_url(url) or item_id
+    api_url = learned_api_url(endpoints, item_id, item_number)
+    if api_url:
+        try:
+            current_price = fetch_price_from_api(api_url, hedge=item.get('hedge', False))
+        except http_client.HostUnavailable:
+            raise
+        except Exception as e:
+            print(f"  ⚠️  Learned API endpoint failed: {e}")
+        if record_result(endpoints, item_id, current_price is not None):
+            print(f"  ℹ️  Forgot learned API endpoint after repeated failures")
+        if current_price is not None:
+            print(f"  (priced from learned API endpoint)")
+            return current_price
+    
+    current_price, _ = scrape_price_from_product_page(
+        url, item_id=item_id, archive=tiers['archive'], endpoints=endpoints,
+        hedge=item.get('hedge', False)
+    )
+    
+    browser = tiers['browser']
+    if current_price is None and browser.get('enabled', False):
+        try:
+            if tiers['browser_pool'] is None:
+                tiers['browser_pool'] = BrowserPool(
+                    size=browser.get('pool_size', 2),
+                    pages_per_context=browser.get('pages_per_context', 25)
+                )
+                tiers['browser_pool'].start()
+            result = tiers['browser_pool'].fetch(url)
+            current_price = result['price']
+            print(f"  (priced with browser tier)")
+            template = find_price_request(result['api_requests'], item_number)
+            if template and learn_endpoint(endpoints, item_id, template, 'browser'):
+                print(f"  📡 Learned price API endpoint from browser traffic")
+        except Exception as e:
+            print(f"  ⚠️  Browser tier failed: {e}")
+    
+    return current_price
+
+
+def get_store_prices(item, tiers, store_fetcher):
+    """
+    Price one item at every configured store
+    
+    Uses the item's learned price API endpoint when there is one (the
+    warehouse number is swapped per store), else the product page.
+    
+    Returns:
+        dict: store id -> price (None where a store couldn't be priced)
+    """
+    item_number = product_number_from_url(item['url']) or item['item_id']
+    api_url = learned_api_url(tiers['endpoints'], item['item_id'], item_number)
+    return store_fetcher.fetch_item(api_url or item['url'])
+
+
+def recheck_thresholds(items, history, alert_state, rules, config, already_below):
+    """
+    Re-evaluate items whose thresholds changed against their stored price
+    
+    Args:
+        items: Compiled items with a threshold-only config change
+               (price_threshold and/or subscribers)
+        history: Price history (entries get the new threshold)
+        alert_state: Alert rule state
+        rules: Alert rules from get_rules
+        config: Compiled config (for notification settings)
+        already_below: From SubscriptionIndex.sync with the stored prices:
+                       new subscriptions the stored price already meets
+                       (consumed per product)
+    
+    Returns:
+        tuple: (alerts triggered, items without a stored price, which
+                need a fetch after all, subscribers notified)
+    """
+    alerts_triggered = 0
+    subscribers_notified = 0
+    unpriced = []
+    for item in items:
+        watch_id = item['watch_id']
+        threshold = item['price_threshold']
+        previous = history_entry(history, item)
+        if not previous or previous.get('price') is None:
+            unpriced.append(item)
+            continue
+        price = previous['price']
+        print(f"\n[Threshold changed] {item['name']}")
+        print(f"  Stored price: ${price:.2f}, new threshold ${threshold:.2f} (no fetch)")
+        seed_from_history(alert_state, watch_id, previous)
+        alerts = reevaluate_threshold(alert_state, watch_id, price, threshold, rules)
+        for alert in alerts:
+            print(f"  🔔 {alert['message']}")
+        reasons = [alert['message'] for alert in alerts]
+        issue_threshold = threshold
+        new_below = already_below.pop(item['product_key'], [])
+        if new_below:
+            subscribers_notified += len(new_below)
+            print(f"  🔔 {len(new_below)} new subscriber threshold(s) already met")
+            reasons.append(subscriber_reason(new_below, price))
+            issue_threshold = max(threshold, new_below[-1][0])
+        if reasons and config['notification']['enabled']:
+            reason = "\n".join(f"- {message}" for message in reasons)
+            create_github_issue(item['name'], price, issue_threshold, item['url'], reason)
+            alerts_triggered += 1
+        entry = history.setdefault(watch_id, dict(previous))
+        entry['threshold'] = threshold
+        entry['alert_triggered'] = is_alert_active(alert_state, watch_id)
+    return alerts_triggered, unpriced, subscribers_notified
+
+
+def check_prices(deadline_seconds=None, resume=False, incremental=False):
+    """
+    Main function to check prices for all configured items
+    
+    Args:
+        deadline_seconds: Wall-clock budget for the run. When set, items
+                          are checked in priority order and the run stops
+                          early (saving what it has) before the budget ends.
+        resume: Skip items already checked within the checkpoint
+                resume window (continuing an interrupted run)
+        incremental: Only check items added or changed since the last
+                     run's config snapshot; threshold-only changes are
+                     re-evaluated against stored prices without fetching
+    """
+    deadline_seconds = deadline_seconds or env_deadline()
+    deadline = RunDeadline(deadline_seconds) if deadline_seconds else None
     config = load_config()
     history = load_price_history()
+    alert_state = load_alert_state()
+    rules = get_rules(config)
+    snapshot = load_config_snapshot()
     
     print("\n" + "=" * 80)
     print("COSTCO PRICE TRACKER - Automated Check")
     print("=" * 80)
     print(f"Timestamp: {datetime.now().isoformat()}")
-    print(f"Checking {len(config['items'])} items...")
+    print(f"Checking {len(config['items'])} items ({len(config['products'])} unique products)...")
     print("=" * 80)
     
+    http_client.configure(config)
+    price_extractors.configure(config)
+    # Old observations roll into hourly/daily aggregates while prices are fetched
+    compaction = BackgroundCompaction(config).start()
     alerts_triggered = 0
+    archive = config.get('archive', {}).get('enabled', False)
     
+    # Start from the subscriptions the last run had, so ones added since then
+    # that the stored price already meets are found (crossed() never reports them)
+    subscription_index = SubscriptionIndex(subscription_map(snapshot.values()) if snapshot is not None else None)
+    last_prices = {}
     for item in config['items']:
+        entry = history_entry(history, item)
+        if entry and entry.get('price') is not None:
+            last_prices.setdefault(item['product_key'], entry['price'])
+    _, _, already_below = subscription_index.sync(config.get('subscriptions', {}), last_prices)
+    subscriptions_crossed = 0
+    
+    items = config['items']
+    if incremental and snapshot is None:
+        print("Incremental: no config snapshot from an earlier run, checking every item")
+    elif incremental:
+        changes = diff_config(snapshot, config)
+        print("Incremental: changes since the last run's config")
+        print_diff(changes)
+        by_watch_id = {item['watch_id']: item for item in items}
+        retuned, needs_fetch, notified = recheck_thresholds(
+            [by_watch_id[watch_id] for watch_id in changes['threshold_only']],
+            history, alert_state, rules, config, already_below
+        )
+        alerts_triggered += retuned
+        subscriptions_crossed += notified
+        to_fetch = set(changes['added']) | set(changes['modified']) | {item['watch_id'] for item in needs_fetch}
+        items = [item for item in items if item['watch_id'] in to_fetch]
+    
+    # Price as many items as possible from search/category listings first
+    listing_prices = {}
+    listing = config.get('listing', {})
+    if listing.get('enabled', False) and items:
+        listing_prices, unmatched = fetch_listing_prices(
+            items,
+            category_urls=listing.get('category_urls'),
+            max_pages=listing.get('max_pages', 5)
+        )
+        print(f"Listing pages priced {len(listing_prices)} items, {len(unmatched)} need product pages")
+    
+    tiers = {
+        'listing_prices': listing_prices,
+        # Per-item price API endpoints learned on earlier runs
+        'endpoints': load_endpoints(),
+        'archive': archive,
+        # Browser tier for pages plain HTTP can't price; launched on first use
+        'browser': config.get('browser', {}),
+        'browser_pool': None
+    }
+    skipped = 0
+    deferred = []
+    # Fetches that failed; left out of the config snapshot so incremental runs retry them
+    unpriced = []
+    # Each product is fetched once; every watch entry on it shares the result
+    flight = SingleFlight()
+    
+    # Optional (item, store) matrix: every item priced at every configured store
+    store_settings = config.get('stores', {})
+    store_fetcher = None
+    if store_settings.get('enabled', False) and store_settings.get('locations'):
+        store_fetcher = StoreMatrixFetcher(store_settings['locations'], workers=store_settings.get('workers', 16))
+        print(f"Store matrix: checking each item at {len(store_settings['locations'])} stores")
+    
+    def fetch_product(item):
+        if store_fetcher:
+            return get_store_prices(item, tiers, store_fetcher)
+        return get_current_price(item, tiers)
+    
+    def save_progress():
+        save_price_history(history)
+        save_alert_state(alert_state)
+        save_endpoints(tiers['endpoints'])
+        http_client.save_state()
+        save_strategy_memo()
+    
+    checkpoint_settings = config.get('checkpoint', {})
+    checkpointer = Checkpointer(
+        save_progress,
+        every_items=checkpoint_settings.get('every_items', 50),
+        every_seconds=checkpoint_settings.get('every_seconds', 60)
+    )
+    
+    resumed = 0
+    if resume:
+        window = checkpoint_settings.get('resume_window_minutes', 120)
+        remaining = [item for item in items if not recently_checked(history_entry(history, item), window)]
+        resumed = len(items) - len(remaining)
+        items = remaining
+        print(f"Resuming: {resumed} items already checked in the last {window} minutes")
+    if deadline:
+        items = order_items(items, history)
+        print(f"Deadline mode: {deadline_seconds:.0f}s budget, items ordered by priority")
+    
+    for index, item in enumerate(items):
+        if deadline and not deadline.begin_item():
+            deferred = items[index:]
+            print(f"\n⏰ Stopping before deadline ({deadline.remaining():.0f}s left)")
+            break
+        
         item_id = item['item_id']
+        watch_id = item['watch_id']
         item_name = item['name']
         threshold = item['price_threshold']
         url = item['url']
@@ -191,50 +455,144 @@ def check_prices():
         print(f"  Threshold: ${threshold:.2f} or less")
         print(f"  URL: {url}")
         
-        # Scrape current price
-        current_price, scraped_name = scrape_price_from_product_page(url)
+        shared = flight.is_shared(item['product_key'])
+        if shared:
+            print(f"  (same product as an earlier watch entry - reusing its result)")
+        try:
+            result = flight.do(item['product_key'], lambda: fetch_product(item))
+        except http_client.HostUnavailable as e:
+            # Host is blocking us; don't spend a request, mark the item unknown
+            print(f"  ⏭️  {e}")
+            entry = history.setdefault(watch_id, {'name': item_name})
+            entry['status'] = 'unknown'
+            entry['last_skipped'] = datetime.now().isoformat()
+            skipped += 1
+            unpriced.append(watch_id)
+            checkpointer.item_done()
+            continue
+        
+        matrix = result if store_fetcher else None
+        best_store = None
+        if matrix is not None:
+            best_store, current_price = best_store_price(matrix)
+        else:
+            current_price = result
         
         if current_price is None:
             print(f"  ❌ Failed to fetch price")
+            unpriced.append(watch_id)
             continue
         
         print(f"  Current Price: ${current_price:.2f}")
+        if matrix is not None:
+            priced = [price for price in matrix.values() if price is not None]
+            print(f"  Best of {len(priced)}/{len(matrix)} stores: store {best_store} "
+                  f"(range ${min(priced):.2f} - ${max(priced):.2f})")
+        previous = history_entry(history, item)
+        if not shared:
+            if matrix is not None:
+                check_id = new_check_id()
+                append_observations(make_observation(item_id, price, threshold=threshold, store=store_id,
+                                                     check_id=check_id)
+                                    for store_id, price in matrix.items() if price is not None)
+            else:
+                append_observation(item_id, current_price, threshold=threshold)
+        
+        # Evaluate alert rules against rolling per-watch-entry state
+        seed_from_history(alert_state, watch_id, previous)
+        alerts = evaluate_observation(alert_state, watch_id, current_price, threshold, rules)
         
-        # Check if price is at or below threshold
         if current_price <= threshold:
             savings = threshold - current_price
             print(f"  ✅ ALERT: Price is ${savings:.2f} below/at threshold!")
-            
-            # Check if this is a new alert (price wasn't below threshold before)
-            previous_data = history.get(item_id, {})
-            previous_price = previous_data.get('price')
-            previous_alert = previous_data.get('alert_triggered', False)
-            
-            # Only create issue if this is a new alert or price dropped further
-            if not previous_alert or (previous_price and current_price < previous_price):
-                if config['notification']['enabled']:
-                    create_github_issue(item_name, current_price, threshold, url)
-                    alerts_triggered += 1
-            else:
-                print(f"  ℹ️  Alert already active (no new issue created)")
         else:
             difference = current_price - threshold
             print(f"  ℹ️  Price is ${difference:.2f} above threshold")
         
+        for alert in alerts:
+            print(f"  🔔 {alert['message']}")
+        
+        # Product-level subscriber thresholds, evaluated once per product
+        reasons = [alert['message'] for alert in alerts]
+        issue_threshold = threshold
+        if not shared:
+            previous_price = previous.get('price') if previous else None
+            now_below, recovered = subscription_index.crossed(item['product_key'], previous_price, current_price)
+            # New subscriptions the price already met before this check
+            late = [entry for entry in already_below.pop(item['product_key'], [])
+                    if current_price <= entry[0] and entry not in now_below]
+            now_below = sorted(now_below + late)
+            if now_below:
+                subscriptions_crossed += len(now_below)
+                print(f"  🔔 {len(now_below)} subscriber threshold(s) crossed")
+                reasons.append(subscriber_reason(now_below, current_price))
+                issue_threshold = max(threshold, now_below[-1][0])
+            if recovered:
+                print(f"  ℹ️  {len(recovered)} subscriber(s) back above threshold")
+        
+        # One issue per item, listing every rule that fired
+        if reasons:
+            if config['notification']['enabled']:
+                reason = "\n".join(f"- {message}" for message in reasons)
+                create_github_issue(item_name, current_price, issue_threshold, url, reason)
+                alerts_triggered += 1
+        elif is_alert_active(alert_state, watch_id):
+            print(f"  ℹ️  Alert already active (no new issue created)")
+        
         # Update history
-        history[item_id] = {
+        history[watch_id] = {
             'name': item_name,
             'price': current_price,
             'threshold': threshold,
             'last_checked': datetime.now().isoformat(),
-            'alert_triggered': current_price <= threshold
+            'alert_triggered': is_alert_active(alert_state, watch_id),
+            'volatility': update_volatility(previous, current_price)
         }
+        if matrix is not None:
+            history[watch_id]['stores'] = matrix
+            history[watch_id]['best_store'] = best_store
+        checkpointer.item_done()
+    
+    if tiers['browser_pool'] is not None:
+        tiers['browser_pool'].close()
+    if store_fetcher is not None:
+        store_fetcher.close()
     
     # Save updated history
-    save_price_history(history)
+    save_progress()
+    save_config_snapshot(config, snapshot, pending=unpriced + [item['watch_id'] for item in deferred])
+    compacted = compaction.join()
     
     print("\n" + "=" * 80)
     print(f"Check Complete: {alerts_triggered} new alerts triggered")
+    if skipped:
+        print(f"Skipped {skipped} items (price unknown) - circuit open:")
+        for line in http_client.summary_lines():
+            print(f"  {line}")
+    for line in http_client.transfer_summary_lines():
+        print(f"Transfer {line}")
+    for line in strategy_summary_lines():
+        print(f"Extraction {line}")
+    if store_fetcher is not None:
+        stats = store_fetcher.stats
+        print(f"Store matrix: {stats['requests']} requests, "
+              f"{stats['duplicate_bodies']} duplicate responses reused")
+    if subscriptions_crossed:
+        print(f"Subscriber thresholds crossed: {subscriptions_crossed} of {len(subscription_index)}")
+    if flight.stats['saved']:
+        print(f"Coalesced fetches: {flight.stats['fetches']} for {flight.stats['calls']} watch entries "
+              f"({flight.stats['saved']} fetches saved)")
+    if resumed:
+        print(f"Resumed run: skipped {resumed} items checked before the restart")
+    if checkpointer.checkpoints:
+        print(f"Checkpoints written during run: {checkpointer.checkpoints}")
+    if compacted and compacted['expired']:
+        print(f"Retention: rolled {compacted['expired']} old observations into {compacted['rollups']} hourly "
+              f"rollups ({compacted['merged']} hourly merged into daily)")
+    if deferred:
+        print(f"Deferred {len(deferred)} items (deadline reached):")
+        for item in deferred:
+            print(f"  - {item['name']} ({item['item_id']})")
     print("=" * 80 + "\n")
     
     # Exit with error code 1 if any alerts were triggered (to fail the workflow)
@@ -249,5 +607,19 @@ def check_prices():
         sys.exit(0)
 
 
+def env_deadline():
+    """Run budget from the RUN_DEADLINE_SECONDS environment variable, if set"""
+    value = os.environ.get('RUN_DEADLINE_SECONDS')
+    return float(value) if value else None
+
+
 if __name__ == "__main__":
-    check_prices()
+    parser = argparse.ArgumentParser(description="Costco price checker")
+    parser.add_argument('--deadline', type=float,
+                        help="Time budget in seconds; check highest-value items first and stop before it")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip items already checked within the resume window (after an interrupted run)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only check items added or changed in the config since the last run")
+    args = parser.parse_args()
+    check_prices(deadline_seconds=args.deadline, resume=args.resume, incremental=args.incremental)
@@ -0,0 +1,386 @@
+"""
+Byte-level Price Extractors
+The fallback cascade the page scrapers use (meta tag, JSON-LD, data-testid,
+class selectors, raw regex), written against raw bytes so it can run
+directly over a memory-mapped page without building a soup tree.
+
+Every strategy accepts any buffer ``re`` can search (bytes, bytearray,
+mmap) and returns a float price or None. extract_price_streaming tries the
+meta tag while a page is still downloading, so the rest of a
+multi-megabyte body needn't be read.
+
+Element strategies (testid, class selectors) read an element's text the
+way BeautifulSoup's get_text does: nested tags are stripped, so
+<div class="price"><span>$</span>299.99</div> reads as "$299.99", and
+class attributes match on any of their space-separated values.
+
+Callers that pass a page key (page_key(url): host + URL template) get
+per-site strategy memoization: the fallback strategy that last produced
+a valid price for that key is tried right after structured data, and the
+rest of the cascade only runs when it misses. Structured data (meta tag,
+JSON-LD) is authoritative and always runs first in the same order, so a
+memo never changes which price a page yields. Preferred
+strategies persist in extraction_strategies.json;
+strategy_summary_lines() reports this run's first-try hit rates and
+flags keys whose preferred strategy keeps missing or just changed, the
+usual sign of a site redesign.
+"""
+
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import json_codec
+
+PRICE_TESTID = b'Text_single-price-whole-value'
+
+_META_PRICE_RE = re.compile(
+    rb'<meta[^>]+property=["\']product:price:amount["\'][^>]*content=["\']([\d,.]+)["\']'
+    rb'|<meta[^>]+content=["\']([\d,.]+)["\'][^>]*property=["\']product:price:amount["\']',
+    re.IGNORECASE
+)
+_TESTID_RE = re.compile(
+    rb'<[a-zA-Z][a-zA-Z0-9]*\s[^>]*data-testid=["\']Text_single-price-whole-value["\']'
+)
+
+
+def _class_token_re(token):
+    """Start tag whose class attribute includes token among its values"""
+    return re.compile(
+        rb'<[a-zA-Z][a-zA-Z0-9]*(?:\s[^>]*?)?\sclass=(["\'])(?:[^"\']*\s)?' + token + rb'(?:\s[^"\']*)?\1[^>]*>',
+        re.IGNORECASE
+    )
+
+
+# Same order as the old soup cascade: class="price", class="value", itemprop="price"
+_CLASS_SELECTOR_RES = [
+    _class_token_re(b'price'),
+    _class_token_re(b'value'),
+    re.compile(rb'<[a-zA-Z][a-zA-Z0-9]*(?:\s[^>]*?)?\sitemprop=["\']price["\'][^>]*>', re.IGNORECASE),
+]
+_CONTENT_ATTR_RE = re.compile(rb'\scontent=["\']([\d,.]+)["\']', re.IGNORECASE)
+_TAG_RE = re.compile(rb'<(/?)([a-zA-Z][a-zA-Z0-9]*)[^>]*?(/?)>')
+_NUMBER_RE = re.compile(rb'([\d,]*\d(?:\.\d+)?)')
+VOID_TAGS = {b'area', b'base', b'br', b'col', b'embed', b'hr', b'img', b'input', b'link', b'meta', b'source', b'wbr'}
+# Most markup read when collecting one element's text
+ELEMENT_WINDOW = 4096
+_JSON_LD_RE = re.compile(
+    rb'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE
+)
+_TEXT_PRICE_RE = re.compile(
+    rb'Text_single-price-whole-value[^$\d]{0,200}\$?([\d,]+\.\d{2})'
+)
+
+# Prices below this are rejected; raise it with "extraction": {"min_valid_price": ...}
+# in config.json if a site renders placeholder prices (e.g. JSON-LD "price": 1)
+MIN_VALID_PRICE = 0.01
+min_valid_price = MIN_VALID_PRICE
+
+
+def configure(config):
+    """Apply the config's "extraction" settings"""
+    global min_valid_price
+    min_valid_price = config.get('extraction', {}).get('min_valid_price', MIN_VALID_PRICE)
+
+
+def _to_price(raw):
+    """Convert a matched byte string like b'1,299.99' to float, or None."""
+    if not raw:
+        return None
+    try:
+        price = float(raw.replace(b',', b'').decode('ascii'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return price if price >= min_valid_price else None
+
+
+def _element_text(buf, start):
+    """
+    Text of the element whose start tag begins at buf[start], like get_text
+
+    Tags inside the element are dropped and their text kept. Only the
+    first ELEMENT_WINDOW bytes are read.
+    """
+    window = bytes(buf[start:start + ELEMENT_WINDOW])
+    opening = _TAG_RE.match(window)
+    if not opening or opening.group(3) or opening.group(2).lower() in VOID_TAGS:
+        return b''
+    name = opening.group(2).lower()
+    depth = 1
+    pos = opening.end()
+    parts = []
+    for tag in _TAG_RE.finditer(window, pos):
+        parts.append(window[pos:tag.start()])
+        pos = tag.end()
+        if tag.group(2).lower() != name:
+            continue
+        if tag.group(1):
+            depth -= 1
+            if depth == 0:
+                return b''.join(parts)
+        elif not tag.group(3):
+            depth += 1
+    parts.append(window[pos:])
+    return b''.join(parts)
+
+
+def _price_from_text(text):
+    """First number in an element's text (b'$ 1,299.99 After OFF' -> 1299.99)"""
+    match = _NUMBER_RE.search(text)
+    return _to_price(match.group(1)) if match else None
+
+
+def extract_meta_tag(buf):
+    """Price from <meta property="product:price:amount">"""
+    match = _META_PRICE_RE.search(buf)
+    if match:
+        return _to_price(match.group(1) or match.group(2))
+    return None
+
+
+def extract_testid(buf):
+    """Price from the data-testid="Text_single-price-whole-value" element"""
+    match = _TESTID_RE.search(buf)
+    return _price_from_text(_element_text(buf, match.start())) if match else None
+
+
+def extract_class_selector(buf):
+    """Price from the first class="price", class="value" or itemprop="price" element"""
+    for pattern in _CLASS_SELECTOR_RES:
+        match = pattern.search(buf)
+        if not match:
+            continue
+        # <meta itemprop="price" content="299.99"> carries the price in an attribute
+        content = _CONTENT_ATTR_RE.search(match.group(0))
+        price = _to_price(content.group(1)) if content else _price_from_text(_element_text(buf, match.start()))
+        if price is not None:
+            return price
+    return None
+
+
+def extract_json_ld(buf):
+    """Price from a schema.org Product block in JSON-LD"""
+    for match in _JSON_LD_RE.finditer(buf):
+        try:
+            data = json_codec.loads(match.group(1))
+        except (json_codec.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(data, dict) and data.get('@type') == 'Product':
+            offers = data.get('offers') or {}
+            if isinstance(offers, list):
+                offers = offers[0] if offers else {}
+            price = offers.get('price')
+            if price is not None:
+                return _to_price(str(price).encode('ascii', 'ignore'))
+    return None
+
+
+def extract_regex(buf):
+    """Last resort: first dollar amount near the price testid"""
+    match = _TEXT_PRICE_RE.search(buf)
+    return _to_price(match.group(1)) if match else None
+
+
+# Cascade order. The page scrapers try JSON-LD after the testid and class
+# selectors; here structured data ranks first, so a memoized fallback can
+# run right after it without changing which strategy wins.
+STRATEGIES = [
+    ('meta_tag', extract_meta_tag),
+    ('json_ld', extract_json_ld),
+    ('testid', extract_testid),
+    ('class_selector', extract_class_selector),
+    ('regex', extract_regex),
+]
+STRATEGY_FUNCTIONS = dict(STRATEGIES)
+# Authoritative schema data, first in STRATEGIES; memoization never reorders these
+STRUCTURED_STRATEGIES = ('meta_tag', 'json_ld')
+
+STRATEGY_FILE = Path(__file__).parent / "extraction_strategies.json"
+# Consecutive first-try misses before a key is reported as likely broken
+MISS_STREAK_WARNING = 3
+
+_memo = None
+_memo_lock = threading.Lock()
+# This run's counters: key -> {'hits', 'misses', 'cascade', 'failed', 'switched'}
+run_stats = {}
+
+
+def page_key(url):
+    """
+    Memo key for a page: host plus URL template
+
+    Numbers become '#' and slugs '*', so every product page on a site
+    shares one key: 'www.costco.com/*.product.#.html'
+    """
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        pieces = []
+        for piece in segment.split('.'):
+            if piece.isdigit():
+                pieces.append('#')
+            elif '-' in piece or any(char.isdigit() for char in piece):
+                pieces.append('*')
+            else:
+                pieces.append(piece)
+        segments.append('.'.join(pieces))
+    return f"{parts.netloc.lower()}{'/'.join(segments)}"
+
+
+def _memo_state():
+    global _memo
+    if _memo is None:
+        _memo = json_codec.load_file(STRATEGY_FILE)
+    return _memo
+
+
+def save_strategy_memo():
+    """Persist preferred strategies and cumulative strategy counts"""
+    if _memo is not None:
+        with _memo_lock:
+            json_codec.save_file(STRATEGY_FILE, _memo)
+
+
+def preferred_strategy(key):
+    """Strategy that last produced a valid price for key, or None"""
+    with _memo_lock:
+        return _memo_state().get(key, {}).get('preferred')
+
+
+def _record(key, preferred, winner):
+    """Update memo and run stats after one extraction for key"""
+    with _memo_lock:
+        entry = _memo_state().setdefault(key, {'preferred': None, 'miss_streak': 0, 'wins': {}})
+        stats = run_stats.setdefault(key, {'hits': 0, 'misses': 0, 'cascade': 0, 'failed': 0, 'switched': None})
+        if preferred is not None:
+            if winner == preferred:
+                stats['hits'] += 1
+                entry['miss_streak'] = 0
+            else:
+                stats['misses'] += 1
+                entry['miss_streak'] += 1
+        else:
+            stats['cascade'] += 1
+        if winner is None:
+            stats['failed'] += 1
+            return
+        entry['wins'][winner] = entry['wins'].get(winner, 0) + 1
+        if winner != entry['preferred']:
+            if entry['preferred'] is not None:
+                stats['switched'] = (entry['preferred'], winner)
+                entry['switched_at'] = datetime.now().isoformat()
+                entry['switched_from'] = entry['preferred']
+            entry['preferred'] = winner
+            entry['miss_streak'] = 0
+
+
+def cascade_order(preferred=None):
+    """
+    Strategy names in the order to try them
+
+    This is the STRATEGIES order, except that a preferred fallback
+    strategy moves up to right after the structured ones. Structured
+    data keeps its order either way, so a page with a meta tag or JSON-LD
+    price yields the same price with or without a memo.
+    """
+    order = [name for name, _ in STRATEGIES]
+    if preferred in STRATEGY_FUNCTIONS and preferred not in STRUCTURED_STRATEGIES:
+        order.remove(preferred)
+        order.insert(len(STRUCTURED_STRATEGIES), preferred)
+    return order
+
+
+def extract_price(buf, key=None):
+    """
+    Run the extractor cascade over a raw page buffer
+
+    Args:
+        buf: bytes, bytearray or mmap holding the page body
+        key: page_key of the page; enables strategy memoization
+
+    Returns:
+        tuple: (price, strategy_name) or (None, None) if nothing matched
+    """
+    preferred = preferred_strategy(key) if key else None
+    for name in cascade_order(preferred):
+        price = STRATEGY_FUNCTIONS[name](buf)
+        if price is not None:
+            if key:
+                _record(key, preferred, name)
+            return price, name
+    if key:
+        _record(key, preferred, None)
+    return None, None
+
+
+def strategy_summary_lines():
+    """Per-key first-try hit rates this run, with redesign warnings"""
+    lines = []
+    with _memo_lock:
+        memo = _memo_state()
+        for key, stats in sorted(run_stats.items()):
+            entry = memo.get(key, {})
+            tried = stats['hits'] + stats['misses']
+            rate = f"{stats['hits'] / tried:.0%} first-try hits ({stats['hits']}/{tried})" if tried else "no memo yet"
+            line = f"{key}: {entry.get('preferred') or 'none'} preferred, {rate}"
+            if stats['failed']:
+                line += f", {stats['failed']} pages unpriced"
+            if stats['switched']:
+                line += f" ⚠️  preferred changed {stats['switched'][0]} → {stats['switched'][1]}"
+            elif entry.get('miss_streak', 0) >= MISS_STREAK_WARNING:
+                line += f" ⚠️  preferred missed {entry['miss_streak']} pages in a row"
+            lines.append(line)
+    return lines
+
+
+# Strategies safe to stop a partial page on: a short, local run of markup
+# that nothing later in the body can outrank (only the top of the cascade)
+EARLY_STRATEGIES = ('meta_tag',)
+# Bytes re-scanned across chunk boundaries, and held back at the end of a
+# partial buffer (a price split across chunks could otherwise match short)
+STREAM_OVERLAP = 4096
+STREAM_HOLDBACK = 256
+
+
+def extract_price_streaming(chunks, key=None):
+    """
+    Run the cascade over a body as it streams in, stopping early if possible
+
+    Args:
+        chunks: Iterable of body byte chunks (e.g. http_client.stream);
+                it is closed as soon as an early strategy finds a price
+        key: page_key of the page; enables strategy memoization. Only
+             the meta tag stops the download early, memo or not: any
+             other match could be outranked by JSON-LD later in the body.
+
+    Returns:
+        tuple: (price, strategy_name, bytes_read); the full cascade runs
+               over the whole body if no early strategy matched
+    """
+    preferred = preferred_strategy(key) if key else None
+    early = [(name, strategy) for name, strategy in STRATEGIES if name in EARLY_STRATEGIES]
+    buffer = bytearray()
+    scanned = 0
+    try:
+        for chunk in chunks:
+            buffer += chunk
+            end = len(buffer) - STREAM_HOLDBACK
+            if end <= scanned:
+                continue
+            region = bytes(buffer[max(scanned - STREAM_OVERLAP, 0):end])
+            for name, strategy in early:
+                price = strategy(region)
+                if price is not None:
+                    if key:
+                        _record(key, preferred, name)
+                    return price, name, len(buffer)
+            scanned = end
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+    price, name = extract_price(buffer, key)
+    return price, name, len(buffer)
@@ -0,0 +1,167 @@
+"""
+Run-Length-Encoded Price History
+Most checks find the same price as the one before, so instead of a record
+per check each product's history is a list of price intervals:
+
+    {"price": 299.99, "threshold": 300.0,
+     "first_seen": "2025-11-05T23:47:32", "last_seen": "2025-11-20T08:00:00",
+     "check_count": 41}
+
+A check at the current interval's price (and threshold) moves last_seen
+and bumps check_count in place; a different price opens a new interval.
+The file grows with price changes rather than with checks, and "how long
+has it been at this price" is just the current interval's span.
+
+expand() turns intervals back into per-check records in the old
+price_check_history.json layout for anything that wants them. first_seen
+and last_seen are exact; the checks in between are spaced evenly, which
+matches scheduled runs.
+
+History lives in price_intervals.json, keyed by product name. The first
+load converts an existing price_check_history.json; that file is left
+in place and no longer written.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import json_codec
+
+INTERVALS_FILE = Path(__file__).parent / "price_intervals.json"
+LEGACY_HISTORY_FILE = Path(__file__).parent / "price_check_history.json"
+
+
+def load_intervals(intervals_file=INTERVALS_FILE, legacy_file=LEGACY_HISTORY_FILE):
+    """
+    Load interval history (converting price_check_history.json if there is none yet)
+
+    Returns:
+        dict: product -> [interval, ...] oldest first
+    """
+    if Path(intervals_file).exists():
+        return json_codec.load_file(intervals_file)
+    return from_checks(json_codec.load_file(legacy_file, empty=list))
+
+
+def save_intervals(intervals, intervals_file=INTERVALS_FILE):
+    """Save interval history (indented; it is committed and read in diffs)"""
+    json_codec.save_file(intervals_file, intervals, pretty=True)
+
+
+def record_check(intervals, product, price, timestamp=None, threshold=None):
+    """
+    Record one check, extending the current interval if nothing changed
+
+    Args:
+        intervals: History from load_intervals (updated in place)
+        product: Product name
+        price: Observed price
+        timestamp: ISO timestamp (defaults to now)
+        threshold: Alert threshold in effect
+
+    Returns:
+        dict: The interval the check landed in
+    """
+    timestamp = timestamp or datetime.now().isoformat()
+    history = intervals.setdefault(product, [])
+    current = history[-1] if history else None
+    if (current and current['price'] == price and current.get('threshold') == threshold
+            and timestamp >= current['last_seen']):
+        current['last_seen'] = timestamp
+        current['check_count'] += 1
+        return current
+    current = {
+        'price': price,
+        'threshold': threshold,
+        'first_seen': timestamp,
+        'last_seen': timestamp,
+        'check_count': 1
+    }
+    history.append(current)
+    return current
+
+
+def from_checks(checks):
+    """Build interval history from per-check records (price_check_history.json layout)"""
+    intervals = {}
+    for check in sorted(checks, key=lambda check: check['timestamp']):
+        if check.get('price') is None:
+            continue
+        record_check(intervals, check.get('product', 'unknown'), check['price'],
+                     check['timestamp'], check.get('threshold'))
+    return intervals
+
+
+def current_interval(intervals, product):
+    """The product's latest interval, or None"""
+    history = intervals.get(product)
+    return history[-1] if history else None
+
+
+def time_at_price(interval, now=None):
+    """
+    How long a price held
+
+    Args:
+        interval: An interval dict
+        now: For the current interval, measure up to this time instead of
+             last_seen (e.g. datetime.now())
+
+    Returns:
+        timedelta
+    """
+    end = now or datetime.fromisoformat(interval['last_seen'])
+    return end - datetime.fromisoformat(interval['first_seen'])
+
+
+def expand(intervals, product=None):
+    """
+    Per-check records, oldest first
+
+    Args:
+        intervals: Interval history
+        product: Only this product (optional)
+
+    Yields:
+        dict: {timestamp, product, price, threshold, alert_triggered}
+    """
+    products = [product] if product is not None else list(intervals)
+    for name in products:
+        for interval in intervals.get(name, []):
+            count = interval['check_count']
+            first = datetime.fromisoformat(interval['first_seen'])
+            step = (datetime.fromisoformat(interval['last_seen']) - first) / (count - 1) if count > 1 else timedelta(0)
+            threshold = interval.get('threshold')
+            for index in range(count):
+                timestamp = interval['last_seen'] if index == count - 1 else (first + step * index).isoformat()
+                yield {
+                    'timestamp': timestamp,
+                    'product': name,
+                    'price': interval['price'],
+                    'threshold': threshold,
+                    'alert_triggered': threshold is not None and interval['price'] < threshold
+                }
+
+
+def price_stats(intervals, product):
+    """
+    Summary statistics computed from intervals (no expansion)
+
+    Returns:
+        dict: total_checks, lowest/highest/average/current price,
+              first/last check, time at current price; None if no history
+    """
+    history = intervals.get(product)
+    if not history:
+        return None
+    total = sum(interval['check_count'] for interval in history)
+    return {
+        'total_checks': total,
+        'lowest_price': min(interval['price'] for interval in history),
+        'highest_price': max(interval['price'] for interval in history),
+        'average_price': sum(interval['price'] * interval['check_count'] for interval in history) / total,
+        'current_price': history[-1]['price'],
+        'first_check': history[0]['first_seen'],
+        'last_check': history[-1]['last_seen'],
+        'at_current_price': time_at_price(history[-1])
+    }
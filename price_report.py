@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Static HTML Price Report
+Builds a dashboard from the observation history: one page per item with
+an inline SVG price chart and its threshold line, plus an index sorted by
+distance to threshold (items at or below threshold first).
+
+    exports/report/index.html
+    exports/report/items/<item>.html
+
+Builds are incremental. observations.jsonl is append-only, so the byte
+offset already reported is kept as a watermark in _report_state.json and
+only lines after it are read. Each item's price series is cached in
+_series/<item>.json; only items with new observations (or whose name or
+threshold changed in the config) get their page re-rendered. The index
+is rebuilt every time from the per-item summaries in the state file.
+A fresh build starts from the price-change points of history the
+retention policy has rolled up.
+
+No dependencies beyond the standard library; the pages need no
+JavaScript and work offline.
+
+Usage:
+    python price_report.py              # render items with new observations
+    python price_report.py --full       # re-render everything
+"""
+
+import argparse
+import bisect
+import re
+import shutil
+import time
+from datetime import datetime
+from html import escape
+from pathlib import Path
+
+import json_codec
+from config_compiler import compile_config
+from history_store import OBSERVATIONS_FILE, is_correction, log_anchor, read_new_observations, resume_offset, same_check
+from retention import rollup_observations
+
+REPORT_DIR = Path(__file__).parent / "exports" / "report"
+STATE_FILE_NAME = "_report_state.json"
+SERIES_DIR_NAME = "_series"
+REPORT_VERSION = 1  # bump when page layout changes, to force a full rebuild
+
+CHART_WIDTH = 720
+CHART_HEIGHT = 240
+CHART_PADDING = 40
+CHART_MAX_POINTS = 600
+RECENT_ROWS = 20
+
+STYLE = """
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; }
+th, td { padding: 4px 12px; border-bottom: 1px solid #ddd; text-align: left; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+tr.below { background: #e8f5e9; }
+.muted { color: #888; }
+"""
+
+
+def _slug(item_id):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', str(item_id)).strip('-') or 'item'
+
+
+def _fresh_state():
+    return {'version': REPORT_VERSION, 'observations_offset': 0, 'items': {}, 'rollups_loaded': False}
+
+
+def load_report_state(report_dir=REPORT_DIR):
+    """Watermark and per-item summaries of the last build"""
+    return json_codec.load_file(Path(report_dir) / STATE_FILE_NAME, empty=_fresh_state)
+
+
+def save_report_state(state, report_dir=REPORT_DIR):
+    """Persist the build watermark and summaries"""
+    json_codec.save_file(Path(report_dir) / STATE_FILE_NAME, state)
+
+
+def _series_path(report_dir, item_id):
+    return Path(report_dir) / SERIES_DIR_NAME / f"{_slug(item_id)}.json"
+
+
+def load_series(report_dir, item_id):
+    """Cached [[timestamp, price], ...] for an item, oldest first"""
+    return json_codec.load_file(_series_path(report_dir, item_id), empty=list)
+
+
+def merge_observations(series, observations):
+    """
+    Add observations to an item's series
+
+    Failed checks (price None) are skipped. Multi-store checks write one
+    observation per store; those with the same check_id fold into the
+    best store price. Backfilled observations can be older than
+    the series, so it is re-sorted only when needed; a backfill correction
+    replaces the point at its timestamp.
+
+    Returns:
+        list: Updated series
+    """
+    in_order = True
+    corrections = {}
+    # Check of the last point appended; a check's observations are written together
+    previous = None
+    for observation in observations:
+        price = observation.get('price')
+        if price is None:
+            continue
+        timestamp = observation['timestamp']
+        if is_correction(observation):
+            corrections[timestamp] = price
+            continue
+        if series and same_check(observation, previous):
+            series[-1][1] = min(series[-1][1], price)
+            continue
+        if series and timestamp < series[-1][0]:
+            in_order = False
+        series.append([timestamp, price])
+        previous = (observation.get('check_id'), timestamp) if observation.get('store') is not None else None
+    if not in_order:
+        series.sort(key=lambda point: point[0])
+    for timestamp, price in corrections.items():
+        index = bisect.bisect_left(series, timestamp, key=lambda point: point[0])
+        if index < len(series) and series[index][0] == timestamp:
+            series[index][1] = price
+        else:
+            series.insert(index, [timestamp, price])
+    return series
+
+
+def distance_to_threshold(price, threshold):
+    """Fraction above threshold (negative when below); None if unknown"""
+    if price is None or not threshold:
+        return None
+    return (price - threshold) / threshold
+
+
+def _chart_points(series, max_points=CHART_MAX_POINTS):
+    """Thin a long series for drawing, keeping each bucket's low and high"""
+    if len(series) <= max_points:
+        return series
+    bucket_size = len(series) / (max_points // 2)
+    points = []
+    for bucket in range(max_points // 2):
+        chunk = series[int(bucket * bucket_size):int((bucket + 1) * bucket_size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda point: point[1])
+        high = max(chunk, key=lambda point: point[1])
+        points.extend(sorted({tuple(low), tuple(high)}))
+    return points
+
+
+def render_chart(series, threshold=None):
+    """
+    Inline SVG step chart of an item's price with a dashed threshold line
+
+    Args:
+        series: [[timestamp, price], ...] oldest first
+        threshold: Alert threshold (optional)
+
+    Returns:
+        str: <svg> markup
+    """
+    if not series:
+        return '<p class="muted">No observations yet.</p>'
+    points = _chart_points(series)
+    times = [datetime.fromisoformat(timestamp).timestamp() for timestamp, _ in points]
+    prices = [price for _, price in points]
+    low, high = min(prices), max(prices)
+    if threshold:
+        low, high = min(low, threshold), max(high, threshold)
+    if high == low:
+        low, high = low - 1, high + 1
+    start, end = times[0], times[-1]
+    span = (end - start) or 1
+    plot_width = CHART_WIDTH - 2 * CHART_PADDING
+    plot_height = CHART_HEIGHT - 2 * CHART_PADDING
+
+    def x(t):
+        return CHART_PADDING + (t - start) / span * plot_width
+
+    def y(price):
+        return CHART_PADDING + (high - price) / (high - low) * plot_height
+
+    # Step line: a price holds until the next observation
+    coords = []
+    for index, (t, price) in enumerate(zip(times, prices)):
+        if index:
+            coords.append(f"{x(t):.1f},{y(prices[index - 1]):.1f}")
+        coords.append(f"{x(t):.1f},{y(price):.1f}")
+    if len(times) == 1:
+        coords.append(f"{x(start) + plot_width:.1f},{y(prices[0]):.1f}")
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{CHART_WIDTH}" height="{CHART_HEIGHT}" '
+        f'viewBox="0 0 {CHART_WIDTH} {CHART_HEIGHT}" role="img" aria-label="Price chart">',
+        f'<rect x="{CHART_PADDING}" y="{CHART_PADDING}" width="{plot_width}" height="{plot_height}" '
+        f'fill="none" stroke="#ddd"/>',
+        f'<polyline points="{" ".join(coords)}" fill="none" stroke="#1565c0" stroke-width="2"/>',
+        f'<text x="4" y="{y(high) + 4:.1f}" font-size="11">${high:,.2f}</text>',
+        f'<text x="4" y="{y(low) + 4:.1f}" font-size="11">${low:,.2f}</text>',
+        f'<text x="{CHART_PADDING}" y="{CHART_HEIGHT - 12}" font-size="11">{escape(series[0][0][:10])}</text>',
+        f'<text x="{CHART_WIDTH - CHART_PADDING}" y="{CHART_HEIGHT - 12}" font-size="11" '
+        f'text-anchor="end">{escape(series[-1][0][:10])}</text>',
+    ]
+    if threshold:
+        parts.append(f'<line x1="{CHART_PADDING}" x2="{CHART_WIDTH - CHART_PADDING}" '
+                     f'y1="{y(threshold):.1f}" y2="{y(threshold):.1f}" stroke="#c62828" '
+                     f'stroke-dasharray="6 4"/>')
+        parts.append(f'<text x="{CHART_WIDTH - CHART_PADDING}" y="{y(threshold) - 4:.1f}" font-size="11" '
+                     f'text-anchor="end" fill="#c62828">threshold ${threshold:,.2f}</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def _format_price(price):
+    return '—' if price is None else f"${price:,.2f}"
+
+
+def _format_distance(distance):
+    return '—' if distance is None else f"{distance:+.1%}"
+
+
+def _page(title, body):
+    return (f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{escape(title)}</title>\n<style>{STYLE}</style>\n</head>\n<body>\n'
+            f'{body}\n<p class="muted">Generated {datetime.now().strftime("%Y-%m-%d %H:%M")}</p>\n'
+            f'</body>\n</html>\n')
+
+
+def render_item_page(item_id, summary, series):
+    """HTML page for one item: headline numbers, chart and recent checks"""
+    threshold = summary.get('threshold')
+    recent = ''.join(
+        f'<tr><td>{escape(timestamp[:16].replace("T", " "))}</td><td class="num">{_format_price(price)}</td></tr>'
+        for timestamp, price in reversed(series[-RECENT_ROWS:])
+    )
+    body = f"""<p><a href="../index.html">← All items</a></p>
+<h1>{escape(summary['name'])}</h1>
+<p class="muted">Item {escape(str(item_id))}</p>
+<table>
+<tr><th>Current</th><td class="num">{_format_price(summary.get('price'))}</td></tr>
+<tr><th>Threshold</th><td class="num">{_format_price(threshold)}</td></tr>
+<tr><th>Distance</th><td class="num">{_format_distance(summary.get('distance'))}</td></tr>
+<tr><th>Low / High</th><td class="num">{_format_price(summary.get('low'))} / {_format_price(summary.get('high'))}</td></tr>
+<tr><th>Checks</th><td class="num">{summary.get('count', 0)}</td></tr>
+</table>
+{render_chart(series, threshold)}
+<h2>Recent checks</h2>
+<table>
+<tr><th>Time</th><th>Price</th></tr>
+{recent}
+</table>"""
+    return _page(summary['name'], body)
+
+
+def _index_sort_key(entry):
+    distance = entry[1].get('distance')
+    return (distance is None, distance if distance is not None else 0, entry[1]['name'])
+
+
+def render_index(items):
+    """Index page of all items, closest to (or furthest below) threshold first"""
+    rows = []
+    for item_id, summary in sorted(items.items(), key=_index_sort_key):
+        distance = summary.get('distance')
+        row_class = ' class="below"' if distance is not None and distance <= 0 else ''
+        rows.append(
+            f'<tr{row_class}><td><a href="items/{escape(summary["page"])}">{escape(summary["name"])}</a></td>'
+            f'<td class="num">{_format_price(summary.get("price"))}</td>'
+            f'<td class="num">{_format_price(summary.get("threshold"))}</td>'
+            f'<td class="num">{_format_distance(distance)}</td>'
+            f'<td>{escape((summary.get("last_seen") or "")[:16].replace("T", " "))}</td></tr>'
+        )
+    below = sum(1 for summary in items.values()
+                if summary.get('distance') is not None and summary['distance'] <= 0)
+    body = f"""<h1>Price Report</h1>
+<p>{len(items)} items, {below} at or below threshold.</p>
+<table>
+<tr><th>Item</th><th>Price</th><th>Threshold</th><th>Distance</th><th>Last checked</th></tr>
+{''.join(rows)}
+</table>"""
+    return _page('Price Report', body)
+
+
+def _configured_items(config=None):
+    """item_id -> (name, threshold) from the compiled config"""
+    if config is None:
+        try:
+            config = compile_config()
+        except Exception as e:
+            print(f"⚠️  Config not loaded ({e}); names and thresholds come from observations")
+            return {}
+    return {item['item_id']: (item.get('name'), item.get('price_threshold')) for item in config.get('items', [])}
+
+
+def _summarize(item_id, series, previous, configured, observations):
+    name, threshold = configured.get(item_id, (None, None))
+    if threshold is None:
+        thresholds = [o['threshold'] for o in observations if o.get('threshold') is not None]
+        threshold = thresholds[-1] if thresholds else previous.get('threshold')
+    prices = [price for _, price in series]
+    price = prices[-1] if prices else None
+    return {
+        'name': name or previous.get('name') or str(item_id),
+        'threshold': threshold,
+        'price': price,
+        'low': min(prices) if prices else None,
+        'high': max(prices) if prices else None,
+        'count': len(series),
+        'last_seen': series[-1][0] if series else None,
+        'distance': distance_to_threshold(price, threshold),
+        'page': f"{_slug(item_id)}.html"
+    }
+
+
+def build(report_dir=REPORT_DIR, full=False, observations_file=OBSERVATIONS_FILE, config=None):
+    """
+    Render pages for items with observations since the last build
+
+    Args:
+        report_dir: Output directory
+        full: Drop the report and re-render everything
+        observations_file: Observation log to read
+        config: Compiled config for names/thresholds (loaded if None)
+
+    Returns:
+        dict: Pages rendered, items total, and seconds taken
+    """
+    report_dir = Path(report_dir)
+    start = time.perf_counter()
+
+    state = load_report_state(report_dir)
+    # Retention compaction moves offsets; find the watermark's line again
+    offset = resume_offset(state['observations_offset'], state.get('observations_anchor'), observations_file)
+    if full or state.get('version') != REPORT_VERSION or offset is None:
+        shutil.rmtree(report_dir, ignore_errors=True)
+        state = _fresh_state()
+        offset = 0
+    (report_dir / 'items').mkdir(parents=True, exist_ok=True)
+    (report_dir / SERIES_DIR_NAME).mkdir(parents=True, exist_ok=True)
+
+    observations, offset = read_new_observations(offset, observations_file)
+    if not state.get('rollups_loaded', True):
+        # Fresh build: start from history the retention policy already rolled up
+        observations = rollup_observations() + observations
+        state['rollups_loaded'] = True
+    by_item = {}
+    for observation in observations:
+        by_item.setdefault(str(observation['item_id']), []).append(observation)
+
+    configured = _configured_items(config)
+    # Renamed items and changed thresholds need their page redrawn too
+    for item_id, (name, threshold) in configured.items():
+        summary = state['items'].get(item_id)
+        if summary and (summary['name'] != (name or summary['name']) or
+                        (threshold is not None and summary['threshold'] != threshold)):
+            by_item.setdefault(item_id, [])
+
+    for item_id, item_observations in by_item.items():
+        series = load_series(report_dir, item_id)
+        if item_observations:
+            merge_observations(series, item_observations)
+            json_codec.save_file(_series_path(report_dir, item_id), series)
+        summary = _summarize(item_id, series, state['items'].get(item_id, {}), configured, item_observations)
+        state['items'][item_id] = summary
+        (report_dir / 'items' / summary['page']).write_text(
+            render_item_page(item_id, summary, series), encoding='utf-8')
+
+    (report_dir / 'index.html').write_text(render_index(state['items']), encoding='utf-8')
+    state['observations_offset'] = offset
+    state['observations_anchor'] = log_anchor(offset, observations_file)
+    state['last_build'] = datetime.now().isoformat()
+    save_report_state(state, report_dir)
+    return {'rendered': len(by_item), 'total': len(state['items']), 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static HTML price report")
+    parser.add_argument('--output', default=str(REPORT_DIR), help="Report directory")
+    parser.add_argument('--full', action='store_true', help="Re-render every item")
+    args = parser.parse_args()
+
+    result = build(Path(args.output), full=args.full)
+    print(f"✅ Rendered {result['rendered']} of {result['total']} item pages "
+          f"in {result['seconds']:.2f}s → {Path(args.output) / 'index.html'}")
+
+
+if __name__ == "__main__":
+    main()
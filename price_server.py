@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Local Price Query Server
+Read-only HTTP service over the price history, so other tools can ask for
+an item's latest price, all-time low, or whether it is below threshold
+without cloning the repo and parsing JSON.
+
+History is loaded once into an in-memory index keyed by item_id; each
+item also keeps its observations sorted by timestamp, so range queries
+are two bisects. A background thread watches observations.jsonl and
+reads only what was appended since the last load (the same byte-offset
+watermark export_parquet and price_report use); price_history.json seeds
+items that have no observations yet, and the price-change points in the
+retention rollups cover history older than the raw window. Lookups never touch the disk.
+
+Endpoints (JSON):
+    GET  /items                          all items: price, threshold, below_threshold
+    GET  /items/<id>                     latest, all-time low, threshold, below_threshold
+    GET  /items/<id>/history?since=&until=   [[timestamp, price], ...] (ISO bounds)
+    POST /items/<id>/refresh             fetch the price now and record it
+    GET  /stats                          index size, reloads, refresh coalescing
+
+Concurrent refreshes of the same product share one fetch (SingleFlight);
+the fetched price is appended to the history store with source 'refresh'
+and picked up by the index like any other observation.
+
+Binds to 127.0.0.1 by default; there is no authentication.
+
+Usage:
+    python price_server.py
+    python price_server.py --port 8765 --poll 2
+"""
+
+import argparse
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import json_codec
+from config_compiler import compile_config
+from history_store import OBSERVATIONS_FILE, append_observations, is_correction, log_anchor, make_observation, read_new_observations, resume_offset, same_check
+from retention import ROLLUPS_FILE, rollup_observations
+from single_flight import SingleFlight
+
+HISTORY_FILE = Path(__file__).parent / "price_history.json"
+
+
+class _Item:
+    """Indexed history of one item"""
+
+    __slots__ = ('name', 'threshold', 'times', 'prices', 'low', 'low_at', 'last_check')
+
+    def __init__(self, name=None, threshold=None):
+        self.name = name
+        self.threshold = threshold
+        self.times = []
+        self.prices = []
+        self.low = None
+        self.low_at = None
+        # (check_id, timestamp) of the last store observation appended
+        self.last_check = None
+
+    def add(self, observation):
+        timestamp, price = observation['timestamp'], observation['price']
+        if is_correction(observation):
+            self.correct(timestamp, price)
+        elif self.times and same_check(observation, self.last_check):
+            # One observation per store from the same check: keep the best price
+            price = min(self.prices[-1], price)
+            self.prices[-1] = price
+        elif self.times and timestamp < self.times[-1]:
+            # Backfilled observations can arrive out of order
+            index = bisect.bisect_right(self.times, timestamp)
+            self.times.insert(index, timestamp)
+            self.prices.insert(index, price)
+            self.last_check = None
+        else:
+            self.times.append(timestamp)
+            self.prices.append(price)
+            store = observation.get('store')
+            self.last_check = (observation.get('check_id'), timestamp) if store is not None else None
+        if self.low is None or price < self.low:
+            self.low, self.low_at = price, timestamp
+
+    def correct(self, timestamp, price):
+        """Replace the price at timestamp with a backfill correction"""
+        index = bisect.bisect_left(self.times, timestamp)
+        if index < len(self.times) and self.times[index] == timestamp:
+            replaced = self.prices[index]
+            self.prices[index] = price
+            if replaced == self.low and price > replaced:
+                # The corrected point was the low; find the new one
+                low_index = min(range(len(self.prices)), key=self.prices.__getitem__)
+                self.low, self.low_at = self.prices[low_index], self.times[low_index]
+        else:
+            self.times.insert(index, timestamp)
+            self.prices.insert(index, price)
+
+    def summary(self, item_id):
+        price = self.prices[-1] if self.prices else None
+        return {
+            'item_id': item_id,
+            'name': self.name or item_id,
+            'price': price,
+            'checked_at': self.times[-1] if self.times else None,
+            'low': self.low,
+            'low_at': self.low_at,
+            'threshold': self.threshold,
+            'below_threshold': (price is not None and self.threshold is not None
+                                and price <= self.threshold),
+            'observations': len(self.prices)
+        }
+
+
+class PriceIndex:
+    """In-memory item_id -> history index, refreshed from the history store"""
+
+    def __init__(self, config=None, observations_file=OBSERVATIONS_FILE, history_file=HISTORY_FILE,
+                 rollups_file=ROLLUPS_FILE):
+        self.observations_file = Path(observations_file)
+        self.rollups_file = Path(rollups_file)
+        self.history_file = Path(history_file)
+        self._lock = threading.Lock()
+        self._items = {}
+        self._offset = 0
+        self._anchor = None
+        self._log_stat = None
+        self._history_mtime = None
+        self._rollups_loaded = False
+        self.stats = {'reloads': 0, 'full_reloads': 0, 'observations': 0}
+        self.configure(config if config is not None else compile_config())
+
+    def configure(self, config):
+        """Take names, thresholds, URLs and aliases from a compiled config"""
+        with self._lock:
+            self.configured = {item['item_id']: item for item in config.get('items', [])}
+            self.watch_items = {item['watch_id']: item['item_id'] for item in config.get('items', [])}
+            self.aliases = {alias: self.watch_items[watch_id]
+                            for alias, watch_id in config.get('aliases', {}).items() if watch_id in self.watch_items}
+            for item_id, item in self.configured.items():
+                entry = self._items.setdefault(item_id, _Item())
+                entry.name = item.get('name')
+                entry.threshold = item.get('price_threshold')
+
+    def resolve(self, item_id):
+        """Canonical item_id for an item_id or alias"""
+        return item_id if item_id in self._items else self.aliases.get(item_id, item_id)
+
+    def _add(self, item_id, observation):
+        threshold = observation.get('threshold')
+        entry = self._items.get(item_id)
+        if entry is None:
+            entry = self._items[item_id] = _Item(threshold=threshold)
+        elif entry.threshold is None and threshold is not None:
+            entry.threshold = threshold
+        entry.add(observation)
+
+    def reload(self):
+        """
+        Read observations appended since the last reload
+
+        Returns:
+            int: Observations added to the index
+        """
+        log = self.observations_file.stat() if self.observations_file.exists() else None
+        log_stat = (log.st_size, log.st_mtime_ns) if log else None
+        history_mtime = self.history_file.stat().st_mtime if self.history_file.exists() else None
+        if log_stat == self._log_stat and history_mtime == self._history_mtime and self._rollups_loaded:
+            return 0
+
+        with self._lock:
+            # A compacted log keeps the last line read, just at a new offset
+            offset = resume_offset(self._offset, self._anchor, self.observations_file)
+            if offset is None:
+                # That line is gone too; start over
+                self._items = {item_id: _Item(entry.name, entry.threshold)
+                               for item_id, entry in self._items.items()}
+                offset = 0
+                self._history_mtime = None
+                self._rollups_loaded = False
+                self.stats['full_reloads'] += 1
+            observations, self._offset = read_new_observations(offset, self.observations_file)
+            self._anchor = log_anchor(self._offset, self.observations_file)
+            self._log_stat = log_stat
+            if not self._rollups_loaded:
+                # History older than the raw retention window lives in the rollups
+                observations = rollup_observations(self.rollups_file) + observations
+                self._rollups_loaded = True
+            added = 0
+            for observation in observations:
+                if observation.get('price') is None:
+                    continue
+                self._add(str(observation['item_id']), observation)
+                added += 1
+            if history_mtime != self._history_mtime:
+                self._seed_from_history()
+                self._history_mtime = history_mtime
+            self.stats['reloads'] += 1
+            self.stats['observations'] += added
+        return added
+
+    def _seed_from_history(self):
+        # price_history.json is keyed by watch_id; it only fills in items
+        # the observation log doesn't cover yet (older installs, first run)
+        history = json_codec.load_file(self.history_file)
+        for watch_id, record in history.items():
+            item_id = self.watch_items.get(watch_id) or self.aliases.get(watch_id) or watch_id.split(':')[-1]
+            entry = self._items.get(item_id)
+            if record.get('price') is None or (entry and entry.prices):
+                continue
+            self._add(item_id, {'timestamp': record.get('last_checked') or '', 'price': record['price'],
+                                'threshold': record.get('threshold')})
+            if self._items[item_id].name is None:
+                self._items[item_id].name = record.get('name')
+
+    def item(self, item_id):
+        """Summary dict for an item, or None"""
+        with self._lock:
+            item_id = self.resolve(item_id)
+            entry = self._items.get(item_id)
+            return entry.summary(item_id) if entry else None
+
+    def items(self):
+        """Summaries of every indexed item"""
+        with self._lock:
+            return [entry.summary(item_id) for item_id, entry in self._items.items()]
+
+    def history(self, item_id, since=None, until=None):
+        """[[timestamp, price], ...] between two ISO timestamps (inclusive), or None"""
+        with self._lock:
+            entry = self._items.get(self.resolve(item_id))
+            if entry is None:
+                return None
+            start = bisect.bisect_left(entry.times, since) if since else 0
+            end = bisect.bisect_right(entry.times, until) if until else len(entry.times)
+            return [[entry.times[i], entry.prices[i]] for i in range(start, end)]
+
+    def __len__(self):
+        return len(self._items)
+
+
+def fetch_item_price(item):
+    """Fetch an item's current price the same way main.py does"""
+    from main import fetch_price  # imported lazily; only refreshes need the fetch layer
+    return fetch_price(item['url'], item_id=item['item_id'],
+                       strategy=item.get('fetch_strategy'), hedge=item.get('hedge', False))
+
+
+class PriceServer(ThreadingHTTPServer):
+    """HTTP front end for a PriceIndex"""
+
+    daemon_threads = True
+    request_queue_size = 128  # socketserver's default backlog of 5 stalls bursts of clients
+
+    def __init__(self, address, index, fetcher=fetch_item_price, poll_seconds=1.0):
+        super().__init__(address, PriceRequestHandler)
+        self.index = index
+        self.fetcher = fetcher
+        self.poll_seconds = poll_seconds
+        # In-flight only: a refresh after the last one finished fetches again
+        self.flight = SingleFlight(memoize=False)
+        self._stop = threading.Event()
+
+    def start_polling(self):
+        """Reload the index from the history store in the background"""
+        def poll():
+            while not self._stop.wait(self.poll_seconds):
+                try:
+                    self.index.reload()
+                except Exception as e:
+                    print(f"⚠️  Reload failed: {e}")
+        threading.Thread(target=poll, daemon=True, name='index-poll').start()
+
+    def server_close(self):
+        self._stop.set()
+        super().server_close()
+
+    def refresh(self, item_id):
+        """
+        Fetch an item's price now, sharing the fetch with concurrent refreshes
+
+        Returns:
+            tuple: (summary, coalesced) or (None, False) if the item isn't configured
+        """
+        item_id = self.index.resolve(item_id)
+        item = self.index.configured.get(item_id)
+        if item is None:
+            return None, False
+        key = item.get('product_key', item_id)
+        coalesced = self.flight.is_shared(key)
+
+        def fetch():
+            price = self.fetcher(item)
+            if price is not None:
+                append_observations([make_observation(item_id, price, source='refresh',
+                                                      threshold=item.get('price_threshold'))],
+                                    self.index.observations_file)
+                self.index.reload()
+            return price
+
+        price = self.flight.do(key, fetch)
+        if price is None:
+            raise RuntimeError(f"Could not fetch a price for {item_id}")
+        return self.index.item(item_id), coalesced
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json_codec.dump_bytes(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        segments = [unquote(segment) for segment in parts.path.strip('/').split('/') if segment]
+        return segments, parse_qs(parts.query)
+
+    def do_GET(self):
+        segments, query = self._route()
+        index = self.server.index
+        if segments == ['items']:
+            self._send(200, {'items': index.items()})
+        elif segments == ['stats']:
+            self._send(200, {'items': len(index), **index.stats, 'refresh': self.server.flight.stats})
+        elif len(segments) == 2 and segments[0] == 'items':
+            summary = index.item(segments[1])
+            if summary is None:
+                self._send(404, {'error': f"Unknown item {segments[1]}"})
+            else:
+                self._send(200, summary)
+        elif len(segments) == 3 and segments[0] == 'items' and segments[2] == 'history':
+            points = index.history(segments[1], query.get('since', [None])[0], query.get('until', [None])[0])
+            if points is None:
+                self._send(404, {'error': f"Unknown item {segments[1]}"})
+            else:
+                self._send(200, {'item_id': index.resolve(segments[1]), 'points': points})
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        segments, _ = self._route()
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if not (len(segments) == 3 and segments[0] == 'items' and segments[2] == 'refresh'):
+            self._send(404, {'error': 'Not found'})
+            return
+        try:
+            summary, coalesced = self.server.refresh(segments[1])
+        except Exception as e:
+            self._send(502, {'error': str(e)})
+            return
+        if summary is None:
+            self._send(404, {'error': f"Item {segments[1]} is not in the config"})
+        else:
+            self._send(200, {**summary, 'coalesced': coalesced})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve price history over local HTTP")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to bind")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('--poll', type=float, default=1.0, help="Seconds between history reloads")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PriceIndex()
+    index.reload()
+    print(f"📚 Indexed {len(index)} items ({index.stats['observations']} observations) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    server = PriceServer((args.host, args.port), index, poll_seconds=args.poll)
+    server.start_polling()
+    print(f"🌐 Serving on http://{args.host}:{server.server_address[1]}/items")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
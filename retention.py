@@ -0,0 +1,403 @@
+"""
+Tiered Retention for Observation History
+observations.jsonl grows by one line per item per check, forever. The
+retention policy keeps raw observations for a recent window and rolls
+older ones into aggregates:
+
+    age < raw_days       raw observations (observations.jsonl)
+    age < hourly_days    hourly rollups   (observation_rollups.jsonl)
+    older                daily rollups
+
+A rollup holds open/high/low/close, count (priced checks) and failed
+(checks with no price) for one item (and store, for multi-store checks)
+in one bucket, plus "changes": every [timestamp, price] where the price
+differed from the previous observation. Price-change points are never
+dropped, so the price series stays exact at change granularity;
+export_parquet, price_report and price_server read them back
+(rollup_observations) when rebuilding from scratch.
+
+Compaction is incremental: it runs at most once per compact_every_hours,
+only rolls up observations that expired since the last run, and appends
+the new rollups. Rewriting observations.jsonl shifts byte offsets; the
+incremental readers keep the anchor line of their watermark
+(history_store.log_anchor) and find it again in the compacted log, so
+compaction never has to know who reads the log.
+Checkers run it on a background thread (BackgroundCompaction) while they
+fetch prices; appends to the log wait on history_store.APPEND_LOCK only
+for the final copy-and-rename.
+
+Config (defaults shown):
+    "retention": {"enabled": true, "raw_days": 30, "hourly_days": 365,
+                  "compact_every_hours": 24}
+
+Usage:
+    python retention.py            # compact now if due
+    python retention.py --force    # compact now regardless of schedule
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import history_store
+import json_codec
+
+ROLLUPS_FILE = Path(__file__).parent / "observation_rollups.jsonl"
+STATE_FILE = Path(__file__).parent / "retention_state.json"
+
+DEFAULT_POLICY = {
+    'enabled': True,
+    'raw_days': 30,
+    'hourly_days': 365,
+    'compact_every_hours': 24
+}
+
+# Bucket keys are timestamp prefixes: '2025-11-20T08' (hour), '2025-11-20' (day)
+BUCKET_WIDTH = {'hour': 13, 'day': 10}
+
+
+def get_policy(config=None):
+    """Retention policy from config (missing keys take the defaults)"""
+    policy = dict(DEFAULT_POLICY)
+    policy.update((config or {}).get('retention', {}))
+    return policy
+
+
+def load_retention_state():
+    """Last compaction time and each series' last rolled-up price"""
+    return json_codec.load_file(STATE_FILE, empty=lambda: {'last_compaction': None, 'last_prices': {}})
+
+
+def save_retention_state(state):
+    """Persist retention state"""
+    json_codec.save_file(STATE_FILE, state)
+
+
+def is_due(policy, state, now=None):
+    """True if the last compaction is older than compact_every_hours"""
+    if not policy.get('enabled', True):
+        return False
+    if not state.get('last_compaction'):
+        return True
+    now = now or datetime.now()
+    return now - datetime.fromisoformat(state['last_compaction']) >= timedelta(hours=policy['compact_every_hours'])
+
+
+def _series_key(item_id, store=None):
+    return f"{item_id}|{store}" if store is not None else str(item_id)
+
+
+def merge_rollups(records, tier):
+    """
+    Combine rollup records into coarser (or de-duplicated) buckets
+
+    Args:
+        records: Rollup records, oldest bucket first within each series
+        tier: 'hour' or 'day'
+
+    Returns:
+        list: One record per (item, store, bucket)
+    """
+    width = BUCKET_WIDTH[tier]
+    merged = {}
+    for record in records:
+        key = (record['item_id'], record.get('store'), record['bucket'][:width])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(record, tier=tier, bucket=record['bucket'][:width], changes=list(record['changes']))
+            continue
+        if record['open'] is not None:
+            if current['open'] is None:
+                current.update(open=record['open'], high=record['high'], low=record['low'])
+            else:
+                current['high'] = max(current['high'], record['high'])
+                current['low'] = min(current['low'], record['low'])
+            current['close'] = record['close']
+        current['count'] += record['count']
+        current['failed'] += record['failed']
+        current['changes'].extend(record['changes'])
+        if record.get('threshold') is not None:
+            current['threshold'] = record['threshold']
+    return list(merged.values())
+
+
+def roll_up(observations, last_prices, tier='hour'):
+    """
+    Aggregate raw observations into rollup records
+
+    A backfill correction replaces the observation it supersedes when both
+    expire together. When the original was rolled up by an earlier
+    compaction, the correction leaves the counts and open/high/low/close
+    alone but records a change point at the original's timestamp, which
+    replaces the old one (see rollup_observations).
+
+    Args:
+        observations: Observation dicts (any order)
+        last_prices: series key -> last price already rolled up; used to
+                     detect change points and updated in place
+        tier: Bucket size ('hour' or 'day')
+
+    Returns:
+        list: Rollup records
+    """
+    corrected = {history_store.supersede_key(o) for o in observations if history_store.is_correction(o)}
+    originals = {history_store.supersede_key(o) for o in observations
+                 if not history_store.is_correction(o) and history_store.supersede_key(o) in corrected}
+    records = []
+    for observation in sorted(observations, key=lambda o: o['timestamp']):
+        supersede_key = history_store.supersede_key(observation)
+        correction = history_store.is_correction(observation)
+        if supersede_key in corrected and not correction:
+            continue
+        checked = not correction or supersede_key in originals
+        price = observation.get('price')
+        store = observation.get('store')
+        summary = price if checked else None
+        record = {
+            'item_id': str(observation['item_id']),
+            'tier': tier,
+            'bucket': observation['timestamp'],
+            'open': summary, 'high': summary, 'low': summary, 'close': summary,
+            'count': 1 if checked and price is not None else 0,
+            'failed': 1 if checked and price is None else 0,
+            'changes': []
+        }
+        if store is not None:
+            record['store'] = store
+        if observation.get('threshold') is not None:
+            record['threshold'] = observation['threshold']
+        key = _series_key(record['item_id'], store)
+        if price is not None and (not checked or last_prices.get(key) != price):
+            record['changes'].append([observation['timestamp'], price])
+            if checked:
+                last_prices[key] = price
+        records.append(record)
+    return merge_rollups(records, tier)
+
+
+def load_rollups(rollups_file=ROLLUPS_FILE):
+    """All rollup records in file order"""
+    rollups_file = Path(rollups_file)
+    if not rollups_file.exists():
+        return []
+    records = []
+    with open(rollups_file, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json_codec.loads(line))
+    return records
+
+
+def rollup_observations(rollups_file=ROLLUPS_FILE):
+    """
+    Price-change points from the rollups, as observations
+
+    Readers rebuilding from scratch put these ahead of observations.jsonl
+    so compacted history isn't lost. Each has source 'rollup'.
+    """
+    # Keyed by series and timestamp: a later change point at the same time
+    # is a backfill correction and replaces the earlier one
+    observations = {}
+    for record in load_rollups(rollups_file):
+        for timestamp, price in record['changes']:
+            observation = history_store.make_observation(record['item_id'], price, timestamp, source='rollup',
+                                                         run_id=None)
+            if record.get('store') is not None:
+                observation['store'] = record['store']
+            if record.get('threshold') is not None:
+                observation['threshold'] = record['threshold']
+            observations[history_store.supersede_key(observation)] = observation
+    return sorted(observations.values(), key=lambda o: o['timestamp'])
+
+
+def compact_observations(cutoff, last_prices, observations_file=None):
+    """
+    Move observations older than cutoff out of the raw log
+
+    The log is rewritten to a temp file without the expired lines; lines
+    appended while that runs are copied over under APPEND_LOCK just
+    before the rename.
+
+    Args:
+        cutoff: Hour bucket ('YYYY-MM-DDTHH'); observations before it expire
+        last_prices: Passed to roll_up
+        observations_file: Raw log (defaults to history_store's)
+
+    Returns:
+        tuple: (rollup records, expired count, kept count)
+    """
+    path = Path(observations_file or history_store.OBSERVATIONS_FILE)
+    if not path.exists():
+        return [], 0, 0
+    tmp_path = path.with_name(path.name + '.tmp')
+    expired = []
+    kept = 0
+    read_pos = 0
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for line in src:
+            if not line.endswith(b'\n'):
+                break
+            stripped = line.strip()
+            try:
+                observation = json_codec.loads(stripped) if stripped else None
+            except json_codec.JSONDecodeError:
+                observation = None
+            read_pos += len(line)
+            if observation and observation.get('timestamp', '')[:13] < cutoff:
+                expired.append(observation)
+            else:
+                dst.write(line)
+                kept += 1
+        if not expired:
+            dst.close()
+            os.remove(tmp_path)
+            return [], 0, kept
+
+        records = roll_up(expired, last_prices)
+        # Rollups first: a crash before the rename duplicates a bucket, never loses one
+        with open(ROLLUPS_FILE, 'ab') as f:
+            f.writelines(json_codec.dump_bytes(record) + b'\n' for record in records)
+
+        with history_store.APPEND_LOCK:
+            src.seek(read_pos)
+            while True:
+                chunk = src.read(1 << 20)
+                if not chunk:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+            os.replace(tmp_path, path)
+
+    return records, len(expired), kept
+
+
+def compact_rollups(day_cutoff, rollups_file=ROLLUPS_FILE):
+    """
+    Merge hourly rollups from before day_cutoff ('YYYY-MM-DD') into daily ones
+
+    Returns:
+        int: Hourly records merged away (0 if nothing was due)
+    """
+    records = load_rollups(rollups_file)
+    expired = [r for r in records if r['tier'] == 'hour' and r['bucket'][:10] < day_cutoff]
+    if not expired:
+        return 0
+    expired.sort(key=lambda r: r['bucket'])
+    remaining = [r for r in records if not (r['tier'] == 'hour' and r['bucket'][:10] < day_cutoff)]
+    daily = merge_rollups([r for r in remaining if r['tier'] == 'day'] + expired, 'day')
+    hourly = [r for r in remaining if r['tier'] == 'hour']
+    tmp_path = Path(rollups_file).with_name(Path(rollups_file).name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.writelines(json_codec.dump_bytes(record) + b'\n' for record in daily + hourly)
+    os.replace(tmp_path, rollups_file)
+    return len(expired)
+
+
+def compact(config=None, now=None, force=False):
+    """
+    Apply the retention policy if compaction is due
+
+    Args:
+        config: Compiled config (for the "retention" section)
+        now: Current time (for tests)
+        force: Compact even if the last run was recent
+
+    Returns:
+        dict: Stats (expired, kept, rollups, merged, seconds), or None if not due
+    """
+    policy = get_policy(config)
+    state = load_retention_state()
+    now = now or datetime.now()
+    if not force and not is_due(policy, state, now):
+        return None
+
+    start = time.perf_counter()
+    cutoff = (now - timedelta(days=policy['raw_days'])).strftime('%Y-%m-%dT%H')
+    day_cutoff = (now - timedelta(days=policy['hourly_days'])).strftime('%Y-%m-%d')
+    last_prices = state.setdefault('last_prices', {})
+
+    records, expired, kept = compact_observations(cutoff, last_prices)
+    merged = compact_rollups(day_cutoff)
+
+    state['last_compaction'] = now.isoformat()
+    save_retention_state(state)
+    return {'expired': expired, 'kept': kept, 'rollups': len(records), 'merged': merged,
+            'seconds': time.perf_counter() - start}
+
+
+def keep_change_points(records, key, cutoff, timestamp_key='timestamp'):
+    """
+    Thin a list of check records: keep everything from cutoff on, and
+    before it only records where `key` changed from the previous record
+
+    Args:
+        records: Check dicts, oldest first
+        key: Field whose changes must be preserved (e.g. 'available')
+        cutoff: ISO timestamp; records at/after it are kept as-is
+
+    Returns:
+        list: Retained records
+    """
+    retained = []
+    previous = object()
+    for record in records:
+        value = record.get(key)
+        if record.get(timestamp_key, '') >= cutoff or value != previous:
+            retained.append(record)
+        previous = value
+    return retained
+
+
+class BackgroundCompaction:
+    """Runs compact() on a daemon thread while a checker works"""
+
+    def __init__(self, config=None):
+        self.config = config
+        self.result = None
+        self.error = None
+        self._thread = None
+
+    def start(self):
+        """Start compaction if it is due (cheap no-op otherwise)"""
+        if is_due(get_policy(self.config), load_retention_state()):
+            self._thread = threading.Thread(target=self._run, daemon=True, name='retention')
+            self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = compact(self.config)
+        except Exception as e:
+            self.error = e
+
+    def join(self):
+        """Wait for compaction to finish; returns its stats (None if it didn't run)"""
+        if self._thread is not None:
+            self._thread.join()
+        if self.error is not None:
+            print(f"⚠️  Retention compaction failed: {self.error}")
+        return self.result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the observation retention policy")
+    parser.add_argument('--force', action='store_true', help="Compact even if not due")
+    args = parser.parse_args()
+
+    from config_compiler import compile_config
+    result = compact(compile_config(), force=args.force)
+    if result is None:
+        print("⏭️  Compaction not due yet (use --force to run anyway)")
+        return
+    print(f"✅ Rolled {result['expired']} observations into {result['rollups']} hourly rollups, "
+          f"kept {result['kept']} raw, merged {result['merged']} hourly into daily "
+          f"in {result['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Costco Search/Category Listing Scraper
+Prices every product tile on a search-results or category page, so one
+request can update every tracked item that shows up in the listing.
+
+Items are grouped by their config 'search_term'; each group's search is
+paged until all of its items are matched or the results run out. Tiles
+are matched to tracked items by the product number in the tile link
+(e.g. ...product.4000285678.html), which is the item_id in config.json.
+
+Usage:
+    python search_scraper.py "ipad a16"
+"""
+
+import re
+import sys
+from urllib.parse import quote_plus, urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+import http_client
+
+COSTCO_URL = "https://www.costco.com"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://www.costco.com/'
+}
+
+PRODUCT_NUMBER_PATTERNS = [
+    re.compile(r'\.product\.(\d+)\.html'),
+    re.compile(r'/p/-/[^/?#]+/(\d+)'),
+    re.compile(r'[?&](?:partNumber|item)=(\d+)'),
+]
+PRICE_PATTERN = re.compile(r'\$\s?([\d,]+\.\d{2})')
+
+# How far up from a product link to look for the tile's price
+MAX_TILE_DEPTH = 8
+
+
+def product_number_from_url(url):
+    """
+    Extract the Costco product number from a product, /p/ or API URL
+
+    Returns:
+        str: Product number, or None if the URL has none
+    """
+    for pattern in PRODUCT_NUMBER_PATTERNS:
+        match = pattern.search(url or '')
+        if match:
+            return match.group(1)
+    return None
+
+
+def search_url(search_term, page=1):
+    """Build the Costco search-results URL for a term and page"""
+    url = f"{COSTCO_URL}/CatalogSearch?dept=All&keyword={quote_plus(search_term)}"
+    if page > 1:
+        url += f"&currentPage={page}"
+    return url
+
+
+def _tile_price(tile):
+    """Find the display price inside a product tile element"""
+    price_elem = tile.find(attrs={'data-testid': re.compile(r'price', re.IGNORECASE)})
+    if price_elem:
+        match = PRICE_PATTERN.search(price_elem.get_text(' ', strip=True))
+        if match:
+            return float(match.group(1).replace(',', ''))
+    match = PRICE_PATTERN.search(tile.get_text(' ', strip=True))
+    if match:
+        return float(match.group(1).replace(',', ''))
+    return None
+
+
+def _linked_numbers(soup):
+    """
+    Product numbers linked from inside each element
+
+    Built in one pass over the links (each link adds its number to its
+    ancestors), so checking whether a candidate tile also holds another
+    product's link doesn't rescan the subtree.
+
+    Returns:
+        dict: id(element) -> set of product numbers
+    """
+    numbers = {}
+    for link in soup.find_all('a', href=True):
+        product_number = product_number_from_url(link['href'])
+        if product_number:
+            for node in link.parents:
+                numbers.setdefault(id(node), set()).add(product_number)
+    return numbers
+
+
+def _find_tile(link, product_number, linked_numbers):
+    """Walk up from a product link to the smallest ancestor holding a price"""
+    node = link
+    for _ in range(MAX_TILE_DEPTH):
+        node = node.parent
+        if node is None or node.name in ('body', 'html', '[document]'):
+            return None
+        # Stop once we've climbed into a container shared with other products
+        if linked_numbers.get(id(node), set()) - {product_number}:
+            return None
+        if PRICE_PATTERN.search(node.get_text(' ', strip=True)):
+            return node
+    return None
+
+
+def _next_page_url(soup, base_url):
+    """Return the absolute URL of the next results page, if any"""
+    link = (soup.find('a', rel='next')
+            or soup.find('a', attrs={'aria-label': re.compile(r'next', re.IGNORECASE)})
+            or soup.find('a', attrs={'data-testid': re.compile(r'pagination.*next', re.IGNORECASE)}))
+    if link and link.get('href'):
+        return urljoin(base_url, link['href'])
+    return None
+
+
+def parse_listing(html, base_url=COSTCO_URL):
+    """
+    Extract every product tile from a search or category page
+
+    Args:
+        html: Page HTML
+        base_url: URL the page was fetched from (for relative links)
+
+    Returns:
+        tuple: (tiles, next_page_url) where tiles is a list of dicts with
+               product_number, name, price and url
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    linked_numbers = _linked_numbers(soup)
+    tiles = []
+    seen = set()
+
+    for link in soup.find_all('a', href=True):
+        product_number = product_number_from_url(link['href'])
+        if not product_number or product_number in seen:
+            continue
+        tile = _find_tile(link, product_number, linked_numbers)
+        if tile is None:
+            continue
+        price = _tile_price(tile)
+        if price is None:
+            continue
+
+        seen.add(product_number)
+        # Tiles usually link the image first; take the name from any text link
+        name = next((a.get_text(strip=True) for a in tile.find_all('a', href=True)
+                     if product_number_from_url(a['href']) == product_number and a.get_text(strip=True)),
+                    link.get('title') or link.get('aria-label'))
+        tiles.append({
+            'product_number': product_number,
+            'name': name,
+            'price': price,
+            'url': urljoin(base_url, link['href'])
+        })
+
+    return tiles, _next_page_url(soup, base_url)
+
+
+def listing_key(item):
+    """Key of an item in listing prices: its watch_id (item_id for bare items)"""
+    return item.get('watch_id') or item['item_id']
+
+
+def fetch_listing(url, session=None, timeout=30):
+    """Fetch and parse one listing page"""
+    response = http_client.get(url, headers=HEADERS, timeout=timeout, session=session)
+    response.raise_for_status()
+    return parse_listing(response.text, url)
+
+
+def scan_listing(start_url, wanted, session=None, max_pages=5):
+    """
+    Page through a listing until every wanted product is found
+
+    Args:
+        start_url: First listing page URL
+        wanted: Set of product numbers still unmatched (mutated in place)
+        session: requests.Session to reuse connections
+        max_pages: Maximum pages to fetch
+
+    Returns:
+        dict: product_number -> tile for every tile seen
+    """
+    found = {}
+    url = start_url
+    pages = 0
+    while url and wanted and pages < max_pages:
+        try:
+            tiles, url = fetch_listing(url, session)
+        except Exception as e:
+            print(f"  ⚠️  Listing fetch failed ({start_url}): {e}")
+            break
+        pages += 1
+        for tile in tiles:
+            found.setdefault(tile['product_number'], tile)
+            wanted.discard(tile['product_number'])
+        if not tiles:
+            break
+    return found
+
+
+def fetch_listing_prices(items, category_urls=None, max_pages=5):
+    """
+    Price tracked items from listing pages
+
+    Category pages are scanned first, then one search per distinct
+    search_term for whatever is still unmatched.
+
+    Args:
+        items: Item dicts from config (need item_id and url; search_term optional)
+        category_urls: Category/listing page URLs to scan first
+        max_pages: Page limit per listing
+
+    Returns:
+        tuple: (prices, unmatched) where prices maps listing_key(item)
+               (the watch_id) -> (price, tile_name) and unmatched is the
+               list of items that need a per-product fetch
+    """
+    by_number = {}
+    for item in items:
+        number = product_number_from_url(item['url']) or item['item_id']
+        by_number.setdefault(number, []).append(item)
+
+    wanted = set(by_number)
+    tiles = {}
+    session = requests.Session()
+
+    for url in category_urls or []:
+        if not wanted:
+            break
+        tiles.update(scan_listing(url, wanted, session, max_pages))
+
+    terms = {}
+    for number in wanted:
+        for item in by_number[number]:
+            if item.get('search_term'):
+                terms.setdefault(item['search_term'], set()).add(number)
+
+    for term, numbers in terms.items():
+        pending = numbers & wanted
+        if not pending:
+            continue
+        found = scan_listing(search_url(term), pending, session, max_pages)
+        tiles.update(found)
+        wanted -= set(found)
+
+    prices = {}
+    unmatched = []
+    for number, number_items in by_number.items():
+        tile = tiles.get(number)
+        for item in number_items:
+            if tile:
+                prices[listing_key(item)] = (tile['price'], tile['name'])
+            else:
+                unmatched.append(item)
+
+    return prices, unmatched
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python search_scraper.py "search term"')
+        sys.exit(1)
+
+    tiles, next_url = fetch_listing(search_url(sys.argv[1]))
+    for tile in tiles:
+        print(f"{tile['product_number']}  ${tile['price']:.2f}  {tile['name']}")
+    if next_url:
+        print(f"Next page: {next_url}")
+
+
+if __name__ == "__main__":
+    main()
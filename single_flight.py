@@ -0,0 +1,82 @@
+"""
+Single-Flight Request Coalescing
+Several watch entries (across watchlists, or the same product listed
+under two item IDs) often point at one product. SingleFlight makes sure
+each product is fetched at most once per run: the first caller for a key
+runs the fetch, concurrent callers wait for it, and later callers reuse
+the result (or the exception, so a blocked host isn't retried per entry).
+
+Long-lived callers (price_server's refresh endpoint) use
+SingleFlight(memoize=False): only callers that overlap an in-flight fetch
+share it, and the next call after it finishes fetches again.
+
+Usage:
+    flight = SingleFlight()
+    price = flight.do(item['product_key'], lambda: fetch(item))
+    print(flight.stats)   # {'calls': 5, 'fetches': 3, 'saved': 2}
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Per-run, thread-safe memo of fetch results keyed by product"""
+
+    def __init__(self, memoize=True):
+        self.memoize = memoize
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'calls': 0, 'fetches': 0, 'saved': 0}
+
+    def do(self, key, fetch):
+        """
+        Return fetch()'s result for key, running fetch at most once per run
+
+        Args:
+            key: Canonical product key
+            fetch: Zero-argument callable doing the actual fetch
+
+        Returns:
+            Whatever fetch returned for the first caller
+
+        Raises:
+            Whatever fetch raised for the first caller
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            owner = call is None
+            if owner:
+                call = self._calls[key] = _Call()
+                self.stats['fetches'] += 1
+            else:
+                self.stats['saved'] += 1
+
+        if owner:
+            try:
+                call.result = fetch()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                if not self.memoize:
+                    with self._lock:
+                        del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+        return call.result
+
+    def is_shared(self, key):
+        """True if key has already been fetched (or is being fetched) this run"""
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Accessibility Snapshot Parser
+Reads a saved Playwright accessibility snapshot (the YAML-like outline
+mcp_playwright_browser_snapshot returns) into an index by ref, role,
+accessible name and text, so the browser workflow can look elements up
+instead of hard-coding refs like e57 (search box) or e1096 (a price).
+
+A snapshot line looks like:
+
+    - link "iPad, 128GB Wi-Fi (A16 chip)" [ref=e1091]:
+      - /url: /ipad-128gb-wi-fi-a16-chip.product.4000285678.html
+    - generic [ref=e1096]: $299.99
+
+extract_tiles() prices every product tile on a search-results snapshot in
+one pass over the tree: a tile is the largest subtree holding links to
+exactly one product number plus a price. prices_for_items() then matches
+tiles to tracked items by product number, the same way search_scraper.py
+does for listing HTML, so one snapshot prices every tracked item that
+matched the search term.
+
+Usage:
+    python snapshot_parser.py snapshot.yml
+    python snapshot_parser.py snapshot.yml --role button --name search
+"""
+
+import argparse
+import re
+
+import json_codec
+from search_scraper import PRICE_PATTERN, listing_key, product_number_from_url
+
+LINE_PATTERN = re.compile(r'^(?P<indent> *)- (?P<entry>.*)$')
+ENTRY_PATTERN = re.compile(
+    r'^(?P<role>[A-Za-z][\w-]*)'
+    r'(?: (?P<name>"(?:[^"\\]|\\.)*"|/(?:[^/\\]|\\.)*/))?'
+    r'(?P<attrs>(?: \[[^\]]*\])*)'
+    r'(?P<colon>:(?: (?P<text>.*))?)?$'
+)
+ATTR_PATTERN = re.compile(r'\[([\w-]+)(?:=([^\]]*))?\]')
+# A node whose whole text is a price, e.g. "$1,299.99"
+PRICE_ONLY_PATTERN = re.compile(r'^\$\s?[\d,]+\.\d{2}$')
+
+SEARCH_BOX_ROLES = ('searchbox', 'combobox', 'textbox')
+
+
+class SnapshotNode:
+    """One element of the snapshot outline"""
+    __slots__ = ('role', 'name', 'ref', 'attrs', 'text', 'props', 'children', 'parent')
+
+    def __init__(self, role, name=None, attrs=None, text=None, parent=None):
+        self.role = role
+        self.name = name
+        self.attrs = attrs or {}
+        self.ref = self.attrs.get('ref')
+        self.text = text
+        self.props = {}
+        self.children = []
+        self.parent = parent
+
+    def iter(self):
+        """This node and its descendants, in document order"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def label(self):
+        """Accessible name, else inline text"""
+        return self.name or self.text or ''
+
+    def all_text(self):
+        """Names and text of this node and its descendants, space-joined"""
+        return ' '.join(part for node in self.iter() for part in (node.name, node.text) if part)
+
+    def __repr__(self):
+        return f"<{self.role} {self.name or self.text or ''!r} ref={self.ref}>"
+
+
+def _unquote(value):
+    """Decode a quoted snapshot string; other values are returned as-is"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        try:
+            return json_codec.loads(value)
+        except json_codec.JSONDecodeError:
+            return value[1:-1]
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    return value
+
+
+def _split_single_quoted(entry):
+    """Split "'key': rest" into (key, rest), undoing YAML '' escapes"""
+    index = 1
+    while index < len(entry):
+        if entry[index] == "'":
+            if entry[index + 1:index + 2] != "'":
+                break
+            index += 1
+        index += 1
+    return entry[1:index].replace("''", "'"), entry[index + 1:]
+
+
+def _parse_entry(entry):
+    """Split one outline entry into (role, name, attrs, text), or None if unrecognised"""
+    # Entries with YAML-special characters are written as single-quoted keys
+    if entry.startswith("'"):
+        entry = ''.join(_split_single_quoted(entry))
+    match = ENTRY_PATTERN.match(entry)
+    if not match:
+        return None
+    name = match.group('name')
+    if name is not None:
+        name = _unquote(name) if name.startswith('"') else name
+    # Bare attributes like [checked] come back with an empty value
+    attrs = {key: value or True for key, value in ATTR_PATTERN.findall(match.group('attrs'))}
+    text = match.group('text')
+    return match.group('role'), name, attrs, _unquote(text) if text else None
+
+
+def parse_snapshot(snapshot_text):
+    """
+    Parse a snapshot into an index
+
+    Args:
+        snapshot_text: Snapshot outline as returned by the browser tool
+
+    Returns:
+        SnapshotIndex
+    """
+    root = SnapshotNode('document')
+    # (indent, node) for the open ancestors of the current line
+    stack = [(-1, root)]
+    for line in snapshot_text.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        indent = len(match.group('indent'))
+        entry = match.group('entry').strip()
+        while stack[-1][0] >= indent:
+            stack.pop()
+        parent = stack[-1][1]
+
+        # "/url: ..." and similar lines are properties of the parent element
+        if entry.startswith('/'):
+            key, _, value = entry[1:].partition(':')
+            parent.props[key] = _unquote(value)
+            continue
+        parsed = _parse_entry(entry)
+        if parsed is None:
+            # Bare text child, e.g. - "Member Only Item"
+            node = SnapshotNode('text', text=_unquote(entry.rstrip(':')), parent=parent)
+        else:
+            role, name, attrs, text = parsed
+            node = SnapshotNode(role, name, attrs, text, parent)
+        parent.children.append(node)
+        stack.append((indent, node))
+    return SnapshotIndex(root)
+
+
+def load_snapshot(path):
+    """Parse a saved snapshot file"""
+    with open(path, encoding='utf-8') as f:
+        return parse_snapshot(f.read())
+
+
+class SnapshotIndex:
+    """Lookups by ref, role, name and text over a parsed snapshot"""
+
+    def __init__(self, root):
+        self.root = root
+        self.by_ref = {}
+        self.by_role = {}
+        self.by_name = {}
+        self.nodes = []
+        for node in root.iter():
+            if node is root:
+                continue
+            self.nodes.append(node)
+            if node.ref:
+                self.by_ref[node.ref] = node
+            self.by_role.setdefault(node.role, []).append(node)
+            if node.name:
+                self.by_name.setdefault(node.name.lower(), []).append(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def ref(self, ref):
+        """Node with the given ref (e.g. 'e57'), or None"""
+        return self.by_ref.get(ref)
+
+    def find(self, role=None, name=None, text=None):
+        """
+        Nodes matching every given criterion, in document order
+
+        Args:
+            role: Exact role ('link', 'searchbox', ...)
+            name: Accessible name, case-insensitive; exact match, or
+                  substring match if no node has exactly this name
+            text: Case-insensitive substring of the node's inline text
+
+        Returns:
+            list: Matching SnapshotNodes
+        """
+        if name is not None:
+            candidates = self.by_name.get(name.lower())
+            if candidates is None:
+                needle = name.lower()
+                candidates = [node for node in self.nodes if node.name and needle in node.name.lower()]
+        elif role is not None:
+            candidates = self.by_role.get(role, [])
+        else:
+            candidates = self.nodes
+        if role is not None:
+            candidates = [node for node in candidates if node.role == role]
+        if text is not None:
+            needle = text.lower()
+            candidates = [node for node in candidates if node.text and needle in node.text.lower()]
+        return candidates
+
+    def first(self, role=None, name=None, text=None):
+        """First node matching find(), or None"""
+        matches = self.find(role, name, text)
+        return matches[0] if matches else None
+
+    def search_box(self):
+        """The site search input, or None"""
+        for role in SEARCH_BOX_ROLES:
+            for node in self.by_role.get(role, []):
+                if role == 'searchbox' or 'search' in (node.name or '').lower():
+                    return node
+        return None
+
+
+def _tile_price(tile):
+    """(price, ref) of the tile's display price, or (None, None)"""
+    fallback = (None, None)
+    for node in tile.iter():
+        for value in (node.text, node.name):
+            if not value:
+                continue
+            value = value.strip()
+            if PRICE_ONLY_PATTERN.match(value):
+                return float(value.lstrip('$ ').replace(',', '')), node.ref
+            # Savings like "$50.00 OFF" also match; only used if nothing better
+            match = PRICE_PATTERN.search(value)
+            if match and fallback[0] is None and not value.startswith('-'):
+                fallback = (float(match.group(1).replace(',', '')), node.ref)
+    return fallback
+
+
+def _make_tile(node, product_number):
+    price, price_ref = _tile_price(node)
+    if price is None:
+        return None
+    links = [link for link in node.iter()
+             if link.role == 'link' and product_number_from_url(link.props.get('url')) == product_number]
+    # Tiles usually link the image first; take the name from the text link
+    named = next((link for link in links if link.name and not any(child.role == 'img' for child in link.children)),
+                 next((link for link in links if link.name), links[0]))
+    return {
+        'product_number': product_number,
+        'name': named.name,
+        'price': price,
+        'url': named.props.get('url'),
+        'ref': price_ref,
+        'link_ref': named.ref
+    }
+
+
+def extract_tiles(index):
+    """
+    Every priced product tile in a search-results snapshot
+
+    Single post-order pass: each subtree reports the product numbers it
+    links to and whether it holds a price; a subtree with exactly one
+    product and a price is a tile candidate, and the candidate kept is
+    the largest one below the first ancestor shared with other products.
+
+    Args:
+        index: SnapshotIndex from parse_snapshot / load_snapshot
+
+    Returns:
+        list: dicts with product_number, name, price, url, ref (the price
+              element's ref) and link_ref, in document order
+    """
+    tiles = []
+
+    def visit(node):
+        numbers = set()
+        candidates = []
+        number = product_number_from_url(node.props.get('url')) if node.role == 'link' else None
+        if number:
+            numbers.add(number)
+        for child in node.children:
+            child_numbers, child_candidates = visit(child)
+            numbers |= child_numbers
+            candidates.extend(child_candidates)
+        if len(numbers) == 1:
+            # This node wraps a single product: it replaces any tile found below it
+            tile = _make_tile(node, next(iter(numbers)))
+            if tile is not None:
+                return numbers, [tile]
+            return numbers, candidates
+        if len(numbers) > 1:
+            # Shared container: tiles below it are final
+            tiles.extend(candidates)
+            return numbers, []
+        return numbers, candidates
+
+    _, remaining = visit(index.root)
+    tiles.extend(remaining)
+    # Each product once, first occurrence wins (carousels repeat results)
+    seen = set()
+    unique = []
+    for tile in tiles:
+        if tile['product_number'] not in seen:
+            seen.add(tile['product_number'])
+            unique.append(tile)
+    return unique
+
+
+def prices_for_items(tiles, items):
+    """
+    Match snapshot tiles to tracked items by product number
+
+    Args:
+        tiles: From extract_tiles
+        items: Item dicts from config (need item_id and url)
+
+    Returns:
+        tuple: (prices, unmatched) where prices maps listing_key(item)
+               (the watch_id) -> (price, tile_name), like
+               search_scraper.fetch_listing_prices
+    """
+    by_number = {tile['product_number']: tile for tile in tiles}
+    prices = {}
+    unmatched = []
+    for item in items:
+        tile = by_number.get(product_number_from_url(item['url']) or item['item_id'])
+        if tile:
+            prices[listing_key(item)] = (tile['price'], tile['name'])
+        else:
+            unmatched.append(item)
+    return prices, unmatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a saved accessibility snapshot")
+    parser.add_argument('snapshot', help="Snapshot file")
+    parser.add_argument('--role', help="Find nodes with this role")
+    parser.add_argument('--name', help="Find nodes with this accessible name")
+    parser.add_argument('--text', help="Find nodes whose text contains this")
+    args = parser.parse_args()
+
+    index = load_snapshot(args.snapshot)
+    if args.role or args.name or args.text:
+        for node in index.find(args.role, args.name, args.text):
+            print(f"{node.ref or '-':<8} {node.role:<12} {node.label()}")
+        return
+
+    search_box = index.search_box()
+    print(f"📄 {len(index)} nodes, {len(index.by_ref)} refs")
+    if search_box:
+        print(f"🔍 Search box: {search_box.ref} ({search_box.label()})")
+    tiles = extract_tiles(index)
+    print(f"🛒 {len(tiles)} product tiles:")
+    for tile in tiles:
+        print(f"  {tile['product_number']}  ${tile['price']:.2f}  [{tile['ref']}]  {tile['name']}")
+
+    # Imported here so the parser itself doesn't need a config
+    from config_compiler import compile_config
+    items = compile_config()['items']
+    prices, unmatched = prices_for_items(tiles, items)
+    print(f"🎯 {len(prices)} of {len(items)} tracked items priced from this snapshot")
+    for item in items:
+        if listing_key(item) in prices:
+            print(f"  {item['name']}: ${prices[listing_key(item)][0]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Multi-Store Price Matrix
+Prices can differ by warehouse/region (product URLs carry storeId and
+catalogId; the price API takes whsNumber). With "stores" enabled, each
+item is checked across every configured store and the results form an
+(item, store) matrix; alerts use the best store price.
+
+To keep 50 items x 20 stores close to the cost of 50 items:
+- a store's requests for an item run concurrently over one pooled session
+  (through http_client, so breakers and adaptive timeouts still apply)
+- identical response bodies for an item are parsed once (keyed by SHA-1),
+  since most stores return the same price; only (digest, price) pairs are
+  kept, and only until the item is done
+
+Every location needs a "warehouse" number: learned price API URLs are
+per-warehouse (whsNumber), and config validation rejects locations
+without one.
+
+Config:
+    "stores": {
+      "enabled": true,
+      "workers": 16,
+      "locations": [
+        {"id": "10301", "catalog_id": "10701", "warehouse": "847", "zip": "98027"},
+        ...
+      ]
+    }
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_client
+import json_codec
+from main import parse_api_price
+from price_extractors import extract_price, page_key
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://www.costco.com/'
+}
+
+
+def _with_query(url, updates):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(updates)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def store_url(url, store):
+    """
+    URL for checking a product at one store
+
+    API URLs get the store's warehouse number (whsNumber); product pages
+    get storeId/catalogId.
+
+    Raises:
+        ValueError: For an API URL and a store without a warehouse number
+    """
+    if 'whsNumber=' in url:
+        if not store.get('warehouse'):
+            raise ValueError(f"store {store.get('id')} has no warehouse number for the price API")
+        return _with_query(url, {'whsNumber': store['warehouse']})
+    updates = {'storeId': store['id'], 'langId': '-1'}
+    if store.get('catalog_id'):
+        updates['catalogId'] = store['catalog_id']
+    return _with_query(url, updates)
+
+
+def store_headers(url, store):
+    """Request headers for a store (zip code travels as a cookie)"""
+    headers = dict(HEADERS)
+    headers['Accept'] = 'application/json' if 'whsNumber=' in url else 'text/html,*/*;q=0.8'
+    if store.get('zip'):
+        headers['Cookie'] = f"invCheckPostalCode={store['zip']}"
+    return headers
+
+
+def best_store_price(matrix):
+    """(store_id, price) with the lowest price, or (None, None) if none priced"""
+    priced = [(price, store_id) for store_id, price in matrix.items() if price is not None]
+    if not priced:
+        return None, None
+    price, store_id = min(priced)
+    return store_id, price
+
+
+class StoreMatrixFetcher:
+    """Fetches one item's price at every configured store"""
+
+    def __init__(self, stores, workers=16):
+        self.stores = stores
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='store')
+        self._lock = threading.Lock()
+        # Body digest -> price for the item being fetched (cleared after each item)
+        self._prices_by_digest = {}
+        self.stats = {'requests': 0, 'parsed': 0, 'duplicate_bodies': 0}
+
+    def _fetch_body(self, url, headers):
+        with self._lock:
+            self.stats['requests'] += 1
+        response = http_client.get(url, headers=headers, timeout=30, session=self.session)
+        response.raise_for_status()
+        return response.content
+
+    def _price_from_body(self, body, is_api, key=None):
+        digest = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if digest in self._prices_by_digest:
+                self.stats['duplicate_bodies'] += 1
+                return self._prices_by_digest[digest]
+            self.stats['parsed'] += 1
+        if is_api:
+            price = parse_api_price(json_codec.loads(body))
+        else:
+            price, _ = extract_price(body, key)
+        with self._lock:
+            self._prices_by_digest[digest] = price
+        return price
+
+    def _price_at(self, url, store):
+        target = store_url(url, store)
+        body = self._fetch_body(target, store_headers(target, store))
+        return self._price_from_body(body, 'whsNumber=' in target, page_key(target))
+
+    def fetch_item(self, url):
+        """
+        Price a product at every store
+
+        Args:
+            url: Product page URL, or a learned price API URL
+
+        Returns:
+            dict: store id -> price (None where the store couldn't be priced)
+
+        Raises:
+            http_client.HostUnavailable: If no store could be priced
+                                         because the host's breaker is open
+        """
+        futures = {store['id']: self.pool.submit(self._price_at, url, store) for store in self.stores}
+        matrix = {}
+        unavailable = None
+        for store_id, future in futures.items():
+            try:
+                matrix[store_id] = future.result()
+            except http_client.HostUnavailable as e:
+                matrix[store_id] = None
+                unavailable = e
+            except Exception as e:
+                print(f"  ⚠️  Store {store_id}: {e}")
+                matrix[store_id] = None
+        with self._lock:
+            self._prices_by_digest.clear()
+        if unavailable and all(price is None for price in matrix.values()):
+            raise unavailable
+        return matrix
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        self.session.close()
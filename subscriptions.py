@@ -0,0 +1,130 @@
+"""
+Threshold Subscription Index
+Popular products can have thousands of subscribers, each with their own
+price threshold. Instead of comparing every threshold on every check, the
+index keeps each product's thresholds sorted, so a price move from
+old_price to new_price finds exactly the subscriptions it crossed with
+two bisects: O(log n + k) per observation, k = subscriptions crossed.
+
+    crossed below: new_price <= threshold < old_price
+    recovered:     old_price <= threshold < new_price
+
+Subscribers come from "subscribers" lists on config items:
+
+    {"item_id": "4000285678", ...,
+     "subscribers": [{"id": "alice", "threshold": 279.99}, ...]}
+
+config_compiler sorts them into the compiled (cached) config, so a run
+starts from a ready index; add()/remove()/sync() update it in place.
+
+crossed() only reports price moves, so a subscription added while the
+price already sits at/below its threshold would never fire. add() and
+sync() take the product's current price and report such subscriptions
+so they can be notified straight away.
+"""
+
+import bisect
+
+
+class SubscriptionIndex:
+    """Per-product sorted thresholds: {product_key: [[threshold, subscriber_id], ...]}"""
+
+    def __init__(self, compiled=None):
+        # Lists from the compiled config are already sorted
+        self.products = {key: [tuple(entry) for entry in entries]
+                         for key, entries in (compiled or {}).items()}
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.products.values())
+
+    def add(self, product_key, subscriber_id, threshold, price=None):
+        """
+        Add (or move) a subscription
+
+        Args:
+            price: Product's current price, if known
+
+        Returns:
+            bool: True if price is already at/below threshold (crossed()
+                  won't report it, so notify now)
+        """
+        self.remove(product_key, subscriber_id)
+        bisect.insort(self.products.setdefault(product_key, []), (threshold, subscriber_id))
+        return price is not None and price <= threshold
+
+    def remove(self, product_key, subscriber_id):
+        """Remove a subscription (returns True if it existed)"""
+        entries = self.products.get(product_key, [])
+        for index, (_, existing_id) in enumerate(entries):
+            if existing_id == subscriber_id:
+                del entries[index]
+                return True
+        return False
+
+    def sync(self, compiled, prices=None):
+        """
+        Bring the index in line with a newly compiled subscription map,
+        touching only subscriptions that changed
+
+        Args:
+            compiled: {product_key: [[threshold, subscriber_id], ...]}
+            prices: {product_key: current price} for products priced before
+
+        Returns:
+            tuple: (added, removed, already_below) where added/removed are
+                   counts and already_below maps product_key to the new or
+                   moved subscriptions whose threshold the current price
+                   already meets, sorted like crossed() results
+        """
+        prices = prices or {}
+        added = removed = 0
+        already_below = {}
+        for product_key in set(self.products) | set(compiled):
+            current = set(self.products.get(product_key, []))
+            wanted = {tuple(entry) for entry in compiled.get(product_key, [])}
+            for threshold, subscriber_id in current - wanted:
+                self.products[product_key].remove((threshold, subscriber_id))
+                removed += 1
+            new = wanted - current
+            for threshold, subscriber_id in new:
+                bisect.insort(self.products.setdefault(product_key, []), (threshold, subscriber_id))
+                added += 1
+            if new and prices.get(product_key) is not None:
+                below = [entry for entry in self.below(product_key, prices[product_key]) if entry in new]
+                if below:
+                    already_below[product_key] = below
+            if not self.products.get(product_key):
+                self.products.pop(product_key, None)
+        return added, removed, already_below
+
+    def crossed(self, product_key, old_price, new_price):
+        """
+        Subscriptions whose threshold the price just crossed
+
+        Args:
+            product_key: Canonical product key
+            old_price: Previous price (None if never priced)
+            new_price: Price just observed
+
+        Returns:
+            tuple: (now_below, recovered) lists of (threshold, subscriber_id).
+                   now_below are newly at/below threshold; recovered went
+                   back above it.
+        """
+        entries = self.products.get(product_key)
+        if not entries:
+            return [], []
+        # Tuples compare by threshold first; (x,) sorts before any (x, id)
+        low = bisect.bisect_left(entries, (new_price,))
+        if old_price is None:
+            return entries[low:], []
+        if new_price < old_price:
+            return entries[low:bisect.bisect_left(entries, (old_price,))], []
+        if new_price > old_price:
+            return [], entries[bisect.bisect_left(entries, (old_price,)):low]
+        return [], []
+
+    def below(self, product_key, price):
+        """All subscriptions currently at/below their threshold for price"""
+        entries = self.products.get(product_key, [])
+        return entries[bisect.bisect_left(entries, (price,)):]
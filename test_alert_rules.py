@@ -0,0 +1,81 @@
+"""
+Tests for the incremental alert rule engine.
+"""
+
+import pytest
+
+import alert_rules
+from alert_rules import evaluate_observation, is_alert_active, reevaluate_threshold, rule_key, seed_from_history
+
+DAY = 86400
+
+
+def _run(rules, prices, threshold=None, step=3600, state=None):
+    state = {} if state is None else state
+    return [[alert['type'] for alert in evaluate_observation(state, 'costco:1', price, threshold, rules,
+                                                             timestamp=1_700_000_000 + i * step)]
+            for i, price in enumerate(prices)], state
+
+
+def test_threshold_fires_on_cross_and_further_drop():
+    fired, state = _run([{'type': 'threshold'}], [310, 299, 299, 289, 305, 295], threshold=300)
+    assert fired == [[], ['threshold'], [], ['threshold'], [], ['threshold']]
+    assert is_alert_active(state, 'costco:1')
+
+
+def test_new_low_respects_window():
+    rules = [{'type': 'new_low', 'window_days': 2}]
+    fired, _ = _run(rules, [300, 310, 290, 295, 295], step=DAY)
+    assert fired == [[], [], ['new_low'], [], []]
+    # After the window moves past the old low, a higher price is the new low
+    fired, _ = _run(rules, [200, 300, 300, 250], step=DAY)
+    assert fired == [[], [], [], ['new_low']]
+
+
+def test_percent_drop_within_window():
+    rules = [{'type': 'percent_drop', 'percent': 10, 'window_hours': 24}]
+    fired, _ = _run(rules, [100, 95, 89, 88, 100, 85], step=3600)
+    assert fired == [[], [], ['percent_drop'], [], [], ['percent_drop']]
+    # Drops spread over more than the window don't count
+    fired, _ = _run(rules, [100, 95, 90, 85], step=DAY)
+    assert fired == [[], [], [], []]
+
+
+def test_below_recent_average_needs_full_window():
+    rules = [{'type': 'below_recent_average', 'last_n': 3, 'percent': 5}]
+    fired, state = _run(rules, [80, 100, 100, 100, 90])
+    assert fired == [[], [], [], [], ['below_recent_average']]
+    assert state['costco:1']['rules'][rule_key(rules[0])]['sum'] == pytest.approx(290)
+
+
+def test_state_survives_a_json_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(alert_rules, 'STATE_FILE', tmp_path / "alert_state.json")
+    rules = [{'type': 'new_low', 'window_days': 90}, {'type': 'below_recent_average', 'last_n': 2, 'percent': 5}]
+    _, state = _run(rules, [300, 310])
+    alert_rules.save_alert_state(state)
+    fired, _ = _run(rules, [250], state=alert_rules.load_alert_state())
+    assert fired == [['new_low', 'below_recent_average']]
+
+
+def test_seeded_state_keeps_an_active_alert_quiet():
+    state = {}
+    seed_from_history(state, 'costco:1', {'price': 290, 'alert_triggered': True})
+    fired, _ = _run([{'type': 'threshold'}], [290], threshold=300, state=state)
+    assert fired == [[]]
+
+
+def test_reevaluate_threshold_without_new_observation():
+    fired, state = _run([{'type': 'threshold'}], [310], threshold=300)
+    alerts = reevaluate_threshold(state, 'costco:1', 310, 320, [{'type': 'threshold'}])
+    assert [alert['type'] for alert in alerts] == ['threshold']
+    assert state['costco:1']['count'] == 1
+
+
+def test_rule_key_ignores_parameter_order():
+    assert rule_key({'type': 'percent_drop', 'window_hours': 24, 'percent': 10}) == \
+        rule_key({'percent': 10, 'type': 'percent_drop', 'window_hours': 24})
+
+
+def test_unknown_rule_type():
+    with pytest.raises(ValueError):
+        _run([{'type': 'nope'}], [1])
@@ -0,0 +1,109 @@
+"""
+Tests for learning price API endpoints and falling back when one stops working.
+"""
+
+import pytest
+
+import api_discovery
+import playwright_price_checker
+from api_discovery import find_price_request, learn_endpoint, learned_api_url, record_result, template_from_html
+
+ITEM = {'item_id': '4000285678', 'watch_id': '4000285678', 'name': 'iPad',
+        'url': 'https://www.costco.com/ipad-128gb.product.4000285678.html'}
+CLIENT_ID = '481b1aec-aa3b-454b-b81b-48187e28f205'
+API_URL = ('https://api.digital.costco.com/ebusiness/product/v1/products/display-price-lite'
+           f'?whsNumber=847&clientId={CLIENT_ID}&item=4000285678&locale=en-us')
+TRAFFIC = [
+    'https://www.costco.com/AjaxGetInventoryDetail?itemId=4000285678',
+    'https://api.digital.costco.com/ebusiness/product/v1/products/display-price-lite?item=999&locale=en-us',
+    API_URL,
+]
+
+
+def test_template_from_browser_traffic():
+    template = find_price_request(TRAFFIC, '4000285678')
+    assert '{item}' in template and '4000285678' not in template
+    assert learned_api_url({'1': {'template': template}}, '1', '4000308504') == API_URL.replace('4000285678',
+                                                                                                 '4000308504')
+    # No request for this item's number
+    assert find_price_request(TRAFFIC[:2], '4000285678') is None
+
+
+def test_template_from_embedded_page_config():
+    body = ('"priceLite":{\\"endpoint\\":\\"https://api.digital.costco.com/ebusiness/product/v1/products/'
+            'display-price-lite\\",\\"client_identifier\\":{\\"usbc\\":\\"' + CLIENT_ID + '\\"},'
+            '\\"ware_house\\":{\\"usbc\\":\\"847\\"}}').encode()
+    assert template_from_html(body).replace('{item}', '4000285678') == API_URL
+    assert template_from_html(b'<html>no config</html>') is None
+
+
+def test_endpoint_forgotten_after_repeated_failures():
+    endpoints = {}
+    assert learn_endpoint(endpoints, '1', 'https://x/display-price-lite?item={item}', 'browser')
+    assert not learn_endpoint(endpoints, '1', 'https://x/display-price-lite?item={item}', 'browser')
+    assert not record_result(endpoints, '1', False)
+    assert not record_result(endpoints, '1', True)
+    assert endpoints['1']['failures'] == 0
+    for _ in range(api_discovery.MAX_FAILURES - 1):
+        assert not record_result(endpoints, '1', False)
+    assert record_result(endpoints, '1', False)
+    assert endpoints == {}
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    """get_current_price with fake API, page and browser tiers; returns (tiers, calls, api_prices)"""
+    calls = []
+    api_prices = {}
+    browser = {'price': 299.99, 'api_requests': TRAFFIC}
+
+    class FakeBrowserPool:
+        def __init__(self, size, pages_per_context):
+            pass
+
+        def start(self):
+            pass
+
+        def fetch(self, url):
+            calls.append('browser')
+            return browser
+
+    def fetch_api(url, hedge=False):
+        calls.append('api')
+        return api_prices.get(url)
+
+    def scrape_page(url, item_id=None, archive=False, endpoints=None, hedge=False):
+        calls.append('page')
+        return None, None
+
+    monkeypatch.setattr(playwright_price_checker, 'BrowserPool', FakeBrowserPool)
+    monkeypatch.setattr(playwright_price_checker, 'fetch_price_from_api', fetch_api)
+    monkeypatch.setattr(playwright_price_checker, 'scrape_price_from_product_page', scrape_page)
+    tiers = {'listing_prices': {}, 'endpoints': {}, 'archive': False,
+             'browser': {'enabled': True}, 'browser_pool': None}
+    return tiers, calls, api_prices
+
+
+def test_learns_from_browser_traffic_then_falls_back_when_api_stops_pricing(tiers):
+    tiers, calls, api_prices = tiers
+    get_current_price = playwright_price_checker.get_current_price
+
+    # First run: page can't price it, the browser can and its traffic teaches the endpoint
+    assert get_current_price(ITEM, tiers) == 299.99
+    assert calls == ['page', 'browser']
+    assert tiers['endpoints'][ITEM['item_id']]['source'] == 'browser'
+
+    # Next run goes straight to the API
+    calls.clear()
+    api_prices[API_URL] = 289.99
+    assert get_current_price(ITEM, tiers) == 289.99
+    assert calls == ['api']
+
+    # The endpoint stops returning a price: fall back to the page and browser
+    api_prices.clear()
+    for _ in range(api_discovery.MAX_FAILURES):
+        calls.clear()
+        assert get_current_price(ITEM, tiers) == 299.99
+        assert calls == ['api', 'page', 'browser']
+    # ... and the browser relearned it after it was forgotten
+    assert tiers['endpoints'][ITEM['item_id']]['failures'] == 0
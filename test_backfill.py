@@ -0,0 +1,135 @@
+"""
+Tests for backfill corrections and the readers that must put them in
+place of the observation they supersede.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+import backfill
+import history_store
+import json_codec
+import page_archive
+import price_report
+import retention
+from history_store import append_observations, make_observation
+from price_server import _Item
+
+PAGE = b'<html><meta itemprop="price" content="279.99"></html>'
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    archive_dir = tmp_path / "page_archive"
+    monkeypatch.setattr(page_archive, 'ARCHIVE_DIR', archive_dir)
+    monkeypatch.setattr(page_archive, 'OBJECTS_DIR', archive_dir / "objects")
+    monkeypatch.setattr(page_archive, 'CACHE_DIR', archive_dir / "cache")
+    monkeypatch.setattr(page_archive, 'INDEX_FILE', archive_dir / "index.jsonl")
+    monkeypatch.setattr(history_store, 'OBSERVATIONS_FILE', tmp_path / "observations.jsonl")
+    # Workers share the patched module state
+    monkeypatch.setattr(backfill, 'ProcessPoolExecutor', ThreadPoolExecutor)
+    written = []
+    monkeypatch.setattr(backfill, 'append_observations',
+                        lambda corrections: written.extend(corrections) or len(corrections))
+    return written
+
+
+def test_correction_takes_the_original_timestamp(store):
+    page_archive.archive_page('4000285678', 'https://www.costco.com/x.product.4000285678.html', PAGE, 200, 299.99)
+    original = make_observation('4000285678', 299.99, timestamp='2099-01-01T08:00:05')
+    append_observations([original], history_store.OBSERVATIONS_FILE)
+
+    stats = backfill.run_backfill(workers=1)
+    assert stats['disagree'] == 1 and stats['written'] == 1
+    [correction] = store
+    assert correction['price'] == 279.99
+    assert history_store.supersede_key(correction) == history_store.supersede_key(original)
+
+    # Running it again finds the correction and writes nothing new
+    append_observations(store, history_store.OBSERVATIONS_FILE)
+    assert backfill.run_backfill(workers=1)['agree'] == 1
+
+
+def test_entry_without_observation_is_skipped(store):
+    page_archive.archive_page('4000285678', 'https://www.costco.com/x.product.4000285678.html', PAGE, 200, 299.99)
+    stats = backfill.run_backfill(workers=1)
+    assert stats['unmatched'] == 1 and store == []
+
+
+def test_entry_matches_observation_without_run_id_by_time(store):
+    page_archive.archive_page('4000285678', 'https://www.costco.com/x.product.4000285678.html', PAGE, 200, 299.99)
+    [entry] = page_archive.iter_index()
+    fetched = datetime.fromisoformat(entry['timestamp'])
+    # Written before observations carried a run id
+    legacy = make_observation('4000285678', 299.99, timestamp=(fetched + timedelta(seconds=2)).isoformat(),
+                              run_id=None)
+    append_observations([legacy], history_store.OBSERVATIONS_FILE)
+    by_run, by_time = backfill.index_observations()
+    assert backfill.find_observation(entry, by_run, by_time) == legacy
+
+    entry['timestamp'] = (fetched - backfill.MATCH_WINDOW - timedelta(seconds=1)).isoformat()
+    assert backfill.find_observation(entry, by_run, by_time) is None
+
+
+def _pair():
+    original = make_observation('1', 299.99, timestamp='2025-11-20T08:00:05')
+    later = make_observation('1', 289.99, timestamp='2025-11-21T08:00:05')
+    correction = make_observation('1', 279.99, timestamp=original['timestamp'], source='backfill')
+    return original, later, correction
+
+
+def test_report_series_replaces_corrected_point():
+    original, later, correction = _pair()
+    series = price_report.merge_observations([], [original, later])
+    assert price_report.merge_observations(series, [correction]) == [
+        ['2025-11-20T08:00:05', 279.99], ['2025-11-21T08:00:05', 289.99]]
+    # Original and correction in the same batch
+    assert price_report.merge_observations([], [original, correction, later])[0] == ['2025-11-20T08:00:05', 279.99]
+
+
+def test_server_index_replaces_corrected_point_and_low():
+    original, later, correction = _pair()
+    item = _Item()
+    item.add(dict(original, price=199.99))
+    item.add(later)
+    assert (item.low, item.low_at) == (199.99, original['timestamp'])
+    item.add(correction)
+    assert item.prices == [279.99, 289.99]
+    assert (item.low, item.low_at) == (279.99, original['timestamp'])
+
+
+def test_rollup_replaces_original_in_batch_and_across_compactions(tmp_path):
+    original, later, correction = _pair()
+    [record] = retention.roll_up([original, correction], {}, 'day')
+    assert (record['count'], record['low'], record['changes']) == (1, 279.99, [[original['timestamp'], 279.99]])
+
+    # Original rolled up first; the correction expires in a later compaction
+    rollups_file = tmp_path / "rollups.jsonl"
+    last_prices = {}
+    records = retention.roll_up([original, later], last_prices) + retention.roll_up([correction], last_prices)
+    rollups_file.write_bytes(b''.join(json_codec.dump_bytes(r) + b'\n' for r in records))
+    assert sum(r['count'] for r in records) == 2
+    assert last_prices == {'1': 289.99}
+    points = [(o['timestamp'], o['price']) for o in retention.rollup_observations(rollups_file)]
+    assert points == [(original['timestamp'], 279.99), (later['timestamp'], 289.99)]
+
+
+def test_parquet_export_rewrites_superseded_rows(monkeypatch, tmp_path):
+    export_parquet = pytest.importorskip('export_parquet')
+    pytest.importorskip('pyarrow')
+    observations_file = tmp_path / "observations.jsonl"
+    monkeypatch.setattr(export_parquet, 'rollup_observations', lambda: [])
+    monkeypatch.setattr(export_parquet, 'read_legacy_history', lambda legacy_file: [])
+    original, later, correction = _pair()
+    append_observations([original, later], observations_file)
+    export_dir = tmp_path / "parquet"
+    export_parquet.export(export_dir, observations_file=observations_file)
+
+    append_observations([correction], observations_file)
+    result = export_parquet.export(export_dir, observations_file=observations_file)
+    assert result['total'] == 2
+    table = export_parquet.open_dataset(export_dir).to_table().sort_by('timestamp')
+    assert table['price_cents'].to_pylist() == [27999, 28999]
+    assert table['source'].to_pylist() == ['backfill', 'check']
@@ -0,0 +1,90 @@
+"""
+Tests for the headless browser pool against a local static server.
+Skipped when playwright or its Chromium build is not installed.
+"""
+
+import functools
+import http.server
+import threading
+
+import pytest
+
+from browser_pool import BrowserPool, is_blocked, parse_price_text, sync_playwright
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html><head>
+<link rel="preload" as="image" href="/hero.jpg">
+<script>window.BOOMR_config = {};</script>
+</head><body>
+<h1>iPad, 128GB Wi-Fi (A16 chip)</h1>
+<img src="/hero.jpg">
+<div id="price"></div>
+<script>
+  // Price renders client-side after a delay, like Costco's product page
+  setTimeout(function () {
+    document.getElementById('price').innerHTML =
+      '<span data-testid="Text_single-price-whole-value">$299.99</span>';
+  }, 300);
+</script>
+</body></html>
+"""
+
+
+@pytest.fixture(scope="module")
+def static_server(tmp_path_factory):
+    root = tmp_path_factory.mktemp("site")
+    (root / "product.html").write_text(PRODUCT_PAGE)
+    (root / "hero.jpg").write_bytes(b"\xff\xd8\xff" + b"\0" * 1024)
+
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(root))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    if sync_playwright is None:
+        pytest.skip("playwright not installed")
+    browser_pool = BrowserPool(size=2, pages_per_context=2, wait_timeout_ms=5000)
+    try:
+        browser_pool.start()
+    except Exception as e:
+        pytest.skip(f"Chromium not available: {e}")
+    yield browser_pool
+    browser_pool.close()
+
+
+def test_is_blocked():
+    assert is_blocked("https://bfasset.costco-static.com/x/4000285678-847_blue_1", "other")
+    assert is_blocked("https://s2.go-mpulse.net/boomerang/ABC", "script")
+    assert is_blocked("https://www.costco.com/fonts/costco.woff2", "font")
+    assert not is_blocked("https://www.costco.com/ipad.product.4000285678.html", "document")
+
+
+def test_parse_price_text():
+    assert parse_price_text("$1,299.99") == 1299.99
+    assert parse_price_text("") is None
+
+
+def test_fetch_waits_for_price_selector(static_server, pool):
+    result = pool.fetch(f"{static_server}/product.html")
+    assert result['status'] == 200
+    assert result['price'] == 299.99
+
+
+def test_heavy_resources_are_blocked(static_server, pool):
+    blocked_before = pool.stats['blocked']
+    pool.fetch(f"{static_server}/product.html")
+    assert pool.stats['blocked'] > blocked_before
+
+
+def test_contexts_recycled_after_n_pages(static_server, pool):
+    recycled_before = pool.stats['recycled']
+    # size=2, pages_per_context=2: the 5th page forces a recycle
+    for _ in range(5):
+        pool.fetch(f"{static_server}/product.html")
+    assert pool.stats['recycled'] > recycled_before
@@ -0,0 +1,80 @@
+"""
+Tests for the per-host circuit breaker and where http_client keeps its
+per-host state.
+"""
+
+import pytest
+import requests
+
+import circuit_breaker
+import http_client
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, allow_request, record_outcome
+
+HOST = 'www.costco.com'
+SETTINGS = dict(circuit_breaker.DEFAULT_SETTINGS, min_requests=4, error_rate=0.5, open_seconds=60)
+T = 1_700_000_000
+
+
+def test_blocking_status_opens_immediately():
+    state = {}
+    assert record_outcome(state, HOST, 403, settings=SETTINGS, now=T) == OPEN
+    assert not allow_request(state, HOST, SETTINGS, now=T + 59)
+
+
+def test_error_rate_needs_min_requests():
+    state = {}
+    for offset in range(3):
+        assert record_outcome(state, HOST, error=True, settings=SETTINGS, now=T + offset) == CLOSED
+    record_outcome(state, HOST, 200, settings=SETTINGS, now=T + 3)
+    # 3 failures out of 4
+    assert state[HOST]['state'] == OPEN
+
+
+def test_half_open_allows_one_probe():
+    state = {}
+    record_outcome(state, HOST, 429, settings=SETTINGS, now=T)
+    assert allow_request(state, HOST, SETTINGS, now=T + 61)
+    assert state[HOST]['state'] == HALF_OPEN
+    assert not allow_request(state, HOST, SETTINGS, now=T + 61)
+
+    # A failed probe doubles the cooldown
+    assert record_outcome(state, HOST, 503, settings=SETTINGS, now=T + 62) == OPEN
+    assert state[HOST]['open_until'] == T + 62 + 120
+
+    assert allow_request(state, HOST, SETTINGS, now=T + 200)
+    assert record_outcome(state, HOST, 200, settings=SETTINGS, now=T + 200) == CLOSED
+    assert state[HOST]['cooldown'] is None
+
+
+def test_probe_in_flight_is_cleared_on_load(tmp_path):
+    path = tmp_path / "breakers.json"
+    circuit_breaker.save_breakers({HOST: {'state': HALF_OPEN, 'probe_in_flight': True}}, path)
+    assert circuit_breaker.load_breakers(path)[HOST]['probe_in_flight'] is False
+
+
+class FakeResponse:
+    status_code = 403
+
+
+@pytest.fixture
+def state_files(monkeypatch, tmp_path):
+    breakers_file = tmp_path / "own_breakers.json"
+    latency_file = tmp_path / "own_latency.json"
+    monkeypatch.setattr(http_client, '_state_files', dict(http_client._state_files))
+    monkeypatch.setattr(http_client, '_breakers', None)
+    monkeypatch.setattr(http_client, '_latency', None)
+    monkeypatch.setattr(http_client, '_timed_get', lambda session, url, timeout, kwargs: (FakeResponse(), 0.2))
+    http_client.use_state_files(breakers_file, latency_file)
+    return breakers_file, latency_file
+
+
+def test_checker_keeps_state_in_its_own_files(state_files):
+    breakers_file, latency_file = state_files
+    http_client.get(f'https://{HOST}/x', timeout=10)
+    with pytest.raises(http_client.HostUnavailable):
+        http_client.get(f'https://{HOST}/y', timeout=10)
+    assert isinstance(http_client.HostUnavailable(HOST), requests.RequestException)
+
+    http_client.save_state()
+    assert circuit_breaker.load_breakers(breakers_file)[HOST]['state'] == OPEN
+    assert breakers_file.exists() and latency_file.exists()
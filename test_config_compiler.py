@@ -0,0 +1,83 @@
+"""
+Tests for config validation, compilation, caching and watchlist merging.
+"""
+
+import json
+
+import pytest
+
+import config_compiler
+from config_compiler import compile_config, validate_config
+
+ITEM = {
+    'name': 'iPad A16 (128GB Wi-Fi)',
+    'item_id': '4000285678',
+    'url': 'https://www.costco.com/ipad-128gb-wi-fi-a16-chip.product.4000285678.html',
+    'price_threshold': 299.0,
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(config_compiler, 'CACHE_DIR', tmp_path / ".config_cache")
+
+
+def write_config(path, config):
+    path.write_text(json.dumps(config))
+    return path
+
+
+def test_valid_config_has_no_errors():
+    assert validate_config({'items': [ITEM]}) == []
+
+
+@pytest.mark.parametrize('threshold', [None, 'cheap', True])
+def test_price_threshold_is_required_and_numeric(threshold):
+    item = dict(ITEM)
+    if threshold is None:
+        del item['price_threshold']
+    else:
+        item['price_threshold'] = threshold
+    assert any('price_threshold' in error for error in validate_config({'items': [item]}))
+
+
+def test_duplicate_ids_and_bad_subscribers_are_reported():
+    bad = dict(ITEM, subscribers=[{'id': 'alice'}])
+    errors = validate_config({'items': [ITEM, bad]})
+    assert any('duplicated' in error for error in errors)
+    assert any('subscribers[0].threshold' in error for error in errors)
+
+
+def test_compile_derives_item_fields_and_aliases(tmp_path):
+    config_path = write_config(tmp_path / "config.json", {'items': [dict(ITEM, aliases=['1849805'])]})
+    compiled = compile_config(config_path, use_cache=False)
+    item = compiled['items'][0]
+    assert item['host'] == 'www.costco.com'
+    assert item['fetch_strategy'] == 'page'
+    assert item['product_key'] == 'costco:4000285678'
+    assert item['watch_id'] == '4000285678'
+    assert compiled['aliases'] == {'1849805': '4000285678'}
+
+
+def test_compile_rejects_invalid_config(tmp_path):
+    item = dict(ITEM)
+    del item['price_threshold']
+    with pytest.raises(ValueError):
+        compile_config(write_config(tmp_path / "config.json", {'items': [item]}))
+
+
+def test_watchlists_share_products(tmp_path):
+    write_config(tmp_path / "family.json", {'items': [dict(ITEM, price_threshold=279.0)]})
+    config_path = write_config(tmp_path / "config.json", {'items': [ITEM], 'watchlists': ['family.json']})
+    compiled = compile_config(config_path)
+    assert [item['watch_id'] for item in compiled['items']] == ['4000285678', 'family:4000285678']
+    assert compiled['products'] == {'costco:4000285678': ['4000285678', 'family:4000285678']}
+
+
+def test_cache_is_invalidated_when_a_watchlist_changes(tmp_path):
+    watchlist = write_config(tmp_path / "family.json", {'items': [ITEM]})
+    config_path = write_config(tmp_path / "config.json", {'items': [], 'watchlists': ['family.json']})
+    assert compile_config(config_path)['items'][0]['price_threshold'] == 299.0
+    write_config(watchlist, {'items': [dict(ITEM, price_threshold=250.0)]})
+    assert compile_config(config_path)['items'][0]['price_threshold'] == 250.0
+
@@ -0,0 +1,139 @@
+"""
+Tests for the incremental Parquet export: watermark, corrections and rebuilds.
+"""
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import export_parquet
+import json_codec
+import retention
+from history_store import append_observations, make_observation
+
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    """export() over a temp log and dataset; returns (observations_file, export_dir, run)"""
+    monkeypatch.setattr(export_parquet, 'rollup_observations', lambda: [])
+    monkeypatch.setattr(export_parquet, 'read_legacy_history', lambda *args, **kwargs: [])
+    observations_file = tmp_path / "observations.jsonl"
+    export_dir = tmp_path / "parquet"
+
+    def run(**kwargs):
+        return export_parquet.export(export_dir, observations_file=observations_file, **kwargs)
+
+    return observations_file, export_dir, run
+
+
+def _rows(export_dir):
+    table = export_parquet.open_dataset(export_dir).to_table().sort_by('timestamp')
+    return list(zip(table['item_id'].to_pylist(), table['price_cents'].to_pylist()))
+
+
+def test_incremental_export_reads_only_new_lines(run):
+    observations_file, export_dir, run = run
+    append_observations([make_observation('1', 299.99, timestamp='2025-11-20T08:00:00'),
+                         make_observation('2', None, timestamp='2025-11-20T08:00:01')], observations_file)
+    assert run()['written'] == 2
+    assert run()['written'] == 0
+
+    append_observations([make_observation('1', 289.99, timestamp='2025-12-01T08:00:00')], observations_file)
+    result = run()
+    assert (result['written'], result['total']) == (1, 3)
+    assert _rows(export_dir) == [('1', 29999), ('2', None), ('1', 28999)]
+    state = export_parquet.load_export_state(export_dir)
+    assert state['observations_offset'] == observations_file.stat().st_size
+    assert state['observations_anchor'] is not None
+
+
+def test_corrections_rewrite_only_their_partition(run):
+    observations_file, export_dir, run = run
+    original = make_observation('1', 299.99, timestamp='2025-11-20T08:00:00')
+    append_observations([original, make_observation('2', 99.99, timestamp='2025-11-20T08:00:01')],
+                        observations_file)
+    run()
+    untouched = sorted((export_dir / "month=2025-11" / "item_id=2").glob('*.parquet'))
+
+    correction = make_observation('1', 279.99, timestamp=original['timestamp'], source='backfill')
+    append_observations([correction], observations_file)
+    assert run()['total'] == 2
+    assert _rows(export_dir) == [('1', 27999), ('2', 9999)]
+    assert sorted((export_dir / "month=2025-11" / "item_id=2").glob('*.parquet')) == untouched
+
+
+def test_correction_in_the_same_batch_drops_the_original(tmp_path):
+    original = make_observation('1', 299.99, timestamp='2025-11-20T08:00:00')
+    correction = make_observation('1', 279.99, timestamp=original['timestamp'], source='backfill')
+    later = make_observation('1', 289.99, timestamp='2025-11-21T08:00:00')
+    observations, removed = export_parquet.apply_corrections([original, correction, later], tmp_path)
+    assert (observations, removed) == ([correction, later], 0)
+
+
+def test_rewritten_log_triggers_a_full_rebuild(run):
+    observations_file, export_dir, run = run
+    append_observations([make_observation('1', 299.99, timestamp='2025-11-20T08:00:00'),
+                         make_observation('1', 289.99, timestamp='2025-11-21T08:00:00')], observations_file)
+    run()
+    # Replaced by a shorter log that doesn't contain the watermark's line
+    observations_file.unlink()
+    append_observations([make_observation('3', 9.99, timestamp='2025-11-22T08:00:00')], observations_file)
+    result = run()
+    assert (result['written'], result['total']) == (1, 1)
+    assert _rows(export_dir) == [('3', 999)]
+
+    assert run(full=True)['total'] == 1
+
+
+def test_export_continues_after_compaction(run, monkeypatch, tmp_path):
+    observations_file, export_dir, run = run
+    monkeypatch.setattr(retention, 'ROLLUPS_FILE', tmp_path / "rollups.jsonl")
+    append_observations([make_observation('1', 299.99, timestamp='2025-10-01T08:00:00'),
+                         make_observation('1', 289.99, timestamp='2025-11-21T08:00:00')], observations_file)
+    run()
+    retention.compact_observations('2025-11-01T00', {}, observations_file)
+    append_observations([make_observation('1', 279.99, timestamp='2025-11-22T08:00:00')], observations_file)
+    result = run()
+    # Not rebuilt: the compacted-away October row is still exported once
+    assert (result['written'], result['total']) == (1, 3)
+    assert [price for _, price in _rows(export_dir)] == [29999, 28999, 27999]
+
+
+def test_legacy_history_exports_one_row_per_interval(monkeypatch, tmp_path):
+    intervals_file = tmp_path / "price_intervals.json"
+    json_codec.save_file(intervals_file, {'iPad': [
+        {'price': 299.99, 'threshold': 300.0, 'first_seen': '2025-11-05T23:47:32',
+         'last_seen': '2025-11-20T08:00:00', 'check_count': 41},
+        {'price': 279.99, 'threshold': 300.0, 'first_seen': '2025-11-21T08:00:00',
+         'last_seen': '2025-11-21T08:00:00', 'check_count': 1},
+    ]})
+    rows = export_parquet.read_legacy_history(tmp_path / "missing.json", intervals_file)
+    monkeypatch.setattr(export_parquet, 'rollup_observations', lambda: [])
+    monkeypatch.setattr(export_parquet, 'read_legacy_history', lambda legacy_file: rows)
+    export_dir = tmp_path / "parquet"
+    assert export_parquet.export(export_dir, observations_file=tmp_path / "observations.jsonl")['total'] == 2
+    table = export_parquet.open_dataset(export_dir).to_table().sort_by('timestamp').to_pylist()
+    assert [(row['source'], row['price_cents'], row['check_count']) for row in table] == [
+        ('legacy', 29999, 41), ('legacy', 27999, 1)]
+    assert table[0]['last_seen'].isoformat() == '2025-11-20T08:00:00'
+    assert {row['item_id'] for row in table} == {'legacy-ipad'}
+
+
+def test_files_without_the_legacy_columns_still_read(run):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    observations_file, export_dir, run = run
+    # A partition file written before check_count/last_seen existed
+    partition = export_dir / "month=2025-11" / "item_id=1"
+    partition.mkdir(parents=True)
+    old = export_parquet.observations_to_table([make_observation('1', 299.99, timestamp='2025-11-20T08:00:00')])
+    pq.write_table(old.drop_columns(['check_count', 'last_seen', 'item_id', 'month']), partition / "part-old-0.parquet")
+    json_codec.save_file(export_dir / export_parquet.STATE_FILE_NAME,
+                         {'observations_offset': 0, 'legacy_exported': True, 'rows': 1})
+
+    append_observations([make_observation('1', 279.99, timestamp='2025-11-20T08:00:00', source='backfill'),
+                         make_observation('1', 289.99, timestamp='2025-11-21T08:00:00')], observations_file)
+    assert run()['total'] == 2
+    table = export_parquet.open_dataset(export_dir).to_table().sort_by('timestamp')
+    assert table['price_cents'].to_pylist() == [27999, 28999]
+    assert table['check_count'].to_pylist() == [None, None]
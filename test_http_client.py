@@ -0,0 +1,238 @@
+"""
+Tests for the shared fetch layer: hedged requests, Accept-Encoding
+negotiation, streaming decompression and per-host byte accounting.
+"""
+
+import gzip
+import hashlib
+import io
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3 import HTTPResponse
+
+import http_client
+import json_codec
+import latency_stats
+import main
+
+HOST = 'www.costco.com'
+
+
+class FakeResponse:
+    def __init__(self, name):
+        # The session it was sent on
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def slow_primary(monkeypatch):
+    """_timed_get where the primary (first) request blocks until released"""
+    monkeypatch.setattr(http_client, 'run_stats', {'requests': 10, 'hedged': 0, 'hedge_wins': 0})
+    monkeypatch.setattr(http_client, '_hedge_settings',
+                        dict(http_client._hedge_settings, enabled=True, budget_percent=100))
+    sent = []
+    release = threading.Event()
+
+    def timed_get(session, url, timeout, kwargs):
+        response = FakeResponse(session)
+        sent.append(response)
+        if session == 'primary':
+            release.wait(2)
+        return response, 0.0
+
+    monkeypatch.setattr(http_client, '_timed_get', timed_get)
+    return sent, release
+
+
+def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_slow_primary_loses_and_is_closed(slow_primary):
+    sent, release = slow_primary
+    response, _ = http_client._hedged_get('primary', 'https://www.costco.com/x', 5, 0.01, {})
+    assert response.name is http_client._hedge_session
+    assert not response.closed
+    assert http_client.run_stats['hedge_wins'] == 1
+
+    release.set()
+    # The losing primary's connection is released once it finishes
+    assert _wait_for(lambda: sent[0].closed)
+
+
+def test_hedges_share_one_session(slow_primary):
+    sent, release = slow_primary
+    http_client._hedged_get('primary', 'https://www.costco.com/x', 5, 0.01, {})
+    http_client._hedged_get('primary', 'https://www.costco.com/y', 5, 0.01, {})
+    release.set()
+    hedges = [response.name for response in sent if response.name != 'primary']
+    assert len(hedges) == 2 and hedges[0] is hedges[1] is http_client._hedge_session
+
+
+def test_pool_sized_for_store_fan_out(monkeypatch):
+    monkeypatch.setattr(http_client, '_transport_settings', dict(http_client._transport_settings))
+    monkeypatch.setattr(http_client, '_hedge_settings', dict(http_client._hedge_settings))
+    http_client.configure({'stores': {'workers': 40}})
+    assert http_client._hedge_pool_size == 80
+    session = http_client._hedge_session
+    http_client.configure({'stores': {'workers': 40}})
+    assert http_client._hedge_session is session
+    http_client.configure({})
+    assert http_client._hedge_pool_size == 32
+
+
+def _raw_response(body, headers=None, status=200):
+    """requests.Response over an in-memory body, as a stream=True GET leaves it"""
+    headers = headers or {}
+    response = requests.Response()
+    response.raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status,
+                                preload_content=False, decode_content=False)
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    return response
+
+
+def test_default_config_hedges_streamed_pages(monkeypatch):
+    config = json_codec.load_file(Path(__file__).parent / "config.json")
+    # The defaults main.py runs with: hedging on, no archive, so pages stream
+    assert config['hedging']['enabled'] and not config['archive']['enabled']
+    for name in ('_breaker_settings', '_timeout_settings', '_hedge_settings', '_transport_settings'):
+        monkeypatch.setattr(http_client, name, dict(getattr(http_client, name)))
+    http_client.configure(config)
+    latency = {}
+    for _ in range(latency_stats.DEFAULT_SETTINGS['min_samples']):
+        latency_stats.record_latency(latency, HOST, 0.01)
+    monkeypatch.setattr(http_client, '_latency', latency)
+    monkeypatch.setattr(http_client, '_breakers', {})
+    monkeypatch.setattr(http_client, 'run_stats', {'requests': 10, 'hedged': 0, 'hedge_wins': 0})
+
+    release = threading.Event()
+    sent = []
+
+    def open_stream(session, url, timeout, kwargs):
+        sent.append(session)
+        if session is http_client._session:
+            release.wait(2)
+        return _raw_response(b'<meta property="product:price:amount" content="299.99">'), 0.0
+
+    monkeypatch.setattr(http_client, '_open_stream', open_stream)
+    try:
+        price = main.fetch_price_from_page(f'https://{HOST}/x.product.4000285678.html', hedge=True)
+    finally:
+        release.set()
+    assert price == 299.99
+    assert sent == [http_client._session, http_client._hedge_session]
+    assert http_client.run_stats['hedge_wins'] == 1
+
+
+# Compressible but not trivially so, like real HTML
+PAGE = b''.join(b'<div class="tile">%s</div>\n' % hashlib.sha1(str(n).encode()).hexdigest().encode()
+                for n in range(20000))
+
+
+def _compress(body, coding):
+    if coding == 'gzip':
+        return gzip.compress(body)
+    if coding == 'deflate':
+        import zlib
+        return zlib.compress(body)
+    brotli = pytest.importorskip('brotli')
+    return brotli.compress(body, quality=5)
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    """Empty per-host state, so each test sees only its own requests"""
+    monkeypatch.setattr(http_client, 'transfer_stats', {})
+    monkeypatch.setattr(http_client, '_breakers', {})
+    monkeypatch.setattr(http_client, '_latency', {})
+    monkeypatch.setattr(http_client, 'run_stats', {'requests': 0, 'hedged': 0, 'hedge_wins': 0})
+    monkeypatch.setattr(http_client, '_transport_settings', dict(http_client._transport_settings, backend='requests'))
+
+
+def _serve(monkeypatch, body, headers):
+    """Answer stream() with body; returns the list of (request headers, response) sent"""
+    sent = []
+
+    def open_stream(session, url, timeout, kwargs):
+        response = _raw_response(body, headers)
+        sent.append((kwargs['headers'], response))
+        return response, 0.01
+
+    monkeypatch.setattr(http_client, '_open_stream', open_stream)
+    return sent
+
+
+def test_accept_encoding_lists_only_installed_decoders(monkeypatch):
+    monkeypatch.setattr(http_client, 'ACCEPT_ENCODING', 'gzip,deflate')
+    assert http_client.accept_encoding() == 'gzip, deflate'
+    monkeypatch.setattr(http_client, 'ACCEPT_ENCODING', 'gzip,deflate,br,zstd')
+    assert http_client.accept_encoding() == 'br, zstd, gzip, deflate'
+    # A caller's hard-coded value is replaced, whatever its case
+    monkeypatch.setattr(http_client, 'ACCEPT_ENCODING', 'gzip,deflate')
+    headers = http_client._negotiated_headers({'accept-encoding': 'gzip, deflate, br', 'User-Agent': 'x'})
+    assert headers == {'User-Agent': 'x', 'Accept-Encoding': 'gzip, deflate'}
+
+
+@pytest.mark.parametrize('coding', ['gzip', 'deflate', 'br'])
+def test_stream_decompresses_chunk_by_chunk_and_counts_bytes(monkeypatch, fresh_state, coding):
+    wire = _compress(PAGE, coding)
+    sent = _serve(monkeypatch, wire, {'Content-Encoding': coding})
+    chunks = list(http_client.stream(f'https://{HOST}/x', headers={'Accept-Encoding': 'identity'},
+                                     chunk_size=16 * 1024))
+    assert b''.join(chunks) == PAGE
+    assert len(chunks) > 1
+    [(request_headers, response)] = sent
+    assert request_headers['Accept-Encoding'] == http_client.accept_encoding()
+    assert http_client.transfer_stats[HOST] == {'responses': 1, 'wire_bytes': len(wire), 'body_bytes': len(PAGE),
+                                                'encodings': {coding: 1}}
+    assert response.raw.closed
+
+
+def test_abandoned_stream_counts_only_what_was_read(monkeypatch, fresh_state):
+    wire = gzip.compress(PAGE)
+    _serve(monkeypatch, wire, {'Content-Encoding': 'gzip'})
+    chunks = http_client.stream(f'https://{HOST}/x', chunk_size=16 * 1024)
+    first = next(chunks)
+    chunks.close()
+    host_stats = http_client.transfer_stats[HOST]
+    assert host_stats['body_bytes'] == len(first)
+    assert 0 < host_stats['wire_bytes'] < len(wire)
+
+
+def test_buffered_get_counts_wire_and_decoded_bytes(fresh_state):
+    wire = gzip.compress(PAGE)
+
+    class Session:
+        def get(self, url, timeout=None, stream=False, **kwargs):
+            assert stream
+            return _raw_response(wire, {'Content-Encoding': 'gzip'})
+
+    response = http_client.get(f'https://{HOST}/x', session=Session())
+    assert response.content == PAGE
+    http_client.get(f'https://{HOST}/x', session=Session())
+    assert http_client.transfer_stats[HOST] == {'responses': 2, 'wire_bytes': 2 * len(wire),
+                                                'body_bytes': 2 * len(PAGE), 'encodings': {'gzip': 2}}
+    [line] = http_client.transfer_summary_lines()
+    assert line.startswith(f"{HOST}: 2 responses") and 'gzip x2' in line
+
+
+def test_stream_raises_for_error_status_before_any_chunk(monkeypatch, fresh_state):
+    monkeypatch.setattr(http_client, '_open_stream',
+                        lambda session, url, timeout, kwargs: (_raw_response(b'blocked', status=403), 0.01))
+    with pytest.raises(requests.HTTPError):
+        next(http_client.stream(f'https://{HOST}/x'))
+    assert http_client.transfer_stats[HOST]['body_bytes'] == 0
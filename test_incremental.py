@@ -0,0 +1,83 @@
+"""
+Tests for incremental runs: config diffing against the last snapshot and
+threshold-only re-evaluation without fetching.
+"""
+
+import playwright_price_checker
+from config_compiler import diff_config, load_config_snapshot, save_config_snapshot
+from playwright_price_checker import recheck_thresholds
+from subscriptions import SubscriptionIndex
+
+KEY = 'costco:4000285678'
+
+
+def compiled_item(**changes):
+    item = {
+        'name': 'iPad A16 (128GB Wi-Fi)',
+        'item_id': '4000285678',
+        'watch_id': '4000285678',
+        'url': 'https://www.costco.com/ipad-128gb-wi-fi-a16-chip.product.4000285678.html',
+        'normalized_url': 'https://www.costco.com/ipad-128gb-wi-fi-a16-chip.product.4000285678.html',
+        'product_key': KEY,
+        'price_threshold': 299.0,
+        'search_term': 'ipad a16',
+    }
+    item.update(changes)
+    return item
+
+
+def test_diff_config_classifies_changes():
+    snapshot = {'4000285678': compiled_item(), 'gone': compiled_item(watch_id='gone')}
+    config = {'items': [
+        compiled_item(price_threshold=350.0, subscribers=[{'id': 'alice', 'threshold': 340.0}]),
+        compiled_item(watch_id='new'),
+    ]}
+    changes = diff_config(snapshot, config)
+    assert changes == {'added': ['new'], 'modified': [], 'threshold_only': ['4000285678'], 'removed': ['gone']}
+    config = {'items': [compiled_item(search_term='ipad')]}
+    assert diff_config(snapshot, config)['modified'] == ['4000285678']
+
+
+def test_snapshot_keeps_previous_entry_for_pending_items(tmp_path):
+    path = tmp_path / "config_snapshot.json"
+    previous = {'4000285678': compiled_item()}
+    config = {'items': [compiled_item(price_threshold=350.0), compiled_item(watch_id='new')]}
+    save_config_snapshot(config, previous, pending=['4000285678', 'new'], snapshot_file=path)
+    assert load_config_snapshot(path) == previous
+
+
+def test_recheck_thresholds_alerts_from_stored_price_and_new_subscribers(monkeypatch):
+    issues = []
+    monkeypatch.setattr(playwright_price_checker, 'create_github_issue',
+                        lambda name, price, threshold, url, reason: issues.append((price, threshold, reason)))
+    history = {'4000285678': {'name': 'iPad', 'price': 329.99, 'threshold': 299.0, 'alert_triggered': False}}
+    index = SubscriptionIndex()
+    _, _, already_below = index.sync({KEY: [[340.0, 'alice']]}, {KEY: 329.99})
+    item = compiled_item(price_threshold=330.0, subscribers=[{'id': 'alice', 'threshold': 340.0}])
+
+    alerts, unpriced, notified = recheck_thresholds([item], history, {}, [{'type': 'threshold'}],
+                                                    {'notification': {'enabled': True}}, already_below)
+    assert (alerts, unpriced, notified) == (1, [], 1)
+    price, threshold, reason = issues[0]
+    assert (price, threshold) == (329.99, 340.0)
+    assert 'threshold $330.00' in reason and 'alice' in reason
+    assert history['4000285678']['threshold'] == 330.0
+    assert history['4000285678']['alert_triggered'] is True
+
+
+def test_recheck_thresholds_subscriber_only_change(monkeypatch):
+    issues = []
+    monkeypatch.setattr(playwright_price_checker, 'create_github_issue', lambda *args: issues.append(args))
+    history = {'4000285678': {'name': 'iPad', 'price': 329.99, 'threshold': 299.0}}
+    _, _, already_below = SubscriptionIndex().sync({KEY: [[340.0, 'bob']]}, {KEY: 329.99})
+    alerts, _, notified = recheck_thresholds([compiled_item()], history, {}, [{'type': 'threshold'}],
+                                             {'notification': {'enabled': True}}, already_below)
+    assert (alerts, notified) == (1, 1)
+    assert 'bob' in issues[0][-1]
+
+
+def test_recheck_thresholds_without_stored_price_needs_fetch():
+    item = compiled_item()
+    alerts, unpriced, notified = recheck_thresholds([item], {}, {}, [{'type': 'threshold'}],
+                                                    {'notification': {'enabled': False}}, {})
+    assert (alerts, unpriced, notified) == (0, [item], 0)
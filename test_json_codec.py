@@ -0,0 +1,92 @@
+"""
+Tests for the JSON codec's file helpers and its orjson/stdlib backends.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import json_codec
+
+
+def test_concurrent_saves_use_their_own_temp_files(tmp_path):
+    path = tmp_path / "state.json"
+
+    def save(n):
+        json_codec.save_file(path, {'n': n, 'padding': 'x' * 10000})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(save, range(64)))
+    assert json_codec.load_file(path)['n'] in range(64)
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    """Run a test against each backend (orjson only if installed)"""
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_codec, 'orjson', None)
+    return request.param
+
+
+RECORD = {
+    'item_id': '4000285678', 'price': 299.99, 'threshold': 300.0, 'count': 3, 'big': 10 ** 15,
+    'computed': 0.1 + 0.2, 'failed': None, 'available': True, 'name': 'Café Crème – 2 pk',
+    'changes': [['2025-11-20T08:00:00', 299.99]], 'stores': {}, 'tags': [], 847: 'warehouse',
+}
+
+
+def _both(obj, **kwargs):
+    encoded = {}
+    for name in ('orjson', 'json'):
+        saved = json_codec.orjson
+        if name == 'json':
+            json_codec.orjson = None
+        try:
+            encoded[name] = json_codec.dump_bytes(obj, **kwargs)
+        finally:
+            json_codec.orjson = saved
+    return encoded
+
+
+@pytest.mark.parametrize('pretty', [False, True])
+def test_backends_write_identical_bytes(pretty):
+    pytest.importorskip('orjson')
+    encoded = _both(RECORD, pretty=pretty)
+    assert encoded['orjson'] == encoded['json']
+    assert 'Café'.encode('utf-8') in encoded['json']
+
+
+def test_pretty_keeps_two_space_layout(backend):
+    assert json_codec.dumps({'a': [1]}, pretty=True) == '{\n  "a": [\n    1\n  ]\n}'
+    assert json_codec.dumps({'a': [1]}) == '{"a":[1]}'
+
+
+def test_floats_and_ints_round_trip(backend):
+    decoded = json_codec.loads(json_codec.dump_bytes(RECORD))
+    assert decoded['price'] == 299.99 and type(decoded['price']) is float
+    assert decoded['threshold'] == 300.0 and type(decoded['threshold']) is float
+    assert decoded['count'] == 3 and type(decoded['count']) is int
+    assert decoded['computed'] == 0.1 + 0.2
+    assert decoded['847'] == 'warehouse'
+
+
+@pytest.mark.parametrize('data', [b'{"price": 1.5}', '{"price": 1.5}', bytearray(b'{"price": 1.5}'),
+                                  memoryview(b'{"price": 1.5}')])
+def test_loads_accepts_every_buffer_type(backend, data):
+    assert json_codec.loads(data) == {'price': 1.5}
+
+
+@pytest.mark.parametrize('data', [b'{"price": ', b'', b'{"a": 1} trailing', b'\xff'])
+def test_decode_errors_are_json_decode_errors(backend, data):
+    with pytest.raises(json_codec.JSONDecodeError):
+        json_codec.loads(data)
+    with pytest.raises(ValueError):
+        json_codec.loads(data)
+
+
+def test_default_serializes_unknown_types(backend):
+    from collections import deque
+    assert json_codec.loads(json_codec.dump_bytes({'recent': deque([1, 2])}, default=list)) == {'recent': [1, 2]}
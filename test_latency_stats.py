@@ -0,0 +1,59 @@
+"""
+Tests for per-host latency histograms, adaptive timeouts and hedge delays.
+"""
+
+import latency_stats
+from latency_stats import BUCKET_BOUNDS, MAX_SAMPLES, adaptive_timeout, hedge_delay, percentile, record_latency
+
+HOST = 'www.costco.com'
+SETTINGS = dict(latency_stats.DEFAULT_SETTINGS, min_samples=20, multiplier=2.0, min_timeout=3.0, max_timeout=60.0)
+
+
+def _stats(samples):
+    stats = {}
+    for seconds in samples:
+        record_latency(stats, HOST, seconds)
+    return stats
+
+
+def test_default_until_min_samples():
+    stats = _stats([0.5] * 19)
+    assert adaptive_timeout(stats, HOST, 30, SETTINGS) == 30
+    assert hedge_delay(stats, HOST, SETTINGS) is None
+    assert adaptive_timeout(stats, 'other.example', 30, SETTINGS) == 30
+
+
+def test_timeout_follows_p99_and_is_clamped():
+    stats = _stats([2.0] * 100)
+    p99 = percentile(stats, HOST, 0.99)
+    # Bucket upper bound: at least the sample, within one ~20% bucket
+    assert 2.0 <= p99 < 2.0 * 1.2
+    assert adaptive_timeout(stats, HOST, 30, SETTINGS) == p99 * 2.0
+
+    assert adaptive_timeout(_stats([0.05] * 100), HOST, 30, SETTINGS) == 3.0
+    assert adaptive_timeout(_stats([50.0] * 100), HOST, 30, SETTINGS) == 60.0
+
+
+def test_hedge_delay_is_p95():
+    stats = _stats([0.2] * 95 + [10.0] * 5)
+    assert hedge_delay(stats, HOST, SETTINGS) == percentile(stats, HOST, 0.95) < 0.25
+    assert percentile(stats, HOST, 0.99) >= 10.0
+
+
+def test_slow_samples_beyond_last_bucket():
+    stats = _stats([500.0] * 20)
+    assert percentile(stats, HOST, 0.99) == BUCKET_BOUNDS[-1]
+
+
+def test_old_samples_fade():
+    stats = _stats([10.0] * (MAX_SAMPLES - 1))
+    record_latency(stats, HOST, 10.0)
+    assert stats[HOST]['total'] == MAX_SAMPLES // 2
+    assert stats[HOST]['total'] == sum(stats[HOST]['counts'])
+
+
+def test_stats_round_trip(tmp_path):
+    path = tmp_path / "latency.json"
+    stats = _stats([1.0] * 3)
+    latency_stats.save_latency_stats(stats, path)
+    assert latency_stats.load_latency_stats(path) == stats
@@ -0,0 +1,59 @@
+"""
+Tests for the content-addressed page archive.
+"""
+
+import threading
+
+import pytest
+
+import page_archive
+
+BODY = b'<html><span class="price">$299.99</span></html>'
+
+
+@pytest.fixture(autouse=True)
+def archive_dir(monkeypatch, tmp_path):
+    archive_dir = tmp_path / "page_archive"
+    monkeypatch.setattr(page_archive, 'ARCHIVE_DIR', archive_dir)
+    monkeypatch.setattr(page_archive, 'OBJECTS_DIR', archive_dir / "objects")
+    monkeypatch.setattr(page_archive, 'CACHE_DIR', archive_dir / "cache")
+    monkeypatch.setattr(page_archive, 'INDEX_FILE', archive_dir / "index.jsonl")
+    return archive_dir
+
+
+def test_identical_bodies_are_stored_once():
+    first = page_archive.archive_page('1', 'https://www.costco.com/a', BODY, 200, 299.99)
+    second = page_archive.archive_page('2', 'https://www.costco.com/b', BODY, 200, 299.99)
+    assert first == second
+    stats = page_archive.archive_stats()
+    assert (stats['entries'], stats['items'], stats['objects']) == (2, 2, 1)
+    assert [entry['item_id'] for entry in page_archive.iter_index('2')] == ['2']
+
+
+def test_concurrent_writers_of_one_body(archive_dir):
+    bodies = [BODY + bytes([i]) * 100_000 for i in range(4)]
+    threads = [threading.Thread(target=page_archive.store_body, args=(body,))
+               for body in bodies for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for body in bodies:
+        with page_archive.open_page(page_archive.body_digest(body)) as page:
+            assert page[:] == body
+    assert not list(archive_dir.rglob('*.tmp'))
+
+
+def test_open_page_leaves_nothing_in_cache(archive_dir):
+    digest = page_archive.store_body(BODY)
+    with page_archive.open_page(digest) as page:
+        assert page.find(b'$299.99') > 0
+    assert not any((archive_dir / "cache").iterdir())
+    with page_archive.open_page(page_archive.store_body(b'')) as page:
+        assert page == b''
+
+
+def test_missing_object():
+    with pytest.raises(FileNotFoundError):
+        with page_archive.open_page('0' * 64):
+            pass
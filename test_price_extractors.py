@@ -0,0 +1,108 @@
+"""
+Tests for the byte-level price extractor cascade and per-site strategy memo.
+"""
+
+import pytest
+
+import price_extractors
+from price_extractors import cascade_order, extract_price, extract_price_streaming, page_key
+
+KEY = 'www.costco.com/*.product.#.html'
+JSON_LD = b'<script type="application/ld+json">{"@type": "Product", "offers": {"price": "279.99"}}</script>'
+TESTID = b'<span data-testid="Text_single-price-whole-value">$299.99</span>'
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch, tmp_path):
+    monkeypatch.setattr(price_extractors, 'STRATEGY_FILE', tmp_path / "extraction_strategies.json")
+    monkeypatch.setattr(price_extractors, '_memo', {})
+    monkeypatch.setattr(price_extractors, 'run_stats', {})
+    monkeypatch.setattr(price_extractors, 'min_valid_price', price_extractors.MIN_VALID_PRICE)
+
+
+@pytest.mark.parametrize('html, price', [
+    # Multi-valued class attribute
+    (b'<span class="value notranslate">$299.99</span>', 299.99),
+    # Price split across nested tags, read like get_text()
+    (b'<div class="price"><span>$</span>299.99</div>', 299.99),
+    (b'<span data-testid="Text_single-price-whole-value"><span>$</span>1,299<sup>.99</sup></span>', 1299.99),
+    # Prices under $2 are real prices
+    (b'<span class="price">$1.49</span>', 1.49),
+    (b'<meta itemprop="price" content="12.50">', 12.50),
+    (b'<span itemprop="price">$8.25</span>', 8.25),
+    # data-class is not class
+    (b'<div data-class="price">$3.00</div><div class="price">$4.00</div>', 4.00),
+])
+def test_class_and_testid_strategies_match_soup_text(html, price):
+    assert extract_price(html)[0] == price
+
+
+def test_min_valid_price_is_configurable():
+    price_extractors.configure({'extraction': {'min_valid_price': 2.0}})
+    assert extract_price(b'<span class="price">$1.49</span>') == (None, None)
+    price_extractors.configure({})
+    assert extract_price(b'<span class="price">$1.49</span>') == (1.49, 'class_selector')
+
+
+def test_page_key_groups_product_pages():
+    assert page_key('https://www.costco.com/ipad-128gb.product.4000285678.html') == KEY
+    assert page_key('https://www.costco.com/airpods-4.product.4000308504.html') == KEY
+
+
+def test_memo_prefers_last_winner_and_records_switch():
+    assert extract_price(TESTID, KEY) == (299.99, 'testid')
+    assert price_extractors.preferred_strategy(KEY) == 'testid'
+    assert extract_price(TESTID, KEY) == (299.99, 'testid')
+    assert price_extractors.run_stats[KEY]['hits'] == 1
+
+    assert extract_price(b'<span class="price">$5.00</span>', KEY) == (5.0, 'class_selector')
+    assert price_extractors.preferred_strategy(KEY) == 'class_selector'
+    assert price_extractors.run_stats[KEY]['switched'] == ('testid', 'class_selector')
+    assert any('preferred changed' in line for line in price_extractors.strategy_summary_lines())
+
+
+def test_memoized_fallback_never_runs_before_structured_data():
+    price_extractors._memo[KEY] = {'preferred': 'regex', 'miss_streak': 0, 'wins': {'regex': 1}}
+    assert cascade_order('regex')[:3] == ['meta_tag', 'json_ld', 'regex']
+    assert cascade_order('json_ld') == cascade_order()
+    # The regex strategy would find $299.99, but the JSON-LD price wins
+    assert extract_price(TESTID + JSON_LD, KEY) == (279.99, 'json_ld')
+    assert price_extractors.preferred_strategy(KEY) == 'json_ld'
+
+
+def test_streaming_does_not_stop_early_on_memoized_fallback():
+    price_extractors._memo[KEY] = {'preferred': 'testid', 'miss_streak': 0, 'wins': {'testid': 1}}
+    body = TESTID + b' ' * 10000 + JSON_LD
+    chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)]
+    price, strategy, read = extract_price_streaming(iter(chunks), KEY)
+    assert (price, strategy, read) == (279.99, 'json_ld', len(body))
+
+
+def test_streaming_stops_early_only_on_meta_tag():
+    meta = b'<meta property="product:price:amount" content="269.99">'
+    body = meta + TESTID + b' ' * 10000 + JSON_LD
+    chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)]
+    price, strategy, read = extract_price_streaming(iter(chunks))
+    assert (price, strategy) == (269.99, 'meta_tag')
+    assert read < len(body)
+
+    # A testid price could still be outranked by JSON-LD further down
+    body = TESTID + b' ' * 10000 + JSON_LD
+    chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)]
+    assert extract_price_streaming(iter(chunks)) == (279.99, 'json_ld', len(body))
+
+
+@pytest.mark.parametrize('body', [TESTID + JSON_LD, JSON_LD + TESTID, TESTID + b'<span class="price">$5.00</span>'])
+def test_same_page_twice_yields_same_price(body):
+    first = extract_price(body, KEY)
+    assert extract_price(body, KEY) == first
+    assert price_extractors.run_stats[KEY]['switched'] is None
+    chunks = [body[i:i + 16] for i in range(0, len(body), 16)]
+    assert extract_price_streaming(iter(chunks), KEY)[:2] == first
+
+
+def test_memo_persists():
+    extract_price(TESTID, KEY)
+    price_extractors.save_strategy_memo()
+    price_extractors._memo = None
+    assert price_extractors.preferred_strategy(KEY) == 'testid'
@@ -0,0 +1,63 @@
+"""
+Tests for run-length-encoded price history.
+"""
+
+from datetime import timedelta
+
+import json_codec
+import price_intervals
+from price_intervals import expand, from_checks, load_intervals, price_stats, record_check, time_at_price
+
+PRODUCT = 'iPad 128GB'
+
+
+def _checks():
+    return [
+        {'timestamp': '2025-11-01T00:00:00', 'product': PRODUCT, 'price': 299.99, 'threshold': 300.0},
+        {'timestamp': '2025-11-01T02:00:00', 'product': PRODUCT, 'price': 299.99, 'threshold': 300.0},
+        {'timestamp': '2025-11-01T04:00:00', 'product': PRODUCT, 'price': 299.99, 'threshold': 300.0},
+        {'timestamp': '2025-11-01T06:00:00', 'product': PRODUCT, 'price': None, 'threshold': 300.0},
+        {'timestamp': '2025-11-01T08:00:00', 'product': PRODUCT, 'price': 349.99, 'threshold': 300.0},
+    ]
+
+
+def test_repeated_prices_extend_one_interval():
+    intervals = from_checks(_checks())
+    assert [(i['price'], i['check_count'], i['first_seen'][11:13], i['last_seen'][11:13])
+            for i in intervals[PRODUCT]] == [(299.99, 3, '00', '04'), (349.99, 1, '08', '08')]
+    assert time_at_price(intervals[PRODUCT][0]) == timedelta(hours=4)
+
+
+def test_threshold_change_opens_a_new_interval():
+    intervals = {}
+    record_check(intervals, PRODUCT, 299.99, '2025-11-01T00:00:00', 300.0)
+    record_check(intervals, PRODUCT, 299.99, '2025-11-01T01:00:00', 280.0)
+    # An out-of-order check doesn't stretch the interval backwards
+    record_check(intervals, PRODUCT, 299.99, '2025-10-31T00:00:00', 280.0)
+    assert [i['check_count'] for i in intervals[PRODUCT]] == [1, 1, 1]
+
+
+def test_expand_round_trips_priced_checks():
+    checks = [c for c in _checks() if c['price'] is not None]
+    expanded = list(expand(from_checks(checks)))
+    assert [(e['timestamp'], e['price']) for e in expanded] == [(c['timestamp'], c['price']) for c in checks]
+    assert [e['alert_triggered'] for e in expanded] == [True, True, True, False]
+
+
+def test_stats_without_expansion():
+    stats = price_stats(from_checks(_checks()), PRODUCT)
+    assert stats['total_checks'] == 4
+    assert (stats['lowest_price'], stats['highest_price'], stats['current_price']) == (299.99, 349.99, 349.99)
+    assert abs(stats['average_price'] - (299.99 * 3 + 349.99) / 4) < 1e-9
+    assert price_stats({}, PRODUCT) is None
+
+
+def test_legacy_log_is_converted_once(tmp_path):
+    legacy_file = tmp_path / "price_check_history.json"
+    intervals_file = tmp_path / "price_intervals.json"
+    json_codec.save_file(legacy_file, _checks())
+    intervals = load_intervals(intervals_file, legacy_file)
+    assert len(intervals[PRODUCT]) == 2
+    price_intervals.save_intervals(intervals, intervals_file)
+    json_codec.save_file(legacy_file, [])
+    assert load_intervals(intervals_file, legacy_file) == intervals
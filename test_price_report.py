@@ -0,0 +1,54 @@
+"""
+Tests for the incremental HTML price report.
+"""
+
+import price_report
+from history_store import append_observations, make_observation, new_check_id
+
+
+def _store_check(item_id, prices, timestamp, check_id=None):
+    check_id = check_id or new_check_id()
+    return [make_observation(item_id, price, timestamp=f"{timestamp}.{i:06d}", store=store, check_id=check_id)
+            for i, (store, price) in enumerate(prices.items())]
+
+
+def test_store_observations_fold_by_check_id():
+    first = _store_check('1', {'847': 299.99, '848': 289.99}, '2025-11-20T08:00:59')
+    # Next check lands in the same minute: it is a separate point
+    second = _store_check('1', {'847': 279.99, '848': 284.99}, '2025-11-20T08:00:59')
+    series = price_report.merge_observations([], first + second)
+    assert [price for _, price in series] == [289.99, 279.99]
+
+
+def test_one_check_spanning_a_minute_boundary_is_one_point():
+    check_id = new_check_id()
+    observations = (_store_check('1', {'847': 299.99}, '2025-11-20T08:00:59', check_id)
+                    + _store_check('1', {'848': 289.99}, '2025-11-20T08:01:00', check_id))
+    assert price_report.merge_observations([], observations) == [['2025-11-20T08:00:59.000000', 289.99]]
+
+
+def test_observations_without_check_id_fold_by_minute():
+    observations = [make_observation('1', 299.99, timestamp='2025-11-20T08:00:01', store='847', run_id=None),
+                    make_observation('1', 289.99, timestamp='2025-11-20T08:00:02', store='848', run_id=None)]
+    assert price_report.merge_observations([], observations) == [['2025-11-20T08:00:01', 289.99]]
+    # Single-store checks never fold
+    singles = [make_observation('1', 299.99, timestamp='2025-11-20T08:00:01'),
+               make_observation('1', 289.99, timestamp='2025-11-20T08:00:02')]
+    assert len(price_report.merge_observations([], singles)) == 2
+
+
+def test_incremental_build(monkeypatch, tmp_path):
+    monkeypatch.setattr(price_report, 'rollup_observations', lambda: [])
+    observations_file = tmp_path / "observations.jsonl"
+    report_dir = tmp_path / "report"
+    config = {'items': [{'item_id': '1', 'name': 'iPad', 'price_threshold': 280.0}]}
+
+    append_observations(_store_check('1', {'847': 299.99, '848': 289.99}, '2025-11-20T08:00:00'), observations_file)
+    assert price_report.build(report_dir, observations_file=observations_file, config=config)['rendered'] == 1
+    assert price_report.build(report_dir, observations_file=observations_file, config=config)['rendered'] == 0
+
+    append_observations(_store_check('1', {'847': 279.99}, '2025-11-21T08:00:00'), observations_file)
+    price_report.build(report_dir, observations_file=observations_file, config=config)
+    summary = price_report.load_report_state(report_dir)['items']['1']
+    assert (summary['price'], summary['low'], summary['count']) == (279.99, 279.99, 2)
+    assert 'iPad' in (report_dir / 'index.html').read_text()
@@ -0,0 +1,54 @@
+"""
+Tests for the in-memory price index behind price_server.py.
+"""
+
+from history_store import append_observations, make_observation, new_check_id
+from price_server import PriceIndex
+
+CONFIG = {'items': [{'item_id': '1', 'watch_id': 'costco:1', 'name': 'iPad', 'price_threshold': 280.0}],
+          'aliases': {'ipad': 'costco:1'}}
+
+
+def _index(tmp_path):
+    return PriceIndex(CONFIG, observations_file=tmp_path / "observations.jsonl",
+                      history_file=tmp_path / "price_history.json", rollups_file=tmp_path / "rollups.jsonl")
+
+
+def test_store_checks_fold_by_check_id(tmp_path):
+    index = _index(tmp_path)
+    observations_file = tmp_path / "observations.jsonl"
+    for prices in ({'847': 299.99, '848': 289.99}, {'847': 279.99, '848': 284.99}):
+        check_id = new_check_id()
+        append_observations([make_observation('1', price, timestamp='2025-11-20T08:00:30', store=store,
+                                              check_id=check_id) for store, price in prices.items()],
+                            observations_file)
+        index.reload()
+    assert index.history('1') == [['2025-11-20T08:00:30', 289.99], ['2025-11-20T08:00:30', 279.99]]
+    summary = index.item('ipad')
+    assert (summary['price'], summary['low'], summary['observations']) == (279.99, 279.99, 2)
+    assert summary['below_threshold'] is True
+
+
+def test_single_store_observations_are_separate_points(tmp_path):
+    index = _index(tmp_path)
+    append_observations([make_observation('1', 299.99, timestamp='2025-11-20T08:00:01'),
+                         make_observation('1', 289.99, timestamp='2025-11-20T08:00:02')],
+                        tmp_path / "observations.jsonl")
+    assert index.reload() == 2
+    assert index.item('1')['observations'] == 2
+    assert index.reload() == 0
+
+
+def test_reload_continues_after_compaction(tmp_path, monkeypatch):
+    import retention
+    monkeypatch.setattr(retention, 'ROLLUPS_FILE', tmp_path / "rollups.jsonl")
+    observations_file = tmp_path / "observations.jsonl"
+    index = _index(tmp_path)
+    append_observations([make_observation('1', 299.99, timestamp='2025-10-01T08:00:00'),
+                         make_observation('1', 289.99, timestamp='2025-11-20T08:00:00')], observations_file)
+    assert index.reload() == 2
+    retention.compact_observations('2025-11-01T00', {}, observations_file)
+    append_observations([make_observation('1', 279.99, timestamp='2025-11-21T08:00:00')], observations_file)
+    assert index.reload() == 1
+    assert index.stats['full_reloads'] == 0
+    assert [price for _, price in index.history('1')] == [299.99, 289.99, 279.99]
@@ -0,0 +1,121 @@
+"""
+Tests for tiered retention: rollups, compaction and readers resuming after it.
+"""
+
+from datetime import datetime
+
+import pytest
+
+import history_store
+import json_codec
+import retention
+from history_store import append_observations, make_observation, read_new_observations
+
+NOW = datetime(2025, 12, 31, 12, 0)
+
+
+@pytest.fixture
+def files(monkeypatch, tmp_path):
+    observations_file = tmp_path / "observations.jsonl"
+    rollups_file = tmp_path / "rollups.jsonl"
+    monkeypatch.setattr(history_store, 'OBSERVATIONS_FILE', observations_file)
+    monkeypatch.setattr(retention, 'ROLLUPS_FILE', rollups_file)
+    monkeypatch.setattr(retention, 'STATE_FILE', tmp_path / "retention_state.json")
+    return observations_file, rollups_file
+
+
+def _observations(day, prices, store=None):
+    return [make_observation('1', price, timestamp=f"2025-{day}T{hour:02d}:30:00", store=store)
+            for hour, price in enumerate(prices)]
+
+
+def test_roll_up_keeps_every_price_change():
+    observations = _observations('11-01', [300, 300, None, 290, 290, 300])
+    last_prices = {}
+    [record] = retention.roll_up(observations, last_prices, 'day')
+    assert (record['open'], record['high'], record['low'], record['close']) == (300, 300, 290, 300)
+    assert (record['count'], record['failed']) == (5, 1)
+    assert [price for _, price in record['changes']] == [300, 290, 300]
+    assert last_prices == {'1': 300}
+
+    # The next batch continues from the last rolled-up price
+    [record] = retention.roll_up(_observations('11-02', [300, 280]), last_prices, 'day')
+    assert [price for _, price in record['changes']] == [280]
+
+
+def test_stores_are_separate_series():
+    records = retention.roll_up(_observations('11-01', [300]) + _observations('11-01', [290], store='847'), {})
+    assert {r.get('store'): r['close'] for r in records} == {None: 300, '847': 290}
+
+
+def test_compaction_moves_expired_lines_and_readers_find_their_place(files):
+    observations_file, rollups_file = files
+    append_observations(_observations('11-01', [300, 290]), observations_file)
+    recent = _observations('12-30', [280, 270])
+    append_observations(recent[:1], observations_file)
+    # A reader that has consumed everything up to here
+    _, watermark = read_new_observations(0, observations_file)
+    anchor = history_store.log_anchor(watermark, observations_file)
+    append_observations(recent[1:], observations_file)
+
+    records, expired, kept = retention.compact_observations('2025-12-01T12', {})
+    assert (expired, kept) == (2, 2)
+    assert [o['price'] for o in history_store.load_observations()] == [280, 270]
+    assert [r['bucket'] for r in retention.load_rollups(rollups_file)] == ['2025-11-01T00', '2025-11-01T01']
+    # The watermark's line is found at its new offset
+    offset = history_store.resume_offset(watermark, anchor, observations_file)
+    assert offset < watermark
+    remaining, _ = read_new_observations(offset, observations_file)
+    assert [o['price'] for o in remaining] == [270]
+    assert history_store.resume_offset(offset, history_store.log_anchor(offset, observations_file),
+                                       observations_file) == offset
+    assert history_store.resume_offset(0, None, observations_file) == 0
+
+
+def test_watermark_on_an_expired_line_needs_a_rebuild(files):
+    observations_file, _ = files
+    append_observations(_observations('11-01', [300]), observations_file)
+    _, watermark = read_new_observations(0, observations_file)
+    anchor = history_store.log_anchor(watermark, observations_file)
+    append_observations(_observations('12-30', [280, 270]), observations_file)
+    retention.compact_observations('2025-12-01T12', {})
+    assert history_store.resume_offset(watermark, anchor, observations_file) is None
+
+
+def test_report_in_custom_dir_stays_incremental_across_compaction(files, monkeypatch, tmp_path):
+    import price_report
+    observations_file, _ = files
+    monkeypatch.setattr(price_report, 'rollup_observations', lambda: [])
+    monkeypatch.setattr(retention, 'compact_rollups', lambda day_cutoff: 0)
+    report_dir = tmp_path / "custom-report"
+    config = {'items': []}
+    append_observations(_observations('11-01', [300]) + _observations('12-30', [280]), observations_file)
+    price_report.build(report_dir, observations_file=observations_file, config=config)
+
+    stats = retention.compact(now=NOW, force=True)
+    assert (stats['expired'], stats['kept']) == (1, 1)
+    assert retention.compact(now=NOW) is None  # not due again yet
+    append_observations(_observations('12-31', [270]), observations_file)
+    assert price_report.build(report_dir, observations_file=observations_file, config=config)['rendered'] == 1
+    # Extended, not rebuilt: the expired November point is still in the series
+    assert [price for _, price in price_report.load_series(report_dir, '1')] == [300, 280, 270]
+
+
+def test_hourly_rollups_merge_into_daily(files):
+    _, rollups_file = files
+    records = retention.roll_up(_observations('01-05', [300, 290, 310]), {})
+    rollups_file.write_bytes(b''.join(json_codec.dump_bytes(r) + b'\n' for r in records))
+    assert retention.compact_rollups('2025-02-01', rollups_file) == 3
+    [daily] = retention.load_rollups(rollups_file)
+    assert (daily['tier'], daily['bucket'], daily['count']) == ('day', '2025-01-05', 3)
+    assert (daily['open'], daily['low'], daily['high'], daily['close']) == (300, 290, 310, 310)
+    points = [(o['timestamp'], o['price'], o['source']) for o in retention.rollup_observations(rollups_file)]
+    assert [price for _, price, _ in points] == [300, 290, 310]
+    assert {source for _, _, source in points} == {'rollup'}
+
+
+def test_keep_change_points():
+    checks = [{'timestamp': f"2025-11-0{day}", 'available': available}
+              for day, available in enumerate([False, False, True, True, False, False], start=1)]
+    kept = retention.keep_change_points(checks, 'available', '2025-11-06')
+    assert [check['timestamp'][-1] for check in kept] == ['1', '3', '5', '6']
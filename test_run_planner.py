@@ -0,0 +1,166 @@
+"""
+Tests for deadline-aware run planning, checkpointing and resumed runs.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import playwright_price_checker
+import run_planner
+from run_planner import Checkpointer, RunDeadline, order_items, recently_checked
+
+NOW = datetime(2025, 11, 20, 8, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(run_planner, 'time', clock)
+    return clock
+
+
+def _item(watch_id, threshold=300.0):
+    return {'item_id': watch_id, 'watch_id': watch_id, 'name': f"Item {watch_id}", 'price_threshold': threshold,
+            'url': f"https://www.costco.com/x.product.{watch_id}.html", 'product_key': f"costco:{watch_id}"}
+
+
+def _entry(price, hours_ago=1, volatility=0.0):
+    return {'price': price, 'last_checked': (NOW - timedelta(hours=hours_ago)).isoformat(), 'volatility': volatility}
+
+
+def test_order_items_by_expected_value():
+    items = [_item('far'), _item('near'), _item('new'), _item('stale')]
+    history = {'far': _entry(600.0), 'near': _entry(305.0), 'stale': _entry(600.0, hours_ago=48)}
+    order = [item['watch_id'] for item in order_items(items, history, NOW)]
+    assert order == ['new', 'near', 'stale', 'far']
+
+
+def test_deadline_stops_before_the_slowest_item_would_overrun(clock):
+    deadline = RunDeadline(100, safety_seconds=10, initial_item_estimate=30)
+    assert deadline.begin_item()
+    clock.now += 5
+    # The first measured item replaces the 30s guess
+    assert deadline.begin_item()
+    assert deadline.slowest_item == 5
+    clock.now += 20
+    assert deadline.begin_item()
+    assert deadline.slowest_item == 20
+    clock.now += 40
+    # 35s left < 40s slowest + 10s safety
+    assert not deadline.begin_item()
+    assert deadline.remaining() == 35
+
+
+def test_checkpointer_flushes_by_items_and_by_time(clock):
+    saves = []
+    checkpointer = Checkpointer(lambda: saves.append(clock.now), every_items=3, every_seconds=60)
+    for _ in range(3):
+        checkpointer.item_done()
+    assert len(saves) == 1
+    checkpointer.item_done()
+    clock.now += 61
+    checkpointer.item_done()
+    assert len(saves) == 2 and checkpointer.pending == 0
+    checkpointer.flush()
+    assert len(saves) == 2  # nothing pending
+    checkpointer.item_done()
+    checkpointer.flush()
+    assert checkpointer.checkpoints == 3
+
+
+def test_recently_checked_window():
+    assert recently_checked(_entry(300.0, hours_ago=1), 120, NOW)
+    assert not recently_checked(_entry(300.0, hours_ago=3), 120, NOW)
+    assert not recently_checked({'price': None}, 120, NOW)
+    assert not recently_checked(None, 120, NOW)
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """check_prices over in-memory state; returns (config, history, fetched watch ids, saved snapshots)"""
+    config = {'items': [], 'products': {}, 'notification': {'enabled': False},
+              'checkpoint': {'every_items': 50, 'resume_window_minutes': 120}}
+    history = {}
+    fetched = []
+    snapshots = []
+
+    class NoCompaction:
+        def __init__(self, config):
+            pass
+
+        def start(self):
+            return self
+
+        def join(self):
+            return None
+
+    patches = {
+        'load_config': lambda: config,
+        'load_price_history': lambda: history,
+        'save_price_history': lambda saved: None,
+        'load_alert_state': dict,
+        'save_alert_state': lambda state: None,
+        'load_config_snapshot': lambda: None,
+        'save_config_snapshot': lambda config, snapshot, pending: snapshots.append(pending),
+        'load_endpoints': dict,
+        'save_endpoints': lambda endpoints: None,
+        'save_strategy_memo': lambda: None,
+        'append_observation': lambda *args, **kwargs: None,
+        'BackgroundCompaction': NoCompaction,
+        'get_current_price': lambda item, tiers: fetched.append(item['watch_id']) or 350.0,
+    }
+    for name, value in patches.items():
+        monkeypatch.setattr(playwright_price_checker, name, value)
+    monkeypatch.setattr(playwright_price_checker.http_client, 'configure', lambda config: None)
+    monkeypatch.setattr(playwright_price_checker.http_client, 'save_state', lambda: None)
+    monkeypatch.delenv('RUN_DEADLINE_SECONDS', raising=False)
+    return config, history, fetched, snapshots
+
+
+def test_resume_skips_items_checked_in_window(run):
+    config, history, fetched, _ = run
+    config['items'] = [_item('done'), _item('failed'), _item('todo')]
+    recent = (datetime.now() - timedelta(minutes=30)).isoformat()
+    history['done'] = {'name': 'Item done', 'price': 340.0, 'last_checked': recent}
+    # A failed check keeps its old last_checked, so it is retried
+    history['failed'] = {'name': 'Item failed', 'price': 340.0,
+                         'last_checked': (datetime.now() - timedelta(hours=5)).isoformat()}
+
+    with pytest.raises(SystemExit):
+        playwright_price_checker.check_prices(resume=True)
+    assert fetched == ['failed', 'todo']
+    assert history['done']['last_checked'] == recent
+
+    fetched.clear()
+    with pytest.raises(SystemExit):
+        playwright_price_checker.check_prices(resume=False)
+    assert fetched == ['done', 'failed', 'todo']
+
+
+def test_deadline_checks_by_priority_and_defers_the_rest(run, clock, monkeypatch):
+    config, history, fetched, snapshots = run
+    config['items'] = [_item('far'), _item('near'), _item('new')]
+    history['far'] = {'price': 900.0, 'last_checked': datetime.now().isoformat()}
+    history['near'] = {'price': 301.0, 'last_checked': datetime.now().isoformat()}
+    fetch = playwright_price_checker.get_current_price
+
+    def slow_fetch(item, tiers):
+        clock.now += 50
+        return fetch(item, tiers)
+
+    monkeypatch.setattr(playwright_price_checker, 'get_current_price', slow_fetch)
+    with pytest.raises(SystemExit):
+        playwright_price_checker.check_prices(deadline_seconds=130)
+    # 80s left after the first item, then 30s: less than 50s + 15s safety
+    assert fetched == ['new', 'near']
+    # Deferred items stay pending for the next incremental run
+    assert snapshots == [['far']]
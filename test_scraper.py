@@ -1,7 +1,8 @@
-import requests
 import json
 import re
 
+import http_client
+
 def fetch_costco_page(url):
     """Fetch Costco product page and extract price information"""
     try:
@@ -9,13 +10,12 @@ def fetch_costco_page(url):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
         
         print(f"🔍 Fetching URL: {url}\n")
-        response = requests.get(url, headers=headers, timeout=15)
+        response = http_client.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         
         html_content = response.text
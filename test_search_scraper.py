@@ -0,0 +1,59 @@
+"""
+Tests for listing-page tile parsing and listing price lookup.
+"""
+
+import search_scraper
+from search_scraper import fetch_listing_prices, listing_key, parse_listing
+
+LISTING = b"""<html><body><div class="grid">
+  <div class="tile">
+    <a href="/ipad.product.4000285678.html"><img alt="iPad"></a>
+    <a href="/ipad.product.4000285678.html">iPad 128GB</a>
+    <div data-testid="Text_Price"><span>$</span>299.99</div>
+  </div>
+  <div class="tile">
+    <a href="/airpods.product.4000308504.html">AirPods 4</a>
+    <div><div><span>$149.99</span></div></div>
+  </div>
+  <div class="tile"><a href="/keyboard.product.4000312345.html">Magic Keyboard</a></div>
+</div></body></html>"""
+
+
+def test_parse_listing_prices_each_tile():
+    tiles, next_url = parse_listing(LISTING, 'https://www.costco.com/CatalogSearch?keyword=ipad')
+    assert [(t['product_number'], t['name'], t['price']) for t in tiles] == [
+        ('4000285678', 'iPad 128GB', 299.99),
+        ('4000308504', 'AirPods 4', 149.99),
+    ]
+    assert tiles[0]['url'] == 'https://www.costco.com/ipad.product.4000285678.html'
+    assert next_url is None
+
+
+def test_unpriced_tile_does_not_borrow_a_neighbours_price():
+    # The keyboard tile has no price; climbing to the grid would find the
+    # iPad's, but the grid also links other products
+    tiles, _ = parse_listing(LISTING)
+    assert '4000312345' not in {t['product_number'] for t in tiles}
+
+
+def test_deeply_nested_listing():
+    tile = '<div>' * 6 + '<a href="/x.product.{n}.html">Item {n}</a><span>${n}.00</span>' + '</div>' * 6
+    html = '<html><body>' + ''.join(tile.format(n=n) for n in range(100, 400)) + '</body></html>'
+    tiles, _ = parse_listing(html)
+    assert len(tiles) == 300
+    assert tiles[-1]['price'] == 399.0
+
+
+def test_listing_prices_are_keyed_by_watch_id(monkeypatch):
+    tiles = [{'product_number': '4000285678', 'name': 'iPad', 'price': 299.99, 'url': ''}]
+    monkeypatch.setattr(search_scraper, 'fetch_listing', lambda url, session=None: (tiles, None))
+    url = 'https://www.costco.com/ipad.product.4000285678.html'
+    items = [
+        {'item_id': '4000285678', 'watch_id': 'costco:4000285678', 'url': url, 'search_term': 'ipad'},
+        {'item_id': '4000285678', 'watch_id': 'family:costco:4000285678', 'url': url, 'search_term': 'ipad'},
+        {'item_id': '9999', 'watch_id': 'costco:9999', 'url': 'https://www.costco.com/x.product.9999.html'},
+    ]
+    prices, unmatched = fetch_listing_prices(items)
+    assert prices == {'costco:4000285678': (299.99, 'iPad'), 'family:costco:4000285678': (299.99, 'iPad')}
+    assert [listing_key(item) for item in unmatched] == ['costco:9999']
+    assert listing_key({'item_id': '1'}) == '1'
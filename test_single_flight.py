@@ -0,0 +1,57 @@
+"""
+Tests for in-run request coalescing.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_fetch():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        started.set()
+        release.wait(2)
+        return 299.99
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        owner = pool.submit(flight.do, 'costco:1', fetch)
+        started.wait(2)
+        assert flight.is_shared('costco:1')
+        waiters = [pool.submit(flight.do, 'costco:1', fetch) for _ in range(3)]
+        release.set()
+        assert [f.result() for f in [owner] + waiters] == [299.99] * 4
+
+    assert len(fetches) == 1
+    assert flight.stats == {'calls': 4, 'fetches': 1, 'saved': 3}
+
+
+def test_later_callers_reuse_result_and_error():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('a', lambda: 2) == 1
+    assert flight.do('b', lambda: 3) == 3
+
+    def blocked():
+        raise ConnectionError("403")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            flight.do('c', blocked)
+    assert flight.stats['fetches'] == 3
+
+
+def test_without_memo_only_overlapping_calls_share():
+    flight = SingleFlight(memoize=False)
+    assert flight.do('a', lambda: 1) == 1
+    assert not flight.is_shared('a')
+    assert flight.do('a', lambda: 2) == 2
+    assert flight.stats['saved'] == 0
@@ -0,0 +1,77 @@
+"""
+Tests for the accessibility snapshot parser against a saved search-results
+snapshot (fixtures/costco_search_ipad_a16.yml).
+"""
+
+from pathlib import Path
+
+import pytest
+
+from snapshot_parser import extract_tiles, load_snapshot, parse_snapshot, prices_for_items
+
+FIXTURE = Path(__file__).parent / "fixtures" / "costco_search_ipad_a16.yml"
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_snapshot(FIXTURE)
+
+
+def test_index_by_ref_role_and_name(index):
+    assert index.ref('e1096').text == '$299.99'
+    assert index.search_box().ref == 'e57'
+    assert index.first(role='button', name='search').ref == 'e58'
+    assert [node.ref for node in index.find(role='heading')] == ['e1001', 'e1200']
+    assert index.first(name='Showing results for "ipad a16"').ref == 'e1001'
+    assert index.first(text='while supplies last').ref == 'e1137'
+
+
+def test_links_carry_url_property(index):
+    link = index.ref('e1134')
+    assert link.role == 'link'
+    assert link.props['url'] == '/airpods-4-with-active-noise-cancellation.product.4000308504.html'
+    assert not link.children
+
+
+def test_extract_tiles_prices_every_product_once(index):
+    tiles = extract_tiles(index)
+    by_number = {tile['product_number']: tile for tile in tiles}
+    # The magic keyboard has no price; recently viewed repeats the 128GB iPad
+    assert list(by_number) == ['4000285678', '4000285679', '4000308504']
+
+    ipad = by_number['4000285678']
+    # Display price, not the "$50 OFF" badge or the recently-viewed price
+    assert ipad['price'] == 299.99
+    assert ipad['ref'] == 'e1096'
+    assert ipad['name'] == 'iPad, 128GB Wi-Fi (A16 chip)'
+    assert ipad['link_ref'] == 'e1094'
+    assert by_number['4000285679']['price'] == 1049.99
+    assert by_number['4000308504']['price'] == 149.99
+
+
+def test_prices_for_items_matches_by_product_number(index):
+    items = [
+        {'item_id': '4000285678', 'url': 'https://www.costco.com/ipad-128gb-wi-fi-a16-chip.product.4000285678.html'},
+        {'item_id': '4000308504', 'url': 'https://www.costco.com/airpods-4-with-active-noise-cancellation.product.4000308504.html'},
+        {'item_id': '9999', 'url': 'https://www.costco.com/not-listed.product.9999.html'},
+    ]
+    prices, unmatched = prices_for_items(extract_tiles(index), items)
+    assert prices == {
+        '4000285678': (299.99, 'iPad, 128GB Wi-Fi (A16 chip)'),
+        '4000308504': (149.99, 'AirPods 4 with Active Noise Cancellation'),
+    }
+    assert [item['item_id'] for item in unmatched] == ['9999']
+
+
+def test_quoted_entries_and_bare_attributes():
+    index = parse_snapshot(
+        '- \'checkbox "Members: only" [checked] [ref=e5]\'\n'
+        '- generic [ref=e6]: "Price: $10.00"\n'
+        '- text: plain text\n'
+    )
+    checkbox = index.ref('e5')
+    assert checkbox.role == 'checkbox'
+    assert checkbox.name == 'Members: only'
+    assert checkbox.attrs['checked'] is True
+    assert index.ref('e6').text == 'Price: $10.00'
+    assert index.first(role='text').text == 'plain text'
@@ -0,0 +1,82 @@
+"""
+Tests for the multi-store price matrix (no network: http_client.get is stubbed).
+"""
+
+import pytest
+
+import http_client
+import store_matrix
+from config_compiler import validate_config
+from store_matrix import StoreMatrixFetcher, best_store_price, store_url
+
+API_URL = "https://gdx-api.costco.com/catalog/product/product-api/v1/display-price-lite?item=4000285678&whsNumber=1"
+PAGE_URL = "https://www.costco.com/ipad.product.4000285678.html"
+STORES = [
+    {'id': '10301', 'catalog_id': '10701', 'warehouse': '847'},
+    {'id': '10302', 'catalog_id': '10701', 'warehouse': '848'},
+]
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def test_store_url_sets_store_parameters():
+    assert 'whsNumber=847' in store_url(API_URL, STORES[0])
+    page = store_url(PAGE_URL, STORES[0])
+    assert 'storeId=10301' in page and 'catalogId=10701' in page
+
+
+def test_store_url_rejects_api_url_without_warehouse():
+    with pytest.raises(ValueError):
+        store_url(API_URL, {'id': '10301'})
+
+
+def test_validation_requires_warehouse_for_enabled_stores():
+    config = {'items': [], 'stores': {'enabled': True, 'locations': [{'id': '10301', 'catalog_id': '10701'}]}}
+    assert any('warehouse' in error for error in validate_config(config))
+    config['stores']['locations'][0]['warehouse'] = '847'
+    assert validate_config(config) == []
+    # Disabled stores aren't checked
+    assert validate_config({'items': [], 'stores': {'enabled': False, 'locations': [{'id': '1'}]}}) == []
+
+
+def test_fetch_item_prices_each_store_without_keeping_bodies(monkeypatch):
+    requested = []
+    bodies = {'847': b'<span class="price">$299.99</span>', '848': b'<span class="price">$279.99</span>'}
+
+    def fake_get(url, headers=None, timeout=None, session=None):
+        requested.append(url)
+        return FakeResponse(bodies[url.split('whsNumber=')[1]])
+
+    monkeypatch.setattr(http_client, 'get', fake_get)
+    # API bodies go through parse_api_price; price them straight from the fake body
+    monkeypatch.setattr(store_matrix.json_codec, 'loads', lambda body: body)
+    monkeypatch.setattr(store_matrix, 'parse_api_price', lambda body: float(body.split(b'$')[1].split(b'<')[0]))
+    fetcher = StoreMatrixFetcher(STORES, workers=2)
+    try:
+        matrix = fetcher.fetch_item(API_URL)
+        assert matrix == {'10301': 299.99, '10302': 279.99}
+        assert best_store_price(matrix) == ('10302', 279.99)
+        assert not fetcher._prices_by_digest
+        # A second item refetches: nothing is cached across items
+        fetcher.fetch_item(API_URL)
+        assert len(requested) == 4
+        assert fetcher.stats['requests'] == 4
+    finally:
+        fetcher.close()
+
+
+def test_identical_bodies_parsed_once_per_item(monkeypatch):
+    monkeypatch.setattr(http_client, 'get', lambda url, **kwargs: FakeResponse(b'<span class="price">$5.00</span>'))
+    fetcher = StoreMatrixFetcher(STORES, workers=1)
+    try:
+        assert fetcher.fetch_item(PAGE_URL) == {'10301': 5.0, '10302': 5.0}
+        assert fetcher.stats['parsed'] == 1
+        assert fetcher.stats['duplicate_bodies'] == 1
+    finally:
+        fetcher.close()
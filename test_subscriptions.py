@@ -0,0 +1,54 @@
+"""
+Tests for the threshold subscription index.
+"""
+
+from subscriptions import SubscriptionIndex
+
+KEY = 'costco:4000285678'
+
+
+def make_index():
+    return SubscriptionIndex({KEY: [[279.99, 'alice'], [299.0, 'carol'], [310.0, 'bob']]})
+
+
+def test_crossed_reports_thresholds_between_old_and_new_price():
+    index = make_index()
+    assert index.crossed(KEY, 320.0, 300.0) == ([(310.0, 'bob')], [])
+    assert index.crossed(KEY, 300.0, 279.99) == ([(279.99, 'alice'), (299.0, 'carol')], [])
+    assert index.crossed(KEY, 279.99, 305.0) == ([], [(279.99, 'alice'), (299.0, 'carol')])
+    assert index.crossed(KEY, 300.0, 300.0) == ([], [])
+    # Never priced before: everything at/below counts as crossed
+    assert index.crossed(KEY, None, 300.0) == ([(310.0, 'bob')], [])
+    assert index.crossed('costco:other', 10.0, 1.0) == ([], [])
+
+
+def test_below_lists_every_met_threshold():
+    index = make_index()
+    assert index.below(KEY, 299.0) == [(299.0, 'carol'), (310.0, 'bob')]
+    assert index.below(KEY, 400.0) == []
+
+
+def test_add_reports_subscription_already_below_current_price():
+    index = make_index()
+    assert index.add(KEY, 'dave', 320.0, price=300.0) is True
+    assert index.add(KEY, 'erin', 250.0, price=300.0) is False
+    assert index.add(KEY, 'frank', 320.0) is False
+    # Moving a subscription replaces it
+    index.add(KEY, 'alice', 200.0)
+    assert (279.99, 'alice') not in index.below(KEY, 0)
+    assert len(index) == 6
+
+
+def test_sync_returns_new_subscriptions_the_price_already_meets():
+    index = make_index()
+    compiled = {KEY: [[279.99, 'alice'], [305.0, 'dave'], [310.0, 'bob'], [320.0, 'bob2']]}
+    added, removed, already_below = index.sync(compiled, {KEY: 300.0})
+    assert (added, removed) == (2, 1)
+    # bob was already subscribed, so only the new ones are reported
+    assert already_below == {KEY: [(305.0, 'dave'), (320.0, 'bob2')]}
+    assert index.crossed(KEY, 300.0, 300.0) == ([], [])
+
+
+def test_sync_without_known_price_reports_nothing():
+    index = SubscriptionIndex()
+    assert index.sync({KEY: [[310.0, 'bob']]}) == (1, 0, {})